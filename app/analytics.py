@@ -1,33 +1,39 @@
 import logging
+from app.cache import AnalyticsCache, versioned
 from storage.db_manager import (
     get_habits_by_user, get_logs_by_habit, count_success_by_habit, count_unsuccessful_by_habit,
-    count_success, count_failure, get_habit_by_id
+    count_success, count_failure, get_habit_by_id, get_habit_version, get_user_version
 )
 
-# Setup logging configuration
-logging.basicConfig(level=logging.INFO)
+# Logging is configured by the entry point, not at import time
 logger = logging.getLogger(__name__)
 
+# Results are reused until a write bumps the data version of the habit or user they were computed from
+analytics_cache = AnalyticsCache(maxsize=512)
 
+
+@versioned(analytics_cache, get_user_version)
 def get_active_habits(user_id):
     # Retrieve all habits for the specified user and filter to return only active habits
     habits_data = get_habits_by_user(user_id)  # Fetch habits from database
     active_habits = [habit for habit in habits_data if habit['active'] == 1]  # Filter active habits
 
     if not active_habits:
-        print(f"No active habits found for user {user_id}.")  # Print message if no active habits
+        logger.debug("No active habits found for user %s.", user_id)
 
     return active_habits
 
 
+@versioned(analytics_cache, get_user_version)
 def get_habits_by_periodicity(user_id, periodicity):
     # Retrieve all habits for the specified user and filter by periodicity
     habits_data = get_habits_by_user(user_id)  # Fetch habits from database
     habits_by_periodicity = [habit for habit in habits_data if habit[4] == periodicity]  # Filter by periodicity
-    print(f"Habits with periodicity '{periodicity}' for user {user_id}: {habits_by_periodicity}")
+    logger.debug("Habits with periodicity '%s' for user %s: %s", periodicity, user_id, habits_by_periodicity)
     return habits_by_periodicity
 
 
+@versioned(analytics_cache, get_user_version)
 def get_longest_streak_all_habits(user_id):
     # Retrieve all habits for the specified user and find the habit with the longest streak
     habits_data = get_habits_by_user(user_id)  # Fetch habits from database
@@ -35,27 +41,30 @@ def get_longest_streak_all_habits(user_id):
     return longest_streak
 
 
+@versioned(analytics_cache, get_habit_version)
 def get_longest_streak_for_habit(habit_id):
     # Retrieve a specific habit by ID and return its longest streak
     habit = get_habit_by_id(habit_id)  # Fetch habit from database
     if habit:
         longest_streak = habit.streak  # Get streak for the habit
-        print(f"Longest streak for habit {habit_id}: {longest_streak}")
+        logger.debug("Longest streak for habit %s: %s", habit_id, longest_streak)
         return longest_streak
     else:
-        print(f"No habit found with ID {habit_id}.")  # Print message if habit not found
+        logger.debug("No habit found with ID %s.", habit_id)
         return 0
 
 
+@versioned(analytics_cache, get_habit_version)
 def get_completion_rate(habit_id):
     # Calculate and return the completion rate for a specific habit
     success_count = count_success_by_habit(habit_id)  # Count successful logs for the habit
     total = count_success_by_habit(habit_id) + count_unsuccessful_by_habit(habit_id)  # Calculate total logs
     completion_rate = (success_count / total) * 100 if total > 0 else 0  # Calculate completion rate
-    print(f"Completion rate for habit {habit_id}: {completion_rate}%")
+    logger.debug("Completion rate for habit %s: %s%%", habit_id, completion_rate)
     return completion_rate
 
 
+@versioned(analytics_cache, get_habit_version)
 def analyze_logs(habit_id):
     # Analyze logs for a specific habit and return various statistics
     logs_data = get_logs_by_habit(habit_id)  # Fetch logs from database
@@ -79,5 +88,10 @@ def analyze_logs(habit_id):
         "notes": list(unique_notes)  # List of unique notes
     }
 
-    print(f"Log analysis for habit {habit_id}: {analysis}")
+    logger.debug("Log analysis for habit %s: %s", habit_id, analysis)
     return analysis
+
+
+def get_cache_stats():
+    # Return hit/miss metrics of the analytics result cache
+    return analytics_cache.stats()
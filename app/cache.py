@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+
+class AnalyticsCache:
+    """LRU cache for analytics results keyed by (function, args, data version)."""
+
+    def __init__(self, maxsize=512):
+        # Initialize an empty cache holding at most maxsize results
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        # Return (True, value) for a cached key, otherwise (False, None)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)  # Mark as most recently used
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        # Store a result, evicting the least recently used entry when full
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        # Drop all cached results and reset the counters
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        # Return the cache metrics as a dictionary
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+
+def _copy(value):
+    # Return a copy of the lists and dicts in a result, so callers cannot change the cached one
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    return value
+
+
+def versioned(cache, version_of):
+    """Cache a function whose first argument identifies the data it reads.
+
+    version_of maps that argument to its current data version, so a write to the underlying habit or user
+    makes older entries unreachable; they are evicted by the LRU policy. A version of None means the data has
+    uncommitted changes: the function runs without the cache. Every call returns its own copy of the result's
+    lists and dicts.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args):
+            version = version_of(args[0])
+            if version is None:
+                return func(*args)
+            key = (func.__name__, args, version)
+            hit, value = cache.get(key)
+            if not hit:
+                value = func(*args)
+                cache.put(key, value)
+            return _copy(value)
+        return wrapper
+    return decorator
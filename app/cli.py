@@ -0,0 +1,253 @@
+"""Non-interactive command line interface for scripted use.
+
+Every command prints one JSON object per line on stdout; diagnostic output goes to stderr. Examples:
+
+    python -m app habit create --user alice --name Run --description 5k --periodicity daily --duration 30
+    python -m app habit mark --habit-id 3
+    python -m app habit deactivate-overdue
+    python -m app analytics completion-rate --habit-id 3
+    python -m app batch operations.csv --batch-size 1000
+
+Batch files are JSON (a list of objects, or one object per line) or CSV with a header row. Each record names its
+operation in an "op" field, e.g. "habit.create", and carries the same parameters as the matching command.
+"""
+import argparse
+import csv
+import json
+import sys
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from app.habit import Habit
+from app.logging_config import configure_logging
+from storage.db_manager import (
+    create_tables, deactivate_overdue_habits, get_habit_by_id, get_user_by_username, transaction
+)
+
+INTEGER_PARAMS = ("habit_id", "user_id", "duration")
+
+
+class OperationError(Exception):
+    pass
+
+
+def _user_id(params):
+    # Resolve the user of an operation from a user_id or a username
+    if params.get("user_id") is not None:
+        return params["user_id"]
+    if not params.get("user"):
+        raise OperationError("user or user_id is required")
+    user = get_user_by_username(params["user"])
+    if not user:
+        raise OperationError(f"User not found: {params['user']}")
+    return user[0]
+
+
+def _habit(params):
+    # Load the habit an operation refers to
+    if params.get("habit_id") is None:
+        raise OperationError("habit_id is required")
+    habit = get_habit_by_id(params["habit_id"])
+    if not habit:
+        raise OperationError(f"Habit with ID {params['habit_id']} not found")
+    return habit
+
+
+def habit_create(params):
+    for field in ("name", "periodicity", "duration"):
+        if params.get(field) in (None, ""):
+            raise OperationError(f"{field} is required")
+    habit = Habit.create(_user_id(params), params["name"], params.get("description") or "", params["periodicity"],
+                         params["duration"])
+    return habit.to_dict()
+
+
+def habit_mark(params):
+    habit = _habit(params)
+    habit.update_status()
+    return habit.to_dict()
+
+
+def habit_deactivate(params):
+    habit = _habit(params)
+    habit.deactivate()
+    return habit.to_dict()
+
+
+def habit_deactivate_overdue(params):
+    return {"deactivated": deactivate_overdue_habits()}
+
+
+def habit_delete(params):
+    habit = _habit(params)
+    habit.delete()
+    return {"deleted": habit.habit_id}
+
+
+def habit_list(params):
+    return [habit.to_dict() for habit in Habit.get_all_by_user(_user_id(params))]
+
+
+def analytics_active(params):
+    from app.analytics import get_active_habits
+
+    return [dict(habit) for habit in get_active_habits(_user_id(params))]
+
+
+def analytics_streak(params):
+    from app.analytics import get_longest_streak_all_habits, get_longest_streak_for_habit
+
+    if params.get("habit_id") is not None:
+        return {"habit_id": params["habit_id"], "streak": get_longest_streak_for_habit(params["habit_id"])}
+    try:
+        return dict(get_longest_streak_all_habits(_user_id(params)))
+    except ValueError:
+        return None  # The user has no habits
+
+
+def analytics_completion_rate(params):
+    from app.analytics import get_completion_rate
+
+    _habit(params)
+    return {"habit_id": params["habit_id"], "completion_rate": get_completion_rate(params["habit_id"])}
+
+
+def analytics_logs(params):
+    from app.analytics import analyze_logs
+
+    _habit(params)
+    return analyze_logs(params["habit_id"])
+
+
+OPERATIONS = {
+    "habit.create": habit_create,
+    "habit.mark": habit_mark,
+    "habit.deactivate": habit_deactivate,
+    "habit.deactivate-overdue": habit_deactivate_overdue,
+    "habit.delete": habit_delete,
+    "habit.list": habit_list,
+    "analytics.active": analytics_active,
+    "analytics.streak": analytics_streak,
+    "analytics.completion-rate": analytics_completion_rate,
+    "analytics.logs": analytics_logs,
+}
+
+
+def normalize(record):
+    # Drop empty values and convert numeric parameters, as CSV files deliver every value as a string
+    params = {key: value for key, value in record.items() if value not in (None, "")}
+    for key in INTEGER_PARAMS:
+        if key in params:
+            try:
+                params[key] = int(params[key])
+            except (TypeError, ValueError):
+                raise OperationError(f"{key} must be an integer")
+    return params
+
+
+def run_operation(record):
+    # Apply one operation record and return its result
+    params = normalize(record)
+    operation = OPERATIONS.get(params.get("op"))
+    if operation is None:
+        raise OperationError(f"Unknown operation: {params.get('op')}")
+    return operation(params)
+
+
+def read_batch_file(path, file_format=None):
+    # Read operation records from a JSON, JSON lines or CSV file
+    path = Path(path)
+    file_format = file_format or ("csv" if path.suffix.lower() == ".csv" else "json")
+    with open(path, newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            return list(csv.DictReader(file))
+        text = file.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def run_batches(records, batch_size, emit, summaries=True):
+    """Apply records in batches, each batch in a single transaction.
+
+    A failing operation rolls back its whole batch; later batches still run. Returns the number of failed batches.
+    """
+    failed = 0
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        results = []
+        try:
+            with transaction():
+                for index, record in enumerate(batch, start=start):
+                    try:
+                        results.append({"index": index, "op": record.get("op"), "ok": True,
+                                        "result": run_operation(record)})
+                    except Exception as e:
+                        raise OperationError(f"operation {index} ({record.get('op')}) failed: {e}") from e
+        except Exception as e:
+            failed += 1
+            emit({"batch": start // batch_size, "ok": False, "rolled_back": len(batch), "error": str(e)})
+            continue
+        for result in results:
+            emit(result)
+        if summaries:
+            emit({"batch": start // batch_size, "ok": True, "applied": len(batch)})
+    return failed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m app", description="Habit Tracker batch command line.")
+    groups = parser.add_subparsers(dest="group", required=True)
+
+    habit = groups.add_parser("habit", help="habit operations").add_subparsers(dest="command", required=True)
+    create = habit.add_parser("create", help="create a habit")
+    _add_user_arguments(create)
+    create.add_argument("--name", required=True)
+    create.add_argument("--description", default="")
+    create.add_argument("--periodicity", required=True,
+                        help="daily, weekly, monthly, every:<days> or weekdays:<mon,wed,...>")
+    create.add_argument("--duration", required=True, type=int)
+    for command in ("mark", "deactivate", "delete"):
+        habit.add_parser(command, help=f"{command} a habit").add_argument("--habit-id", required=True, type=int)
+    habit.add_parser("deactivate-overdue", help="deactivate every overdue habit of all users")
+    _add_user_arguments(habit.add_parser("list", help="list the habits of a user"))
+
+    analytics = groups.add_parser("analytics", help="analytics").add_subparsers(dest="command", required=True)
+    _add_user_arguments(analytics.add_parser("active", help="active habits of a user"))
+    streak = analytics.add_parser("streak", help="longest streak of a habit or of all habits of a user")
+    _add_user_arguments(streak)
+    streak.add_argument("--habit-id", type=int)
+    for command in ("completion-rate", "logs"):
+        analytics.add_parser(command, help=f"{command} of a habit").add_argument("--habit-id", required=True,
+                                                                                 type=int)
+
+    batch = groups.add_parser("batch", help="apply operations from a JSON or CSV file")
+    batch.add_argument("file")
+    batch.add_argument("--format", choices=["json", "csv"], help="defaults to the file extension")
+    batch.add_argument("--batch-size", type=int, default=1000, help="operations per transaction")
+    return parser
+
+
+def _add_user_arguments(parser):
+    parser.add_argument("--user", help="username")
+    parser.add_argument("--user-id", type=int)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+
+    def emit(obj):
+        out.write(json.dumps(obj, default=str) + "\n")
+
+    configure_logging()
+    with redirect_stdout(sys.stderr):  # Keep any stray prints out of the machine-readable output
+        create_tables()
+        if args.group == "batch":
+            records = read_batch_file(args.file, args.format)
+            failed = run_batches(records, max(1, args.batch_size), emit)
+        else:
+            record = {key: value for key, value in vars(args).items() if key not in ("group", "command")}
+            record["op"] = f"{args.group}.{args.command}"
+            failed = run_batches([record], 1, emit, summaries=False)
+    return 1 if failed else 0
@@ -0,0 +1,105 @@
+from app.analytics import get_active_habits
+from storage import changes
+from storage.changes import ChangeEvent
+from storage.db_manager import get_habit_by_id, get_outbox_position, read_outbox
+
+# Events naming a habit whose row may have changed, and events after which every row is reloaded
+ROW_EVENTS = {changes.HABIT_CREATED, changes.HABIT_UPDATED, changes.HABIT_DELETED}
+RELOAD_EVENTS = {changes.TABLE_CLEARED, changes.OVERFLOW}
+
+OUTBOX_BATCH = 1000  # A view that is further behind on the outbox reloads instead of catching up
+
+
+class DashboardView:
+    """Cached view model of the active habits table shown on a user's dashboard.
+
+    The rows are loaded once. After that, refresh() reads the change events of the user's habits and reloads only
+    the rows they name; every row is reloaded only after a table was cleared or the event queue overflowed.
+
+    Events come from the in-process change feed, so writes of other processes, such as the server or the sweeper,
+    are only seen when the outbox is enabled (HABIT_TRACKER_OUTBOX=1) in them and in this process: the view then
+    also tails the ChangeOutbox table.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._rows = None  # habit_id -> row cells, in display order; None until loaded
+        self._subscription = changes.subscribe(ROW_EVENTS | RELOAD_EVENTS)
+        self._outbox_position = None  # ID of the last outbox event read
+        # Habit IDs of the rows the last refresh added, updated and removed, and whether it reloaded every row
+        self.added, self.updated, self.removed = [], [], []
+        self.reloaded = False
+        self.rebuilt_rows = 0  # Rows rebuilt by the last refresh
+
+    def refresh(self):
+        # Bring the view up to date and return True if it changed since the last refresh
+        self.added, self.updated, self.removed = [], [], []
+        self.reloaded = False
+        self.rebuilt_rows = 0
+
+        habit_ids = set()
+        reload = self._rows is None
+        for event in self._events():
+            if event.kind in RELOAD_EVENTS:
+                reload = True
+            elif event.kind in ROW_EVENTS and event.user_id == self.user_id:
+                habit_ids.add(event.habit_id)
+        if reload:
+            self._load()
+            return True
+
+        for habit_id in sorted(habit_ids):
+            habit = get_habit_by_id(habit_id)
+            if habit is None or not habit.active:
+                if self._rows.pop(habit_id, None) is not None:
+                    self.removed.append(habit_id)
+                continue
+            cells = (habit.name, str(habit.deadline), str(habit.streak))
+            if habit_id not in self._rows:
+                self.added.append(habit_id)
+            elif self._rows[habit_id] != cells:
+                self.updated.append(habit_id)
+            else:
+                continue  # A column that is not shown changed
+            self._rows[habit_id] = cells
+            self.rebuilt_rows += 1
+        return bool(self.added or self.updated or self.removed)
+
+    def _load(self):
+        # Reload every row; the outbox position is taken first, so no later event is skipped
+        if changes.outbox_enabled:
+            self._outbox_position = get_outbox_position()
+        self._rows = {habit['habit_id']: (habit['name'], str(habit['deadline']), str(habit['streak']))
+                      for habit in get_active_habits(self.user_id)}
+        self.reloaded = True
+        self.rebuilt_rows = len(self._rows)
+
+    def _events(self):
+        # Return the events since the last refresh, from the change feed and, if enabled, the outbox
+        events = self._subscription.get(timeout=0)
+        if changes.outbox_enabled and self._outbox_position is not None:
+            batch = read_outbox(self._outbox_position, OUTBOX_BATCH)
+            if len(batch) == OUTBOX_BATCH or batch and batch[0][0] > self._outbox_position + 1:
+                events.append(ChangeEvent(changes.OVERFLOW))  # Too far behind, or events were pruned unread
+            if batch:
+                self._outbox_position = batch[-1][0]
+            events.extend(event for _, event in batch)
+        elif changes.outbox_enabled:
+            events.append(ChangeEvent(changes.OVERFLOW))  # Outbox enabled since the last load; start tailing it
+        return events
+
+    def habit_ids(self):
+        # Return the IDs of the habits shown, in display order
+        return list(self._rows)
+
+    def row(self, habit_id):
+        # Return the cells of a habit's row
+        return self._rows[habit_id]
+
+    def rows(self):
+        # Return the cells of every row, in display order
+        return list(self._rows.values())
+
+    def close(self):
+        # Stop receiving change events
+        self._subscription.close()
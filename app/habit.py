@@ -1,11 +1,31 @@
 from storage.db_manager import (
-    create_habit, get_habits_by_user, update_habit, delete_habit, add_log_entry,
-    count_success_by_habit, count_consecutive_incomplete, get_last_log_entry
+    atomic, create_habit, get_habits_by_user, update_habit, delete_habit, add_log_entry, add_completion,
+    has_completion
 )
-from datetime import datetime, timedelta
+from datetime import datetime
+import logging
+
+from app.habit_state import load_state
+from app.periodicity import get_periodicity
+from app.records import LazyDatetime, row_factory
+
+logger = logging.getLogger(__name__)
 
 
 class Habit:
+    __slots__ = ("habit_id", "user_id", "name", "description", "periodicity", "duration", "active", "_deadline",
+                 "streak", "_created_at")
+
+    # Habit table column -> slot, used to build habits directly from rows
+    COLUMNS = {"habit_id": "habit_id", "user_id": "user_id", "name": "name", "description": "description",
+               "periodicity": "periodicity", "duration": "duration", "active": "active", "deadline": "_deadline",
+               "streak": "streak", "created_at": "_created_at"}
+
+    # Writing methods are @atomic: each runs as one transaction, or joins the caller's transaction() block
+
+    deadline = LazyDatetime()
+    created_at = LazyDatetime()
+
     def __init__(self, habit_id, user_id, name, description, periodicity, duration, deadline, created_at, active=1,
                  streak=0):
         # Initialize a Habit instance with default values
@@ -20,24 +40,37 @@ class Habit:
         self.streak = streak
         self.created_at = created_at
 
+    def to_dict(self):
+        # Return the habit as a JSON serialisable dictionary
+        return {
+            "habit_id": self.habit_id,
+            "user_id": self.user_id,
+            "name": self.name,
+            "description": self.description,
+            "periodicity": self.periodicity,
+            "duration": self.duration,
+            "active": self.active,
+            "deadline": str(self.deadline),
+            "streak": self.streak,
+            "created_at": str(self.created_at)
+        }
+
     @staticmethod
     def calculate_deadline(periodicity, duration, created_at=None):
-        # Calculate the deadline based on periodicity and duration
+        # Calculate the deadline: the same time of day, duration periods after creation
         now = created_at if created_at else datetime.now()
-        if periodicity == "daily":
-            return now + timedelta(days=1 * duration)  # Daily deadline
-        elif periodicity == "weekly":
-            return now + timedelta(days=7 * duration)  # Weekly deadline
-        return now  # Default to now if no periodicity
+        return get_periodicity(periodicity).advance(now, duration)
 
     def add_log_entry(self, success, note, log_time=None):
         # Add a log entry for the habit
         log_time = log_time if log_time else datetime.now()  # Use current time if not provided
         log_id = add_log_entry(self.habit_id, success, note, log_time=log_time)  # Store log entry in database
-        print(f"Log entry added for habit_id {self.habit_id}: success={success}, note={note}")
+        logger.debug("Log entry added for habit_id %s: success=%s, note=%s", self.habit_id, success, note,
+                     extra={"habit_id": self.habit_id, "log_id": log_id})
         return log_id
 
     @staticmethod
+    @atomic
     def create(user_id, name, description, periodicity, duration, streak=None, created_at=None):
         # Create a new habit and store it in the database
         created_at = created_at or datetime.now()  # Use current time if not provided
@@ -49,20 +82,17 @@ class Habit:
         habit = Habit(habit_id, user_id, name, description, periodicity, duration, deadline=deadline, streak=streak,
                       created_at=created_at)
         habit.add_log_entry(success=1, note="Habit created and activated", log_time=created_at)  # Log creation
-        print(f"Habit created: {habit}")
+        logger.debug("Habit created: %s", habit_id, extra={"habit_id": habit_id, "user_id": user_id})
         return habit
 
     @staticmethod
     def get_all_by_user(user_id):
         # Retrieve all habits for a specific user
-        habits_data = get_habits_by_user(user_id)  # Fetch habits from database
-        habits = []
-        for habit_data in habits_data:
-            habit = Habit(*habit_data)  # Create Habit instances from data
-            habits.append(habit)
-        print(f"Retrieved {len(habits)} habits for user_id {user_id}")
+        habits = get_habits_by_user(user_id, row_factory=habit_from_row)  # Rows arrive as Habit instances
+        logger.debug("Retrieved %d habits for user_id %s", len(habits), user_id)
         return habits
 
+    @atomic
     def update(self, name=None, description=None, periodicity=None, duration=None, active=1):
         # Update habit details and log the update
         if name:
@@ -73,42 +103,43 @@ class Habit:
             self.periodicity = periodicity
         if duration is not None:
             self.duration = duration
+        # The deadline counts from the restart event, so the same moment is used for both
+        restarted_at = datetime.now()
         if self.deadline:
-            self.deadline = Habit.calculate_deadline(periodicity, duration, datetime.now())  # Recalculate deadline
+            self.deadline = Habit.calculate_deadline(self.periodicity, self.duration, restarted_at)
 
         update_habit(self.habit_id, name, description, periodicity, duration, active, deadline=self.deadline)
         # Update habit in database
-        self.add_log_entry(success=1, note="Habit restarted and activated")  # Log update
-        print(f"Habit updated: {self}")
+        self.add_log_entry(success=1, note="Habit restarted and activated", log_time=restarted_at)  # Log update
+        logger.debug("Habit updated: %s", self.habit_id, extra={"habit_id": self.habit_id})
 
+    @atomic
     def delete(self):
         # Delete the habit from the database
         delete_habit(self.habit_id)  # Remove habit from database
         self.add_log_entry(success=0, note="Habit deleted")  # Log deletion
-        print(f"Habit deleted: {self.habit_id}")
+        logger.debug("Habit deleted: %s", self.habit_id, extra={"habit_id": self.habit_id})
 
     def can_mark_complete(self):
-        # Determine if the habit can be marked as complete based on its periodicity
-        last_log = get_last_log_entry(self.habit_id)  # Fetch last log entry
-        if not last_log:
-            return True  # No log entry found, can mark as complete
-
-        last_log_time = datetime.strptime(last_log['log_time'], '%Y-%m-%d %H:%M:%S.%f').timestamp()
-        now = datetime.now().timestamp()
-
-        if self.periodicity == 'daily' and self.streak != 0:
-            return (now - last_log_time) >= 86400  # Check daily periodicity (86400 seconds in a day)
-        elif self.periodicity == 'weekly' and self.streak != 0:
-            return (now - last_log_time) >= 604800  # Check weekly periodicity (604800 seconds in a week)
-
-        return True  # Default to allow marking as complete
+        # Determine if the current period of the habit is still open for a completion
+        return not has_completion(self.habit_id, get_periodicity(self.periodicity).key(datetime.now()))
+
+    def mark_complete(self, completed_at=None):
+        # Log a completion for the period containing completed_at; returns None if that period is already completed
+        completed_at = completed_at or datetime.now()
+        period_key = get_periodicity(self.periodicity).key(completed_at)
+        log_id = add_completion(self.habit_id, period_key, completed_at)  # Atomic: at most one per period
+        logger.debug("Completion logged for habit_id %s in period %s: %s", self.habit_id, period_key, log_id,
+                     extra={"habit_id": self.habit_id, "log_id": log_id})
+        return log_id
 
+    @atomic
     def update_status(self):
-        # Update the habit status and log the result
+        # Update the habit status, log the result and return True if a completion was logged
         if not self.active:
             self.add_log_entry(success=0, note="Habit update failed - habit inactive")  # Log failure
-            print(f"Failed to update status for inactive habit: {self.habit_id}")
-            return
+            logger.info("Failed to update status for inactive habit: %s", self.habit_id)
+            return False
 
         current_time = datetime.now().timestamp()
         deadline_time = self.deadline.timestamp()
@@ -116,14 +147,16 @@ class Habit:
         if current_time > deadline_time:
             self.add_log_entry(success=0, note="Habit marked as incomplete")  # Log incomplete status
             self.streak = Habit.calculate_streak(self.habit_id)  # Recalculate streak
-        else:
-            if self.can_mark_complete():
-                self.add_log_entry(success=1, note="Habit completed successfully on time")  # Log successful completion
-                self.streak = Habit.calculate_streak(self.habit_id)  # Recalculate streak
-                print(f"Habit '{self.name}' marked as complete. Streak: {self.streak}")
-            else:
-                print(f"Habit '{self.name}' cannot be marked as complete yet. Please wait until the next period.")
-
+            return False
+        if self.mark_complete() is None:  # Log successful completion, once per period
+            logger.info("Habit '%s' cannot be marked as complete yet. Please wait until the next period.", self.name)
+            return False
+        self.streak = Habit.calculate_streak(self.habit_id)  # Recalculate streak
+        logger.info("Habit '%s' marked as complete. Streak: %s", self.name, self.streak,
+                    extra={"habit_id": self.habit_id, "streak": self.streak})
+        return True
+
+    @atomic
     def deactivate(self):
         # Deactivate the habit if its deadline has passed
         current_time = int(datetime.now().timestamp())
@@ -132,23 +165,21 @@ class Habit:
             self.active = 0
             update_habit(self.habit_id, active=0)  # Update active status in database
             self.add_log_entry(success=0, note="Habit deactivated - deadline exceeded")  # Log deactivation
-            print(f"Habit '{self.name}' deactivated due to deadline exceedance.")
+            logger.info("Habit '%s' deactivated due to deadline exceedance.", self.name)
         elif self.active and deadline_time > current_time:
-            print(f"Habit '{self.name}' is not overdue yet")
+            logger.info("Habit '%s' is not overdue yet", self.name)
         else:
-            print(f"Habit '{self.name}' is already deactivated")
+            logger.info("Habit '%s' is already deactivated", self.name)
 
     @staticmethod
+    @atomic
     def calculate_streak(habit_id):
-        # Calculate and update the streak for a specific habit
-        success_count = count_success_by_habit(habit_id)  # Count successful logs
-        consecutive_incomplete = count_consecutive_incomplete(habit_id)  # Count consecutive incomplete logs
-
-        if success_count > 0 and consecutive_incomplete < 3:
-            new_streak = success_count  # Set streak based on success count
-        else:
-            new_streak = 0  # Reset streak if conditions are not met
-
+        # Calculate and update the streak for a specific habit from its folded log events
+        new_streak = load_state(habit_id).streak  # Completions, or 0 after three missed periods in a row
         update_habit(habit_id, streak=new_streak)  # Update streak in database
-        print(f"Calculated streak for habit_id {habit_id}: {new_streak}")
+        logger.debug("Calculated streak for habit_id %s: %s", habit_id, new_streak,
+                     extra={"habit_id": habit_id, "streak": new_streak})
         return new_streak
+
+
+habit_from_row = row_factory(Habit)
@@ -0,0 +1,142 @@
+"""Habit state derived from the Log event stream.
+
+The Log table is the authoritative history of a habit; streak, active and deadline are a fold over its events:
+
+    Habit created and activated / Habit restarted and activated   active, deadline counted from it
+    Habit completed successfully on time                           one more completion
+    Habit marked as incomplete                                     miss run grows by one
+    Habit deactivated - deadline exceeded                          inactive
+
+Any event other than a miss ends the miss run, as in db_manager.count_consecutive_incomplete. The streak follows
+Habit.calculate_streak: the number of completions, or 0 once three periods in a row were missed. Every
+SNAPSHOT_INTERVAL events the folded state is stored in HabitSnapshot, so rebuilding a habit reads only the events
+logged since its snapshot. The Habit columns are kept as a projection of the fold, and verify() reports or
+repairs habits whose columns disagree with it:
+
+    python -m app.habit_state --repair
+"""
+import argparse
+import logging
+from contextlib import nullcontext
+from datetime import datetime
+
+from storage.db_manager import (
+    create_tables, get_habit_by_id, get_habit_events, get_habit_snapshot, save_habit_snapshot, transaction,
+    update_habit, create_read_only_connection
+)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_INTERVAL = 50  # Events folded since the last snapshot before a new one is stored
+
+COMPLETED = "Habit completed successfully on time"
+MISSED = "Habit marked as incomplete"
+ACTIVATED = ("Habit created and activated", "Habit restarted and activated")
+DEACTIVATED = "Habit deactivated - deadline exceeded"
+
+
+class HabitState:
+    __slots__ = ("last_log_id", "last_log_time", "completions", "trailing_misses", "active", "activated_at")
+
+    def __init__(self, last_log_id=0, last_log_time=None, completions=0, trailing_misses=0, active=1,
+                 activated_at=None):
+        self.last_log_id = last_log_id
+        self.last_log_time = last_log_time
+        self.completions = completions
+        self.trailing_misses = trailing_misses
+        self.active = active
+        self.activated_at = activated_at
+
+    @property
+    def streak(self):
+        return self.completions if self.completions > 0 and self.trailing_misses < 3 else 0
+
+    def deadline(self, periodicity, duration):
+        # The deadline counted from the last activation, as Habit.create and Habit.update compute it
+        from app.habit import Habit
+
+        if self.activated_at is None:
+            return None
+        activated_at = self.activated_at
+        if isinstance(activated_at, str):
+            activated_at = datetime.fromisoformat(activated_at)
+        return Habit.calculate_deadline(periodicity, duration, activated_at)
+
+
+def fold(state, events):
+    """Apply (log_id, log_time, note) events, in time order, to state and return it."""
+    for log_id, log_time, note in events:
+        state.trailing_misses = state.trailing_misses + 1 if note == MISSED else 0
+        if note == COMPLETED:
+            state.completions += 1
+        elif note in ACTIVATED:
+            state.active = 1
+            state.activated_at = log_time
+        elif note == DEACTIVATED:
+            state.active = 0
+        state.last_log_id = max(state.last_log_id, log_id)
+        state.last_log_time = log_time if state.last_log_time is None else max(state.last_log_time, log_time)
+    return state
+
+
+def load_state(habit_id):
+    """Return the folded state of a habit, starting from its snapshot and storing a new one when due."""
+    snapshot = get_habit_snapshot(habit_id)
+    state = HabitState(**{key: snapshot[key] for key in HabitState.__slots__}) if snapshot else HabitState()
+    events = get_habit_events(habit_id, state.last_log_id)
+    if snapshot and events and events[0][1] < state.last_log_time:
+        # An event was logged for a time before the snapshot, so the snapshot's order is stale; start over
+        state = HabitState()
+        events = get_habit_events(habit_id)
+    fold(state, events)
+    if len(events) >= SNAPSHOT_INTERVAL:
+        save_habit_snapshot(habit_id, *(getattr(state, key) for key in HabitState.__slots__))
+    return state
+
+
+def verify(habit_ids=None, repair=False):
+    """Compare the stored streak, active and deadline columns with the fold and return the mismatches.
+
+    Each mismatch is (habit_id, column, stored, folded). With repair=True the columns are overwritten with the
+    folded values, in one write transaction. Without it every habit is read on its own, outside of a transaction,
+    so writers are not blocked for the length of the scan.
+    """
+    if habit_ids is None:
+        connection = create_read_only_connection()
+        habit_ids = [row[0] for row in connection.execute("SELECT habit_id FROM Habit ORDER BY habit_id")]
+        connection.close()
+
+    mismatches = []
+    with transaction() if repair else nullcontext():
+        for habit_id in habit_ids:
+            habit = get_habit_by_id(habit_id)
+            if habit is None:
+                continue
+            state = load_state(habit_id)
+            folded = {"streak": state.streak, "active": state.active}
+            deadline = state.deadline(habit.periodicity, habit.duration)
+            if deadline is not None:
+                folded["deadline"] = deadline
+            changes = {column: value for column, value in folded.items() if getattr(habit, column) != value}
+            mismatches.extend((habit_id, column, getattr(habit, column), value) for column, value in changes.items())
+            if repair and changes:
+                update_habit(habit_id, **changes)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify habit columns against the state folded from their logs.")
+    parser.add_argument("--habit-id", type=int, action="append", help="defaults to all habits")
+    parser.add_argument("--repair", action="store_true", help="overwrite mismatching columns with the folded state")
+    args = parser.parse_args()
+
+    create_tables()
+    mismatches = verify(args.habit_id, repair=args.repair)
+    for habit_id, column, stored, folded in mismatches:
+        print(f"habit {habit_id}: {column} stored {stored!r}, folded {folded!r}")
+    action = "Repaired" if args.repair else "Found"
+    print(f"{action} {len(mismatches)} mismatching columns in {len({m[0] for m in mismatches})} habits.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+class Lazy:
+    """Stand-in for an object that is only created when it is first used.
+
+    loader is called on the first attribute access or call and its result is used from then on, so modules that
+    are slow to import (rich, pyfiglet) are loaded by the first screen that needs them instead of at startup.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._target = None
+
+    def _resolve(self):
+        if self._target is None:
+            self._target = self._loader()
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
@@ -0,0 +1,46 @@
+"""Logging setup for the entry points.
+
+Library modules only create loggers; an entry point calls configure_logging() once. The default level is WARNING,
+so bulk operations write nothing per row. The level, format and destination can also be set with the
+HABIT_TRACKER_LOG_LEVEL, HABIT_TRACKER_LOG_FORMAT ("text" or "json") and HABIT_TRACKER_LOG_FILE variables.
+"""
+import json
+import logging
+import os
+import sys
+
+# Attributes every LogRecord has; anything else was passed through extra= and belongs in the structured output
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line, including fields passed with extra=."""
+
+    def format(self, record):
+        event = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        event.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            event["exception"] = self.formatException(record.exc_info)
+        return json.dumps(event, default=str)
+
+
+def configure_logging(level=None, json_format=None, filename=None, text_format="%(levelname)s %(name)s: %(message)s"):
+    # Install a single handler on the root logger; arguments override the environment variables
+    level = level or os.environ.get("HABIT_TRACKER_LOG_LEVEL", "WARNING")
+    if json_format is None:
+        json_format = os.environ.get("HABIT_TRACKER_LOG_FORMAT", "text").lower() == "json"
+    filename = filename or os.environ.get("HABIT_TRACKER_LOG_FILE")
+
+    handler = logging.FileHandler(filename, encoding="utf-8") if filename else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(text_format))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    return handler
@@ -1,21 +1,33 @@
 from datetime import datetime
-from rich.table import Table
-from app.analytics import get_active_habits, get_habits_by_periodicity, get_longest_streak_all_habits, \
-    get_completion_rate, analyze_logs
+from importlib import import_module
 from app.habit import Habit
+from app.lazy import Lazy
+from app.logging_config import configure_logging
 from app.user import User
 from storage.db_manager import get_habit_by_id
-import pyfiglet
-from rich.console import Console
-from rich.prompt import Prompt
-from rich.text import Text
 
-console = Console()
+# rich, pyfiglet and app.analytics are imported when the first screen using them is shown, not at startup
+console = Lazy(lambda: import_module("rich.console").Console())
+Prompt = Lazy(lambda: import_module("rich.prompt").Prompt)
+Table = Lazy(lambda: import_module("rich.table").Table)
+Text = Lazy(lambda: import_module("rich.text").Text)
+
+_dashboard_views = {}  # user_id -> (DashboardView, rendered Table or None, habit_id -> Text cells of its row)
+
+
+# Navigation: every screen returns the next screen as a tuple (screen, *args), or None to exit the application.
+# run() drives the screens in a flat loop, so the call stack stays the same size however long a session lasts.
+def run(screen, *args):
+    state = (screen, *args)
+    while state is not None:
+        state = state[0](*state[1:])
 
 
 # Initialize the console for rich text output
 def main_menu():
     # Display ASCII banner and main menu options
+    import pyfiglet
+
     ascii_banner = pyfiglet.figlet_format("""
     Welcome to the
       Habit Tracker
@@ -32,14 +44,14 @@ def main_menu():
         choice = Prompt.ask("Choose an option", choices=["1", "2", "3", "4"], default="4").strip()
 
         if choice == '1':
-            register()
+            return register,
         elif choice == '2':
-            login()
+            return login,
         elif choice == '3':
-            how_to_use()
+            return how_to_use,
         elif choice == '4':
             console.print("Exiting application...")
-            exit(0)  # Terminate the application
+            return None  # Terminate the application
         else:
             console.print("[bold red]Invalid choice. Please select a valid option.[/bold red]")
 
@@ -59,6 +71,7 @@ def how_to_use():
     console.print("[bold]3. Dashboard[/bold]")
     console.print("   - After logging in, you will be taken to your dashboard.")
     console.print("   - From here, you can manage habits, view analytics, and update your profile.")
+    console.print("   - Search finds habits by name or description and log entries by their notes.")
 
     console.print("[bold]4. Profile Management[/bold]")
     console.print("   - Update your username or password, or delete your account.")
@@ -87,7 +100,7 @@ def how_to_use():
 
     console.print("[bold green]Press any key to return to the Main Menu...[/bold green]")
     Prompt.ask("")
-    main_menu()
+    return main_menu,
 
 
 def login():
@@ -98,8 +111,7 @@ def login():
 
     if not user:
         console.print("Username not found. Please check your username and try again.")
-        main_menu()
-        return
+        return main_menu,
 
     if user:
         attempts = 3
@@ -109,8 +121,7 @@ def login():
                 user.update_last_login()
                 console.print(f"Welcome back, {user.username}! Your user ID is {user.user_id}."
                               f" Redirecting to the Dashboard...\n")
-                dashboard(user)
-                return
+                return dashboard, user
             else:
                 attempts -= 1
                 console.print(f"Incorrect password. You have {attempts} attempts left.")
@@ -119,13 +130,13 @@ def login():
         recover_choice = Prompt.ask("Did you forget your password? Would you like to recover it? (yes/no)",
                                     choices=["yes", "no"], default="no")
         if recover_choice == 'yes':
-            forgot_password()
+            return forgot_password,
         else:
             console.print("Returning to the main menu.\n")
-            main_menu()
+            return main_menu,
     else:
         console.print("Username not found. Please try again.\n")
-        main_menu()
+        return main_menu,
 
 
 def forgot_password():
@@ -143,10 +154,10 @@ def forgot_password():
         user.update_last_login()
         console.print(f"Welcome back, {user.username}! Your user ID is {user.user_id}."
                       f" Redirecting to the Dashboard...\n")
-        dashboard(user)
+        return dashboard, user
     else:
         console.print("Invalid username or user ID. Please try again.")
-        main_menu()
+        return main_menu,
 
 
 def register():
@@ -158,8 +169,7 @@ def register():
 
     if password != confirm_password:
         console.print("Passwords do not match. Please try again.\n")
-        register()  # Re-run registration if passwords do not match
-        return
+        return register,  # Re-run registration if passwords do not match
 
     created_at = datetime.now().isoformat()  # or however you manage timestamps in your application
 
@@ -168,30 +178,52 @@ def register():
         console.print(f"Welcome {user.username}! Registration successful. Your user ID is {user.user_id}."
                       f" Redirecting to the Dashboard...\n")
         # Placeholder for redirecting to the Dashboard
-        dashboard(user)
+        return dashboard, user
     except Exception as e:
         console.print(f"Registration failed: {str(e)}. Please try again.\n")
-        register()
+        return register,
+
+
+def update_dashboard_table(view, table, cells):
+    # Apply the rows changed by the view's last refresh and return the table (None without rows) and its cells.
+    # Cells are Text objects edited in place, so only a reload or a removed row rebuilds the table.
+    if table is None or view.reloaded or view.removed:
+        table = Table(title="Your Active Habits")
+        table.add_column("Habit Name", style="cyan", no_wrap=True)
+        table.add_column("Deadline", style="magenta")
+        table.add_column("Streak", style="green")
+        cells = {}
+        added = view.habit_ids()
+    else:
+        added = view.added
+        for habit_id in view.updated:
+            for cell, value in zip(cells[habit_id], view.row(habit_id)):
+                cell.plain = value
 
+    for habit_id in added:
+        cells[habit_id] = tuple(Text(value) for value in view.row(habit_id))
+        table.add_row(*cells[habit_id])
+    return (table if cells else None), cells
 
-def dashboard(user):
-    # Display user dashboard
-    now = datetime.now().strftime("%d %B %Y")
-    console.print(f"Today's date is [bold cyan]{now}[/bold cyan]!")
-    console.print("Remember to mark your habits to maintain your streak!")
 
-    while True:
-        active_habits = get_active_habits(user.user_id)
+def dashboard(user, greet=True):
+    # Display user dashboard; greet is False when returning from one of its own submenus
+    from app.dashboard_view import DashboardView
 
-        if active_habits:
-            table = Table(title="Your Active Habits")
-            table.add_column("Habit Name", style="cyan", no_wrap=True)
-            table.add_column("Deadline", style="magenta")
-            table.add_column("Streak", style="green")
+    if greet:
+        now = datetime.now().strftime("%d %B %Y")
+        console.print(f"Today's date is [bold cyan]{now}[/bold cyan]!")
+        console.print("Remember to mark your habits to maintain your streak!")
 
-            for habit in active_habits:
-                table.add_row(habit['name'], habit['deadline'], str(habit['streak']))
+    # The view and its table are kept for the session; only the rows of habits that changed are updated
+    view, table, cells = _dashboard_views.get(user.user_id) or (DashboardView(user.user_id), None, {})
 
+    while True:
+        if view.refresh():  # Always true on the first refresh of a new view
+            table, cells = update_dashboard_table(view, table, cells)
+            _dashboard_views[user.user_id] = (view, table, cells)
+
+        if table is not None:
             console.print(table)
         else:
             console.print("You have no active habits.")
@@ -201,24 +233,58 @@ def dashboard(user):
         console.print("2. Habit Status Management")
         console.print("3. Profile Management")
         console.print("4. Analytics")
-        console.print("5. Log out")
+        console.print("5. Search Habits and Notes")
+        console.print("6. Log out")
 
-        choice = Prompt.ask("Enter your choice", choices=["1", "2", "3", "4", "5"], default="1").strip()
+        choice = Prompt.ask("Enter your choice", choices=["1", "2", "3", "4", "5", "6"], default="1").strip()
 
         if choice == '1':
-            create_habit(user)
+            return create_habit, user
         elif choice == '2':
-            habit_status_management(user)
+            return habit_status_management, user
         elif choice == '3':
-            profile_management(user)
+            return profile_management, user
         elif choice == '4':
-            analytics(user)
+            return analytics, user
         elif choice == '5':
-            log_out(user)
+            return search_habits, user
+        elif choice == '6':
+            return log_out, user
         else:
             console.print("Invalid choice. Please try again.")
 
 
+def search_habits(user):
+    # Full-text search over the user's habit names, descriptions and log notes
+    from storage.db_manager import search
+
+    query = Prompt.ask("Search for (end a word with * to match its beginning)").strip()
+    results = search(user.user_id, query, limit=20)
+
+    if results:
+        table = Table(title=f"Results for '{query}'")
+        table.add_column("Habit", style="cyan", no_wrap=True)
+        table.add_column("Match")
+        table.add_column("Logged", style="magenta")
+        for result in results:
+            match = Text(result['snippet'] or "")
+            match.highlight_regex(r"\[[^\]]*\]", "bold yellow")  # Matched words come in [brackets]
+            table.add_row(Text(result['name']), match, result['log_time'] or "")
+        console.print(table)
+    else:
+        console.print("No matching habits or notes found.")
+
+    while True:
+        next_step = Prompt.ask("\nEnter '1' to search again or '2' to return to Dashboard", choices=["1", "2"],
+                               default="2").strip()
+        if next_step == '1':
+            return search_habits, user
+        elif next_step == '2':
+            return dashboard, user
+        else:
+            console.print("Invalid choice. Choose 1 or 2.")
+
+
 def create_habit(user):
     # Handle creation of a new habit
     console.print("Create a Habit")
@@ -259,6 +325,7 @@ def create_habit(user):
             f" '[bold]{name}[/bold]' has been created and activated. Your deadline is {habit.deadline}.")
     except Exception as e:
         console.print(f"Failed to create habit: [red]{str(e)}[/red]")
+    return dashboard, user, False
 
 
 def habit_status_management(user):
@@ -273,18 +340,18 @@ def habit_status_management(user):
     choice = Prompt.ask("Enter your choice", choices=["1", "2", "3", "4", "5"], default="5").strip()
 
     if choice == "1":
-        mark_habit_complete(user)
+        return mark_habit_complete, user
     elif choice == "2":
-        deactivate_habits(user)
+        return deactivate_habits, user
     elif choice == '3':
-        update_habit(user)
+        return update_habit, user
     elif choice == '4':
-        delete_habit(user)
+        return delete_habit, user
     elif choice == '5':
-        return
+        return dashboard, user, False
     else:
         console.print("Invalid choice. Please try again.")
-        habit_status_management(user)
+        return habit_status_management, user
 
 
 def mark_habit_complete(user):
@@ -292,7 +359,7 @@ def mark_habit_complete(user):
     habits = get_active_habits_with_names(user.user_id)
     if not habits:
         console.print("No active habits found.")
-        return
+        return dashboard, user, False
     table = Table(title="Active Habits")
     table.add_column("Habit ID", style="cyan")
     table.add_column("Habit Name", style="magenta")
@@ -321,9 +388,8 @@ def mark_habit_complete(user):
         "Enter '1' to Continue or '2' to return to Habit Status Management menu ",
         choices=["1", "2"], default="2")
     if next_step == '1':
-        mark_habit_complete(user)
-    elif next_step == '2':
-        habit_status_management(user)
+        return mark_habit_complete, user
+    return habit_status_management, user
 
 
 def deactivate_habits(user):
@@ -331,7 +397,7 @@ def deactivate_habits(user):
     habits = get_active_habits_with_names(user.user_id)
     if not habits:
         console.print("No active habits found.")
-        return
+        return dashboard, user, False
 
     table = Table(title="Active Habits")
     table.add_column("Habit ID", style="cyan")
@@ -353,18 +419,18 @@ def deactivate_habits(user):
             console.print(f"Habit with ID '{selected_id}' not found.")
     except ValueError:
         console.print("Invalid input. Please enter a valid habit number.")
-        deactivate_habits(user)
+        return deactivate_habits, user
 
     next_step = Prompt.ask(
         "Enter '1' return to Dashboard or '2' to return to Habit Status Management menu or "
         "Press any other key to Continue",
         choices=["1", "2"], default="2")
     if next_step == '1':
-        dashboard(user)
+        return dashboard, user
     elif next_step == '2':
-        habit_status_management(user)
+        return habit_status_management, user
     else:
-        deactivate_habits(user)
+        return deactivate_habits, user
 
 
 def update_habit(user):
@@ -374,7 +440,7 @@ def update_habit(user):
     habits = Habit.get_all_by_user(user.user_id)
     if not habits:
         console.print("No habits found.")
-        return
+        return dashboard, user, False
 
     table = Table(title="Your Habits")
     table.add_column("Number", style="cyan")
@@ -413,6 +479,7 @@ def update_habit(user):
             console.print(f"Invalid choice or input. Please try again. Error: {str(e)}")
         except Exception as e:
             console.print(f"Failed to update habit: {str(e)}")
+    return dashboard, user, False
 
 
 def delete_habit(user):
@@ -422,7 +489,7 @@ def delete_habit(user):
     habits = Habit.get_all_by_user(user.user_id)
     if not habits:
         console.print("No habits found.")
-        return
+        return dashboard, user, False
 
     table = Table(title="Your Habits")
     table.add_column("Number", style="cyan")
@@ -456,11 +523,12 @@ def delete_habit(user):
             "Press any other key to Continue",
             choices=["1", "2"], default="2")
         if next_step == '1':
-            dashboard(user)
+            return dashboard, user
         elif next_step == '2':
-            habit_status_management(user)
+            return habit_status_management, user
         else:
             break
+    return dashboard, user, False
 
 
 def profile_management(user):
@@ -494,7 +562,7 @@ def profile_management(user):
                 if confirmation.lower() == 'yes':
                     user.delete()
                     console.print("Profile deleted successfully. Exiting application...")
-                    main_menu()
+                    return main_menu,
                 elif confirmation.lower() == 'no':
                     console.print("Returning to Profile Management...")
                     break
@@ -503,65 +571,64 @@ def profile_management(user):
 
         elif choice == '3':
             console.print("Returning to the Dashboard...")
-            break
+            return dashboard, user, False
 
         else:
             console.print("Invalid choice. Please select a valid option.")
 
 
 def analytics(user):
-    def analytics_menu():
-        # Display analytics options
-        while True:
-            console.print("\n[bold green]Analytics Menu:[/bold green]")
-            console.print("1. View Habits by Periodicity")
-            console.print("2. View Longest Streak for All Habits")
-            console.print("3. View Longest Streak for a Habit")
-            console.print("4. View Completion Rate for a Habit")
-            console.print("5. Analyze Logs for a Habit")
-            console.print("6. Back to Dashboard")
-
-            choice = Prompt.ask("Enter your choice", choices=["1", "2", "3", "4", "5", "6"], default="6").strip()
-
-            if choice == '1':
-                view_habits_by_periodicity(user)
-            elif choice == '2':
-                view_longest_streak_all_habits(user)
-            elif choice == '3':
-                view_longest_streak_for_habit(user)
-            elif choice == '4':
-                view_completion_rate_for_habit(user)
-            elif choice == '5':
-                analyze_logs_for_habit(user)
-            elif choice == '6':
-                console.log("Returning to dashboard.")
-                dashboard(user)
-                break
-            else:
-                console.log("[bold red]Invalid choice. Please enter a number between 1 and 6.[/bold red]")
-
+    # Display analytics options
     console.log("Entering analytics menu.")
-    analytics_menu()
+    while True:
+        console.print("\n[bold green]Analytics Menu:[/bold green]")
+        console.print("1. View Habits by Periodicity")
+        console.print("2. View Longest Streak for All Habits")
+        console.print("3. View Longest Streak for a Habit")
+        console.print("4. View Completion Rate for a Habit")
+        console.print("5. Analyze Logs for a Habit")
+        console.print("6. Back to Dashboard")
+
+        choice = Prompt.ask("Enter your choice", choices=["1", "2", "3", "4", "5", "6"], default="6").strip()
+
+        if choice == '1':
+            return view_habits_by_periodicity, user
+        elif choice == '2':
+            return view_longest_streak_all_habits, user
+        elif choice == '3':
+            return view_longest_streak_for_habit, user
+        elif choice == '4':
+            return view_completion_rate_for_habit, user
+        elif choice == '5':
+            return analyze_logs_for_habit, user
+        elif choice == '6':
+            console.log("Returning to dashboard.")
+            return dashboard, user
+        else:
+            console.log("[bold red]Invalid choice. Please enter a number between 1 and 6.[/bold red]")
 
 
 def view_habits_by_periodicity(user):
     # Prompts the user to select daily/weekly then views the associated habits
-    while True:
-        periodicity = Prompt.ask("Enter periodicity (daily, weekly)", choices=["daily", "weekly"]).strip().lower()
-        habits_by_periodicity = get_habits_by_periodicity(user.user_id, periodicity)
+    from app.analytics import get_habits_by_periodicity
 
-        if habits_by_periodicity:
-            console.print(f"\nHabits with periodicity '{periodicity}':")
-            for habit in habits_by_periodicity:
-                console.print(f"- {habit['name']}")
-        else:
-            console.print(f"No habits found with periodicity '{periodicity}'.")
+    periodicity = Prompt.ask("Enter periodicity (daily, weekly)", choices=["daily", "weekly"]).strip().lower()
+    habits_by_periodicity = get_habits_by_periodicity(user.user_id, periodicity)
 
-        handle_return_option(user, view_habits_by_periodicity)
+    if habits_by_periodicity:
+        console.print(f"\nHabits with periodicity '{periodicity}':")
+        for habit in habits_by_periodicity:
+            console.print(f"- {habit['name']}")
+    else:
+        console.print(f"No habits found with periodicity '{periodicity}'.")
+
+    return handle_return_option(user, view_habits_by_periodicity)
 
 
 def view_longest_streak_all_habits(user):
     # Views the habit with the longest streak
+    from app.analytics import get_longest_streak_all_habits
+
     longest_streak_habit = get_longest_streak_all_habits(user.user_id)
 
     if longest_streak_habit:
@@ -574,7 +641,7 @@ def view_longest_streak_all_habits(user):
     else:
         console.print("No streak information found.")
 
-    handle_return_option(user, view_longest_streak_all_habits)
+    return handle_return_option(user, view_longest_streak_all_habits)
 
 
 def view_longest_streak_for_habit(user):
@@ -583,7 +650,7 @@ def view_longest_streak_for_habit(user):
 
     if not habits:
         console.print("No active habits found.")
-        return
+        return analytics, user
 
     console.print("\nActive Habits with Longest Streaks:")
     for habit_id, name in habits.items():
@@ -597,16 +664,18 @@ def view_longest_streak_for_habit(user):
         else:
             console.print(f"- {name}: No streak found")
 
-    handle_return_option(user, view_longest_streak_for_habit)
+    return handle_return_option(user, view_longest_streak_for_habit)
 
 
 def view_completion_rate_for_habit(user):
     # Views the completion rate of a selected habit
+    from app.analytics import get_completion_rate
+
     habits = get_active_habits_with_names(user.user_id)
 
     if not habits:
         console.print("No active habits found.")
-        return
+        return analytics, user
 
     console.print("\nActive Habits:")
     for habit_id, name in habits.items():
@@ -627,16 +696,18 @@ def view_completion_rate_for_habit(user):
     except ValueError:
         console.print("Invalid input. Please enter a valid habit number.")
 
-    handle_return_option(user, view_completion_rate_for_habit)
+    return handle_return_option(user, view_completion_rate_for_habit)
 
 
 def analyze_logs_for_habit(user):
     # Analyses the logs of a selected habit
+    from app.analytics import analyze_logs
+
     habits = get_active_habits_with_names(user.user_id)
 
     if not habits:
         console.print("No active habits found.")
-        return
+        return analytics, user
 
     console.print("\nActive Habits:")
     for habit_id, name in habits.items():
@@ -665,30 +736,33 @@ def analyze_logs_for_habit(user):
     except ValueError:
         console.print("Invalid input. Please enter a valid habit number.")
 
-    handle_return_option(user, analyze_logs_for_habit)
+    return handle_return_option(user, analyze_logs_for_habit)
 
 
 # Helper Function
 def get_active_habits_with_names(user_id):
+    from app.analytics import get_active_habits
+
     habits_data = get_active_habits(user_id)
     return {habit['habit_id']: habit['name'] for habit in habits_data}
 
 
 # Helper Function
 def handle_return_option(user, current_function):
-    next_step = Prompt.ask(
-        "\nEnter '1' to return to Analytics menu or '2' to return to Dashboard or '3' to make another analysis",
-        choices=["1", "2", "3"], default="2").strip()
+    # Returns the screen chosen after an analysis
+    while True:
+        next_step = Prompt.ask(
+            "\nEnter '1' to return to Analytics menu or '2' to return to Dashboard or '3' to make another analysis",
+            choices=["1", "2", "3"], default="2").strip()
 
-    if next_step == '1':
-        analytics(user)
-    elif next_step == '2':
-        dashboard(user)
-    elif next_step == '3':
-        current_function(user)
-    else:
-        console.print("Invalid choice. Choose 1, 2, or 3.")
-        handle_return_option(user, current_function)
+        if next_step == '1':
+            return analytics, user
+        elif next_step == '2':
+            return dashboard, user
+        elif next_step == '3':
+            return current_function, user
+        else:
+            console.print("Invalid choice. Choose 1, 2, or 3.")
 
 
 def log_out(user):
@@ -696,16 +770,19 @@ def log_out(user):
     while True:
         confirmation = Prompt.ask("Are you sure you want to log out? (yes/no)", choices=["yes", "no"], default="no")
         if confirmation.lower() == 'yes':
+            if user.user_id in _dashboard_views:
+                _dashboard_views.pop(user.user_id)[0].close()
             console.print("You have been logged out.")
-            main_menu()
+            return main_menu,
         elif confirmation.lower() == 'no':
             console.print("Returning to the Dashboard...")
-            dashboard(user)
-            return
+            return dashboard, user
         else:
             console.print("Invalid input. Please enter 'yes' or 'no'.")
 
 
 if __name__ == "__main__":
-    main_menu()
+    # Outcome messages of habit actions are logged at INFO; show them plainly in the interactive app
+    configure_logging(level="INFO", text_format="%(message)s")
+    run(main_menu)
 
@@ -0,0 +1,146 @@
+"""Password hashing with per-user salts and tunable cost.
+
+Hashes are stored as self-describing strings so the algorithm, cost parameters and salt travel with the hash:
+
+    scrypt$<n>$<r>$<p>$<salt>$<hash>
+    pbkdf2_sha256$<iterations>$<salt>$<hash>
+
+Unsalted SHA-256 hex digests written by earlier versions are still accepted and reported by needs_rehash(), so
+they are upgraded the next time their owner logs in.
+
+The default hasher can be chosen with the HABIT_TRACKER_KDF environment variable, e.g. "scrypt:n=32768,r=8,p=1"
+or "pbkdf2_sha256:iterations=600000"; benchmarks/kdf_calibrate.py suggests values for a target latency.
+"""
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+SALT_BYTES = 16
+
+
+class ScryptHasher:
+    algorithm = "scrypt"
+
+    def __init__(self, n=2 ** 14, r=8, p=1):
+        # n is the CPU/memory cost (a power of two), r the block size and p the parallelisation factor
+        self.n = n
+        self.r = r
+        self.p = p
+
+    def _derive(self, password, salt, n, r, p):
+        return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * r * (n + p + 2), dklen=32)
+
+    def encode(self, password, salt=None):
+        salt = salt or os.urandom(SALT_BYTES)
+        digest = self._derive(password, salt, self.n, self.r, self.p)
+        return f"{self.algorithm}${self.n}${self.r}${self.p}${salt.hex()}${digest.hex()}"
+
+    def verify(self, password, encoded):
+        _, n, r, p, salt, digest = encoded.split("$")
+        derived = self._derive(password, bytes.fromhex(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(derived.hex(), digest)
+
+    def needs_rehash(self, encoded):
+        return encoded.split("$")[1:4] != [str(self.n), str(self.r), str(self.p)]
+
+
+class Pbkdf2Hasher:
+    algorithm = "pbkdf2_sha256"
+
+    def __init__(self, iterations=600000):
+        self.iterations = iterations
+
+    def _derive(self, password, salt, iterations):
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+    def encode(self, password, salt=None):
+        salt = salt or os.urandom(SALT_BYTES)
+        digest = self._derive(password, salt, self.iterations)
+        return f"{self.algorithm}${self.iterations}${salt.hex()}${digest.hex()}"
+
+    def verify(self, password, encoded):
+        _, iterations, salt, digest = encoded.split("$")
+        derived = self._derive(password, bytes.fromhex(salt), int(iterations))
+        return hmac.compare_digest(derived.hex(), digest)
+
+    def needs_rehash(self, encoded):
+        return encoded.split("$")[1] != str(self.iterations)
+
+
+class LegacySha256Hasher:
+    """Verifies the unsalted SHA-256 hashes of earlier versions; never used for new hashes."""
+
+    algorithm = "sha256"
+
+    def verify(self, password, encoded):
+        return hmac.compare_digest(hashlib.sha256(password.encode("utf-8")).hexdigest(), encoded)
+
+    def needs_rehash(self, encoded):
+        return True
+
+
+_hashers = {hasher.algorithm: hasher for hasher in (ScryptHasher(), Pbkdf2Hasher())}
+_legacy = LegacySha256Hasher()
+default_hasher = _hashers[ScryptHasher.algorithm]
+
+# KDFs release the GIL, so verifications on this pool run in parallel and keep request threads responsive
+_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="password-hasher")
+
+
+def set_default_hasher(hasher):
+    # Use hasher (and its cost parameters) for new hashes; hashes made with other parameters will be upgraded
+    global default_hasher
+    default_hasher = hasher
+    _hashers[hasher.algorithm] = hasher
+
+
+def hasher_from_spec(spec):
+    # Build a hasher from an "algorithm:name=value,..." specification
+    algorithm, _, params = spec.partition(":")
+    kwargs = {name.strip(): int(value) for name, value in
+              (item.split("=") for item in params.split(",") if item.strip())}
+    hashers = {ScryptHasher.algorithm: ScryptHasher, Pbkdf2Hasher.algorithm: Pbkdf2Hasher}
+    if algorithm not in hashers:
+        raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+    return hashers[algorithm](**kwargs)
+
+
+if os.environ.get("HABIT_TRACKER_KDF"):
+    set_default_hasher(hasher_from_spec(os.environ["HABIT_TRACKER_KDF"]))
+
+
+def _hasher_for(encoded):
+    algorithm = encoded.split("$", 1)[0] if "$" in encoded else _legacy.algorithm
+    if algorithm == _legacy.algorithm:
+        return _legacy
+    if algorithm not in _hashers:
+        raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+    return _hashers[algorithm]
+
+
+def hash_password(password):
+    # Return the encoded hash of password using the default hasher and a fresh salt
+    return default_hasher.encode(password)
+
+
+def verify_password(password, encoded):
+    # Return True if password matches the encoded hash
+    if not encoded:
+        return False
+    try:
+        return _hasher_for(encoded).verify(password, encoded)
+    except ValueError:
+        return False  # Unknown algorithm or malformed hash
+
+
+def verify_password_async(password, encoded):
+    # Verify on the hashing pool and return a Future of the result
+    return _executor.submit(verify_password, password, encoded)
+
+
+def needs_rehash(encoded):
+    # Return True if encoded was not made by the default hasher with its current parameters
+    hasher = _hasher_for(encoded)
+    return hasher is not default_hasher or hasher.needs_rehash(encoded)
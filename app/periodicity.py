@@ -0,0 +1,152 @@
+"""Calendar-aware habit periodicities.
+
+A periodicity splits the calendar into numbered periods that start at local midnight. index() maps a timestamp to
+its period number with a few integer operations, so "already completed this period?" and "which period was
+missed?" become integer comparisons, and period boundaries follow the calendar instead of fixed numbers of
+seconds, so they do not drift across DST changes or months of different length.
+
+Periodicities are written as strings, as stored in the Habit table:
+
+    daily                   one period per day
+    weekly                  Monday to Sunday
+    monthly                 calendar months
+    every:3                 blocks of 3 days
+    weekdays:mon,wed,fri    from each listed weekday to the next listed one
+
+Timestamps without a timezone are taken as local wall-clock time, as the rest of the application stores them. With
+a timezone (the tz argument or HABIT_TRACKER_TIMEZONE), aware timestamps are converted to it first and period
+boundaries are returned as aware datetimes.
+"""
+import os
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+_EPOCH = date(2000, 1, 3).toordinal()  # A Monday; day and week numbers count from here
+
+
+class Periodicity:
+    """Base class mapping timestamps to period numbers and back."""
+
+    def __init__(self, spec, tz=None):
+        self.spec = spec
+        self.tz = tz
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.spec!r})"
+
+    def _wall_time(self, moment):
+        # Return moment as naive local wall-clock time
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(self.tz) if self.tz else moment.astimezone()
+            moment = moment.replace(tzinfo=None)
+        return moment
+
+    def _index_of(self, day):
+        raise NotImplementedError
+
+    def _first_day(self, index):
+        raise NotImplementedError
+
+    def _midnight(self, index):
+        day = self._first_day(index)
+        return datetime(day.year, day.month, day.day)
+
+    def index(self, moment):
+        # Return the number of the period containing moment
+        return self._index_of(self._wall_time(moment).date())
+
+    def key(self, moment):
+        # Return a key naming the period containing moment, unique across periodicities
+        return f"{self.spec}/{self.index(moment)}"
+
+    def start(self, index):
+        # Return the local midnight at which period index begins
+        return self._midnight(index).replace(tzinfo=self.tz)
+
+    def bounds(self, index):
+        # Return (start, end) of period index; end is the start of the next period
+        return self.start(index), self.start(index + 1)
+
+    def advance(self, moment, count):
+        # Return the same wall-clock time and day offset count periods later, capped to the last day of that
+        # period (e.g. January 31st plus one month is February 28th or 29th)
+        wall = self._wall_time(moment)
+        index = self._index_of(wall.date())
+        offset = wall - self._midnight(index)
+        start, end = self._midnight(index + count), self._midnight(index + count + 1)
+        days = min(offset.days, (end - start).days - 1)
+        result = start + timedelta(days=days, seconds=offset.seconds, microseconds=offset.microseconds)
+        if moment.tzinfo is None:
+            return result
+        return result.replace(tzinfo=self.tz) if self.tz else result.astimezone()
+
+
+class EveryNDays(Periodicity):
+    def __init__(self, spec, days, tz=None):
+        super().__init__(spec, tz)
+        if days < 1:
+            raise ValueError(f"Period length must be at least one day: {spec}")
+        self.days = days
+
+    def _index_of(self, day):
+        return (day.toordinal() - _EPOCH) // self.days
+
+    def _first_day(self, index):
+        return date.fromordinal(_EPOCH + index * self.days)
+
+
+class Monthly(Periodicity):
+    def _index_of(self, day):
+        return day.year * 12 + day.month - 1
+
+    def _first_day(self, index):
+        year, month = divmod(index, 12)
+        return date(year, month + 1, 1)
+
+
+class WeekdaySet(Periodicity):
+    """Periods run from one scheduled weekday up to the next scheduled weekday."""
+
+    def __init__(self, spec, weekdays, tz=None):
+        super().__init__(spec, tz)
+        self.weekdays = sorted(set(weekdays))
+        if not self.weekdays:
+            raise ValueError(f"No weekdays given: {spec}")
+        # Precomputed per weekday: how many scheduled days of the week have begun by then, minus one
+        self._position = [sum(scheduled <= weekday for scheduled in self.weekdays) - 1 for weekday in range(7)]
+
+    def _index_of(self, day):
+        week, weekday = divmod(day.toordinal() - _EPOCH, 7)
+        return week * len(self.weekdays) + self._position[weekday]
+
+    def _first_day(self, index):
+        week, position = divmod(index, len(self.weekdays))
+        return date.fromordinal(_EPOCH + week * 7 + self.weekdays[position])
+
+
+def _default_tz():
+    name = os.environ.get("HABIT_TRACKER_TIMEZONE")
+    return ZoneInfo(name) if name else None
+
+
+@lru_cache(maxsize=None)
+def get_periodicity(spec, tz=None):
+    """Return the Periodicity for a periodicity string, raising ValueError for unknown ones."""
+    tz = tz or _default_tz()
+    kind, _, argument = spec.strip().lower().partition(":")
+    if kind == "daily" and not argument:
+        return EveryNDays(spec, 1, tz)
+    if kind == "weekly" and not argument:
+        return EveryNDays(spec, 7, tz)  # The epoch is a Monday, so 7-day blocks are Monday-based weeks
+    if kind == "monthly" and not argument:
+        return Monthly(spec, tz)
+    if kind == "every" and argument.isdigit():
+        return EveryNDays(spec, int(argument), tz)
+    if kind == "weekdays" and argument:
+        names = [name.strip()[:3] for name in argument.split(",")]
+        if all(name in WEEKDAYS for name in names):
+            return WeekdaySet(spec, [WEEKDAYS.index(name) for name in names], tz)
+    raise ValueError(f"Unknown periodicity: {spec}")
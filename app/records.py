@@ -0,0 +1,62 @@
+"""Helpers for the slotted Habit and User records.
+
+Records declare ``__slots__`` instead of carrying a ``__dict__``, and are built straight from cursor rows by the
+row factory returned by row_factory(), which maps columns by name rather than by position. Timestamp columns are
+kept as stored and only parsed into datetimes when first read.
+"""
+from datetime import datetime
+
+
+class LazyDatetime:
+    """Descriptor for a timestamp stored in the slot ``_<name>`` and parsed on first access."""
+
+    def __set_name__(self, owner, name):
+        self.slot = f"_{name}"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot)
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+            setattr(instance, self.slot, value)
+        return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.slot, value)
+
+
+def _builder(cls, slots):
+    # Return a function that fills the given slots (None for skipped columns) of a new instance from a row. The
+    # slots' member descriptors are looked up once, so building a record costs one __set__ call per column.
+    setters = tuple((index, getattr(cls, slot).__set__) for index, slot in enumerate(slots) if slot is not None)
+    new = cls.__new__
+
+    def build(row):
+        record = new(cls)
+        for index, setter in setters:
+            setter(record, row[index])
+        return record
+    return build
+
+
+def row_factory(cls):
+    """Return an sqlite3 row factory building instances of cls from rows.
+
+    cls.COLUMNS maps column names to the slots they fill; other columns are ignored. The constructor is bypassed and
+    the slots are filled by a function built once per distinct column list.
+    """
+    columns = cls.COLUMNS
+    builders = {}
+    cache = [(None, None)]  # Last cursor description and its builder, replaced as one tuple
+
+    def factory(cursor, row):
+        description = cursor.description
+        cached = cache[0]
+        if cached[0] is not description:
+            slots = tuple(columns.get(column[0]) for column in description)
+            if slots not in builders:
+                builders[slots] = _builder(cls, slots)
+            cached = cache[0] = (description, builders[slots])
+        return cached[1](row)
+    return factory
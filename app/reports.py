@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.logging_config import configure_logging
+from storage import db_manager
+
+QUERY_CHUNK = 500  # Users per query, well below SQLite's bound parameter limit
+
+_worker_connection = None
+
+
+def _init_worker(db_file):
+    # Open the read-only connection this worker process uses for all of its users
+    global _worker_connection
+    db_manager.DB_FILE = db_file
+    _worker_connection = db_manager.create_read_only_connection()
+    _worker_connection.row_factory = sqlite3.Row
+
+
+def build_reports(connection, user_ids):
+    """Compute the analytics bundle of several users with a few aggregate queries.
+
+    The bundle holds the same figures as app.analytics: active habits, the habit with the longest streak and,
+    per habit, the completion rate and log analysis.
+    """
+    placeholders = ", ".join("?" * len(user_ids))
+    habits = connection.execute(f"""
+    SELECT * FROM Habit WHERE user_id IN ({placeholders}) ORDER BY habit_id
+    """, user_ids).fetchall()
+    counts = {row['habit_id']: row for row in connection.execute(f"""
+    SELECT l.habit_id,
+           COUNT(*) AS total_logs,
+           SUM(l.success = 1) AS success_logs,
+           SUM(l.success = 0) AS failure_logs,
+           SUM(l.note = 'Habit completed successfully on time') AS completed_habits,
+           SUM(l.note = 'Habit marked as incomplete') AS failure_habits
+    FROM Log AS l JOIN Habit AS h ON h.habit_id = l.habit_id
+    WHERE h.user_id IN ({placeholders})
+    GROUP BY l.habit_id
+    """, user_ids)}
+    notes = defaultdict(list)
+    for row in connection.execute(f"""
+    SELECT DISTINCT l.habit_id, l.note
+    FROM Log AS l JOIN Habit AS h ON h.habit_id = l.habit_id
+    WHERE h.user_id IN ({placeholders})
+    """, user_ids):
+        notes[row['habit_id']].append(row['note'])
+
+    reports = {user_id: {"user_id": user_id, "active_habits": [], "longest_streak": None, "habits": []}
+               for user_id in user_ids}
+    for habit in habits:
+        report = reports[habit['user_id']]
+        habit_data = dict(habit)
+        row = counts.get(habit['habit_id'])
+        analysis = {
+            "total_logs": row['total_logs'] if row else 0,
+            "success_logs": row['success_logs'] if row else 0,
+            "failure_logs": row['failure_logs'] if row else 0,
+            "completed_habits": row['completed_habits'] if row else 0,
+            "failure_habits": row['failure_habits'] if row else 0,
+            "notes": notes[habit['habit_id']]
+        }
+        total = analysis["completed_habits"] + analysis["failure_habits"]
+        habit_data["completion_rate"] = (analysis["completed_habits"] / total) * 100 if total > 0 else 0
+        habit_data["log_analysis"] = analysis
+
+        report["habits"].append(habit_data)
+        if habit['active'] == 1:
+            report["active_habits"].append(habit['habit_id'])
+        if report["longest_streak"] is None or habit['streak'] > report["longest_streak"]["streak"]:
+            report["longest_streak"] = {"habit_id": habit['habit_id'], "name": habit['name'],
+                                        "streak": habit['streak']}
+    return reports
+
+
+def _write_reports(user_ids, output_dir):
+    # Worker task: build and write the reports of a partition of users, returning timing information
+    start = time.perf_counter()
+    for offset in range(0, len(user_ids), QUERY_CHUNK):
+        chunk = user_ids[offset:offset + QUERY_CHUNK]
+        for user_id, report in build_reports(_worker_connection, chunk).items():
+            with open(Path(output_dir) / f"user_{user_id}.json", "w", encoding="utf-8") as file:
+                json.dump(report, file, default=str)
+    return os.getpid(), len(user_ids), time.perf_counter() - start
+
+
+def generate_reports(output_dir, workers=None, partitions_per_worker=4):
+    """Write one JSON report per user, spreading the users over a process pool."""
+    workers = workers or os.cpu_count() or 1
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    user_ids = db_manager.get_user_ids()
+    partitions = max(1, workers * partitions_per_worker)
+    size = max(1, -(-len(user_ids) // partitions))  # Ceiling division
+    batches = [user_ids[i:i + size] for i in range(0, len(user_ids), size)]
+
+    start = time.perf_counter()
+    worker_stats = defaultdict(lambda: {"users": 0, "seconds": 0.0, "batches": 0})
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(db_manager.DB_FILE),)) as executor:
+        for pid, users, seconds in executor.map(_write_reports, batches, [str(output_dir)] * len(batches)):
+            worker_stats[pid]["users"] += users
+            worker_stats[pid]["seconds"] += seconds
+            worker_stats[pid]["batches"] += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"Wrote {len(user_ids)} reports to {output_dir} in {elapsed:.2f}s "
+          f"({len(user_ids) / elapsed if elapsed else 0:.1f} users/s) using {workers} workers.")
+    for pid, stats in sorted(worker_stats.items()):
+        print(f"  worker {pid}: {stats['users']} users in {stats['batches']} batches, {stats['seconds']:.2f}s busy")
+    return {"users": len(user_ids), "seconds": elapsed, "workers": dict(worker_stats)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate analytics reports for all users.")
+    parser.add_argument("--output", default="reports", help="directory for the per-user JSON files")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    args = parser.parse_args()
+    configure_logging()
+    generate_reports(args.output, args.workers)
+
+
+if __name__ == "__main__":
+    main()
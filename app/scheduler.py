@@ -0,0 +1,117 @@
+import argparse
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app.habit_state import load_state
+from app.logging_config import configure_logging
+from app.periodicity import get_periodicity
+from storage.db_manager import create_tables, get_periodicities, record_missed_periods, transaction, update_streaks
+
+logger = logging.getLogger(__name__)
+
+PERIODICITIES = ("daily", "weekly")
+
+
+def period_start(periodicity, moment):
+    # Return the start of the period containing moment, as naive local time like the stored log times
+    schedule = get_periodicity(periodicity)
+    return schedule.start(schedule.index(moment)).replace(tzinfo=None)
+
+
+def previous_period(periodicity, now=None):
+    # Return (start, end) of the last period that has fully elapsed at now
+    schedule = get_periodicity(periodicity)
+    start, end = schedule.bounds(schedule.index(now or datetime.now()) - 1)
+    return start.replace(tzinfo=None), end.replace(tzinfo=None)
+
+
+class MissedPeriodScheduler:
+    """Records missed daily/weekly periods for all users at each period boundary."""
+
+    def __init__(self, shards=4):
+        # Habits are partitioned into shards by user_id; every shard is processed by its own worker
+        self.shards = shards
+        self.runs = 0
+        self.missed_total = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def run_period(self, periodicity, start, end):
+        # Mark every active habit without a completion in [start, end) as incomplete and refresh its streak
+        with ThreadPoolExecutor(max_workers=self.shards) as executor:
+            results = executor.map(lambda shard: self._run_shard(periodicity, start, end, shard), range(self.shards))
+            missed = [habit_id for shard_missed in results for habit_id in shard_missed]
+        self.runs += 1
+        self.missed_total += len(missed)
+        logger.info("Recorded %d missed %s periods ending %s.", len(missed), periodicity, end,
+                    extra={"periodicity": periodicity, "rows_touched": len(missed)})
+        return missed
+
+    def _run_shard(self, periodicity, start, end, shard):
+        # Record one shard's misses and store the refolded streaks of its missed habits in the same transaction,
+        # so streaks reflect the missed period without user interaction
+        with transaction():
+            missed = record_missed_periods(periodicity, start, end, shard, self.shards)
+            update_streaks({habit_id: load_state(habit_id).streak for habit_id in missed})
+        return missed
+
+    def run_due(self, now=None):
+        # Process the last elapsed period of every periodicity in use; safe to call repeatedly for the same period
+        now = now or datetime.now()
+        results = {}
+        for periodicity in sorted(set(PERIODICITIES) | set(get_periodicities())):
+            try:
+                bounds = previous_period(periodicity, now)
+            except ValueError:
+                logger.warning("Skipping habits with unknown periodicity %r", periodicity)
+                continue
+            results[periodicity] = self.run_period(periodicity, *bounds)
+        return results
+
+    def start(self):
+        # Start processing period boundaries in a daemon thread
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="missed-period-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        # Ask the scheduler thread to finish and wait for it
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.run_due()
+            now = datetime.now()
+            next_boundary = period_start("daily", now) + timedelta(days=1)  # Every period boundary is a midnight
+            self._stop_event.wait((next_boundary - now).total_seconds())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record missed habit periods for all users.")
+    parser.add_argument("--shards", type=int, default=4, help="number of parallel user shards")
+    parser.add_argument("--once", action="store_true", help="process the last elapsed periods and exit")
+    args = parser.parse_args()
+
+    configure_logging()
+    create_tables()
+    scheduler = MissedPeriodScheduler(shards=args.shards)
+    if args.once:
+        scheduler.run_due()
+        return
+
+    scheduler.start()
+    try:
+        while scheduler._thread.is_alive():
+            scheduler._thread.join(1)
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
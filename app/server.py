@@ -0,0 +1,305 @@
+import argparse
+import json
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from app.analytics import (
+    get_active_habits, get_longest_streak_all_habits, get_longest_streak_for_habit, get_completion_rate,
+    analyze_logs
+)
+from app.habit import Habit
+from app.logging_config import configure_logging
+from app.user import User
+from storage.db_manager import create_tables, get_habit_by_id
+
+SESSION_TTL_S = 3600  # Sessions idle for longer have to log in again
+IDLE_TIMEOUT_S = 5  # Kept-alive connections idle for longer are closed, releasing their worker
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTP server that handles requests on a bounded pool of worker threads.
+
+    At most max_workers connections are served at once and at most max_pending more wait for a worker; beyond
+    that the accept loop blocks, so excess clients queue in the listen backlog instead of spawning threads. A worker
+    serves one connection until the client closes it or leaves it idle for the handler's timeout. Sessions expire
+    session_ttl seconds after their last request.
+    """
+
+    def __init__(self, address, handler_class, max_workers=8, max_pending=64, session_ttl=SESSION_TTL_S):
+        super().__init__(address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http-worker")
+        self.slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self.session_ttl = session_ttl
+        self.sessions = OrderedDict()  # token -> (user_id, last seen), least recently seen first
+        self.sessions_lock = threading.Lock()
+
+    def open_session(self, user_id):
+        # Start a session for user_id and return its token, evicting the sessions that have expired
+        token = secrets.token_hex(16)
+        now = time.monotonic()
+        with self.sessions_lock:
+            while self.sessions:
+                oldest = next(iter(self.sessions))
+                if now - self.sessions[oldest][1] < self.session_ttl:
+                    break
+                del self.sessions[oldest]
+            self.sessions[token] = (user_id, now)
+        return token
+
+    def session_user(self, token):
+        # Return the user ID of a live session and mark it as seen, or None
+        now = time.monotonic()
+        with self.sessions_lock:
+            session = self.sessions.get(token)
+            if session is None:
+                return None
+            if now - session[1] >= self.session_ttl:
+                del self.sessions[token]
+                return None
+            self.sessions[token] = (session[0], now)
+            self.sessions.move_to_end(token)
+            return session[0]
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()
+        self.executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class HabitRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over the Habit, User and analytics modules."""
+
+    protocol_version = "HTTP/1.1"
+    timeout = IDLE_TIMEOUT_S
+    routes = [
+        ("POST", re.compile(r"/users"), "register"),
+        ("POST", re.compile(r"/login"), "login"),
+        ("GET", re.compile(r"/habits"), "list_habits"),
+        ("POST", re.compile(r"/habits"), "create_habit"),
+        ("GET", re.compile(r"/habits/(\d+)"), "get_habit"),
+        ("PUT", re.compile(r"/habits/(\d+)"), "update_habit"),
+        ("DELETE", re.compile(r"/habits/(\d+)"), "delete_habit"),
+        ("POST", re.compile(r"/habits/(\d+)/complete"), "complete_habit"),
+        ("GET", re.compile(r"/analytics"), "user_analytics"),
+        ("GET", re.compile(r"/analytics/habits/(\d+)"), "habit_analytics"),
+    ]
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def log_message(self, format, *args):
+        pass  # Request logging would dominate the cost of small requests
+
+    def _dispatch(self, method):
+        start = time.perf_counter()
+        self._body = None
+        try:
+            path = self.path.split("?", 1)[0].rstrip("/")
+            for route_method, pattern, name in self.routes:
+                match = pattern.fullmatch(path)
+                if match and route_method == method:
+                    status, body = getattr(self, name)(*(int(group) for group in match.groups()))
+                    break
+            else:
+                raise HttpError(404, "Not found")
+        except HttpError as e:
+            status, body = e.status, {"error": e.message}
+        except Exception as e:
+            status, body = 500, {"error": str(e)}
+        try:
+            self._read_body()  # Drain an unread body, or it would be parsed as the next request on the connection
+        except HttpError:
+            self.close_connection = True
+        self._send(status, body, time.perf_counter() - start)
+
+    def _send(self, status, body, elapsed):
+        payload = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("X-Response-Time", f"{elapsed * 1000:.3f}ms")
+        self.send_header("Server-Timing", f"app;dur={elapsed * 1000:.3f}")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self):
+        # Return the request body, reading it from the connection on the first call
+        if self._body is None:
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                raise HttpError(400, "Invalid Content-Length")
+            self._body = self.rfile.read(length) if length > 0 else b""
+        return self._body
+
+    def _read_json(self):
+        body = self._read_body()
+        if not body:
+            return {}
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise HttpError(400, "Request body must be JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Request body must be a JSON object")
+        return data
+
+    def _user_id(self):
+        # Return the user ID of the session token in the Authorization header
+        header = self.headers.get("Authorization", "")
+        token = header[len("Bearer "):] if header.startswith("Bearer ") else header
+        user_id = self.server.session_user(token)
+        if user_id is None:
+            raise HttpError(401, "Missing or invalid session token")
+        return user_id
+
+    def _habit(self, habit_id):
+        # Return a habit owned by the session user
+        habit = get_habit_by_id(habit_id)
+        if not habit or habit.user_id != self._user_id():
+            raise HttpError(404, f"Habit with ID {habit_id} not found")
+        return habit
+
+    def _open_session(self, user):
+        token = self.server.open_session(user.user_id)
+        return {"token": token, "user_id": user.user_id, "username": user.username}
+
+    def register(self):
+        data = self._read_json()
+        if not data.get("username") or not data.get("password"):
+            raise HttpError(400, "username and password are required")
+        try:
+            user = User.create(data["username"], data["password"], datetime.now().isoformat())
+        except Exception as e:
+            raise HttpError(409, f"Registration failed: {e}")
+        return 201, self._open_session(user)
+
+    def login(self):
+        data = self._read_json()
+        user = User.get_by_username(data.get("username", ""))
+        if not user or not user.check_password(data.get("password", "")):
+            raise HttpError(401, "Invalid username or password")
+        user.update_last_login()
+        return 200, self._open_session(user)
+
+    def list_habits(self):
+        return 200, [habit.to_dict() for habit in Habit.get_all_by_user(self._user_id())]
+
+    def create_habit(self):
+        data = self._read_json()
+        try:
+            habit = Habit.create(self._user_id(), data["name"], data.get("description", ""), data["periodicity"],
+                                 int(data["duration"]))
+        except (KeyError, ValueError) as e:
+            raise HttpError(400, f"Invalid habit: {e}")
+        return 201, habit.to_dict()
+
+    def get_habit(self, habit_id):
+        return 200, self._habit(habit_id).to_dict()
+
+    def update_habit(self, habit_id):
+        habit = self._habit(habit_id)
+        data = self._read_json()
+        try:
+            habit.update(name=data.get("name"), description=data.get("description"),
+                         periodicity=data.get("periodicity", habit.periodicity),
+                         duration=int(data.get("duration", habit.duration)))
+        except (TypeError, ValueError) as e:
+            raise HttpError(400, f"Invalid habit: {e}")
+        return 200, habit.to_dict()
+
+    def delete_habit(self, habit_id):
+        self._habit(habit_id).delete()
+        return 200, {"deleted": habit_id}
+
+    def complete_habit(self, habit_id):
+        habit = self._habit(habit_id)
+        if not habit.update_status():
+            raise HttpError(409, f"Habit with ID {habit_id} cannot be completed in this period")
+        return 200, habit.to_dict()
+
+    def user_analytics(self):
+        user_id = self._user_id()
+        active = get_active_habits(user_id)
+        try:
+            longest = get_longest_streak_all_habits(user_id)
+        except ValueError:
+            longest = None  # The user has no habits yet
+        return 200, {
+            "active_habits": [dict(habit) for habit in active],
+            "longest_streak": dict(longest) if longest else None
+        }
+
+    def habit_analytics(self, habit_id):
+        self._habit(habit_id)
+        return 200, {
+            "habit_id": habit_id,
+            "longest_streak": get_longest_streak_for_habit(habit_id),
+            "completion_rate": get_completion_rate(habit_id),
+            "log_analysis": analyze_logs(habit_id)
+        }
+
+
+def create_server(host="127.0.0.1", port=8000, max_workers=8, max_pending=64, session_ttl=SESSION_TTL_S):
+    """Create the HTTP service; call serve_forever() on the result to run it."""
+    create_tables()
+    return PooledHTTPServer((host, port), HabitRequestHandler, max_workers=max_workers, max_pending=max_pending,
+                            session_ttl=session_ttl)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Habit Tracker over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=8, help="size of the request worker pool")
+    parser.add_argument("--pending", type=int, default=64, help="requests allowed to wait for a worker")
+    parser.add_argument("--session-ttl", type=float, default=SESSION_TTL_S, help="idle seconds before logout")
+    args = parser.parse_args()
+
+    configure_logging()
+    server = create_server(args.host, args.port, args.workers, args.pending, args.session_ttl)
+    print(f"Serving on http://{args.host}:{server.server_address[1]} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
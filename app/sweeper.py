@@ -0,0 +1,124 @@
+import argparse
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.logging_config import configure_logging
+from storage import changes
+from storage.db_manager import create_tables, deactivate_overdue_habits, get_outbox_position, prune_outbox
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_RETENTION_S = 24 * 3600  # Outbox events older than this are pruned; readers further behind reload
+
+
+class DeadlineSweeper:
+    """Background thread that periodically deactivates overdue habits of all users.
+
+    With the outbox enabled, each sweep also prunes outbox events older than outbox_retention seconds.
+    """
+
+    def __init__(self, interval=60.0, jitter=0.1, outbox_retention=OUTBOX_RETENTION_S):
+        # interval is the pause between sweeps in seconds, jitter the random fraction added to or taken from it
+        self.interval = interval
+        self.jitter = jitter
+        self.outbox_retention = outbox_retention
+        self.sweeps = 0
+        self.rows_touched = 0
+        self.outbox_pruned = 0
+        self.last_duration = 0.0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.errors = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def next_delay(self):
+        # Return the pause before the next sweep, spread randomly so several sweepers do not run in lockstep
+        return max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def sweep(self):
+        # Run one sweep, record its metrics and return the IDs of the deactivated habits
+        start = time.perf_counter()
+        try:
+            deactivated = deactivate_overdue_habits()
+            if changes.outbox_enabled:
+                cutoff = datetime.now() - timedelta(seconds=self.outbox_retention)
+                self.outbox_pruned += prune_outbox(get_outbox_position(before=cutoff))
+        except Exception:
+            self.errors += 1
+            logger.exception("Deadline sweep failed")
+            return []
+        duration = time.perf_counter() - start
+
+        self.sweeps += 1
+        self.rows_touched += len(deactivated)
+        self.last_duration = duration
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        logger.info("Deactivated %d overdue habits in %.3fs", len(deactivated), duration,
+                    extra={"rows_touched": len(deactivated), "duration": duration})
+        return deactivated
+
+    def start(self):
+        # Start sweeping in a daemon thread
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="deadline-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        # Ask the sweeper thread to finish and wait for it
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.sweep()
+            self._stop_event.wait(self.next_delay())
+
+    def metrics(self):
+        # Return the sweep metrics as a dictionary
+        return {
+            "sweeps": self.sweeps,
+            "rows_touched": self.rows_touched,
+            "outbox_pruned": self.outbox_pruned,
+            "errors": self.errors,
+            "last_duration": self.last_duration,
+            "avg_duration": self.total_duration / self.sweeps if self.sweeps else 0.0,
+            "max_duration": self.max_duration
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deactivate overdue habits of all users periodically.")
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between sweeps")
+    parser.add_argument("--jitter", type=float, default=0.1, help="random fraction applied to the interval")
+    parser.add_argument("--once", action="store_true", help="run a single sweep and exit")
+    parser.add_argument("--outbox-retention", type=float, default=OUTBOX_RETENTION_S,
+                        help="seconds outbox events are kept when the outbox is enabled")
+    args = parser.parse_args()
+
+    configure_logging()
+    create_tables()
+    sweeper = DeadlineSweeper(interval=args.interval, jitter=args.jitter, outbox_retention=args.outbox_retention)
+    if args.once:
+        deactivated = sweeper.sweep()
+        print(f"Deactivated {len(deactivated)} overdue habits. Metrics: {sweeper.metrics()}")
+        return
+
+    sweeper.start()
+    try:
+        while True:
+            time.sleep(args.interval)
+            print(f"Sweeper metrics: {sweeper.metrics()}")
+    except KeyboardInterrupt:
+        sweeper.stop()
+
+
+if __name__ == "__main__":
+    main()
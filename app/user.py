@@ -1,10 +1,23 @@
-import hashlib
+import logging
 from datetime import datetime
 
+from app.passwords import hash_password, needs_rehash, verify_password_async
+from app.records import LazyDatetime, row_factory
 from storage.db_manager import create_user, get_user_by_username, update_user, delete_user, update_last_login
 
+logger = logging.getLogger(__name__)
+
 
 class User:
+    __slots__ = ("user_id", "username", "password", "_created_at", "_last_login")
+
+    # User table column -> slot, used to build users directly from rows
+    COLUMNS = {"user_id": "user_id", "username": "username", "password": "password", "created_at": "_created_at",
+               "last_login": "_last_login"}
+
+    created_at = LazyDatetime()
+    last_login = LazyDatetime()
+
     def __init__(self, user_id, username, password, created_at, last_login=None):
         # Initialize a User instance
         self.user_id = user_id
@@ -18,17 +31,17 @@ class User:
         # Create a new user, hash the password, and store in the database
         hashed_password = User._hash_password(password)  # Hash the password
         user_id = create_user(username, hashed_password, created_at)  # Store user and get user_id
-        print(f"User created: {username}")
+        logger.debug("User created: %s", username, extra={"user_id": user_id})
         return User(user_id, username, hashed_password, created_at)  # Return a User instance
 
     @staticmethod
     def get_by_username(username):
         # Retrieve a user from the database by username
-        user_data = get_user_by_username(username)  # Fetch user data from database
-        if user_data:
-            print(f"User retrieved: {username}")
-            return User(*user_data)  # Create and return User instance from data
-        print(f"User not found: {username}")
+        user = get_user_by_username(username, row_factory=user_from_row)  # Fetch the user as a User instance
+        if user:
+            logger.debug("User retrieved: %s", username)
+            return user
+        logger.debug("User not found: %s", username)
         return None  # Return None if user not found
 
     def update(self, username=None, password=None):
@@ -38,30 +51,39 @@ class User:
         if password:
             self.password = User._hash_password(password)  # Hash and update password if provided
         update_user(self.user_id, username, self.password)  # Update user in database
-        print(f"User updated: {self.username}")
+        logger.debug("User updated: %s", self.username)
 
     def delete(self):
         # Delete the user from the database
         delete_user(self.user_id)  # Remove user from database
-        print(f"User deleted: {self.username}")
+        logger.debug("User deleted: %s", self.username)
 
     def update_last_login(self):
         # Update the last login timestamp for the user
         update_last_login(self.username)  # Update last login timestamp in the database
         self.last_login = datetime.now()  # Set last_login to now
-        print(f"Last login updated for user: {self.username}")
+        logger.debug("Last login updated for user: %s", self.username)
 
     @staticmethod
     def _hash_password(password):
-        # Hash a password using SHA-256
-        return hashlib.sha256(password.encode('utf-8')).hexdigest()  # Return hashed password
+        # Hash a password with the configured KDF and a fresh salt
+        return hash_password(password)  # Return the encoded hash, including algorithm, cost and salt
 
     def check_password(self, password):
         # Check if provided password matches the stored hashed password
-        return self.password == self._hash_password(password)  # Return True if passwords match, otherwise False
+        matches = verify_password_async(password, self.password).result()  # Runs on the hashing pool
+        if matches and needs_rehash(self.password):
+            # Upgrade legacy or outdated hashes while the plain password is at hand
+            self.password = self._hash_password(password)
+            update_user(self.user_id, password=self.password)
+            logger.info("Password hash upgraded for user: %s", self.username)
+        return matches  # Return True if passwords match, otherwise False
 
     def reset_password(self, new_password):
         # Reset the user's password and update it in the database
         self.password = self._hash_password(new_password)  # Hash and set new password
         update_user(self.user_id, self.username, self.password)  # Update user in database
-        print(f"Password updated successfully for user: {self.username}")
+        logger.debug("Password updated successfully for user: %s", self.username)
+
+
+user_from_row = row_factory(User)
@@ -0,0 +1,219 @@
+"""Benchmarks of the storage, habit lifecycle and analytics hot paths.
+
+Each dataset size is a separate database built once with storage.generator and reused by later runs with the same
+parameters. Every case is run for a number of warmup iterations and then timed call by call on randomly chosen
+users or habits; analytics caches are cleared before each call so the uncached cost is measured. Results can be
+saved as a baseline and later runs compared against it:
+
+    python -m benchmarks.bench --sizes 100,1000 --save-baseline benchmarks/bench_baseline.json
+    python -m benchmarks.bench --sizes 100,1000 --baseline benchmarks/bench_baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app import analytics
+from app.habit import Habit
+from app.periodicity import get_periodicity
+from storage import db_manager
+from storage.generator import generate
+
+
+def _habit_ids(active_only=False):
+    connection = db_manager.create_read_only_connection()
+    sql = "SELECT habit_id FROM Habit" + (" WHERE active = 1" if active_only else "")
+    habit_ids = [row[0] for row in connection.execute(sql)]
+    connection.close()
+    return habit_ids
+
+
+def case_habit_create(rng, user_ids, calls):
+    def run():
+        Habit.create(rng.choice(user_ids), "Benchmark habit", "Created by the benchmark", "daily", 30, 0,
+                     datetime.now())
+    return run
+
+
+def case_update_status(rng, user_ids, calls):
+    # Every call completes a different habit whose current period is still open, so each one logs a completion
+    # instead of taking the already-completed path
+    now = datetime.now()
+    habit_ids = _habit_ids(active_only=True)
+    rng.shuffle(habit_ids)
+    habits = []
+    for habit_id in habit_ids:
+        habit = db_manager.get_habit_by_id(habit_id)
+        if not db_manager.has_completion(habit_id, get_periodicity(habit.periodicity).key(now)):
+            habits.append(habit)
+            if len(habits) == calls:
+                break
+    else:
+        raise ValueError(f"update_status needs {calls} active habits with an open period, the dataset has "
+                         f"{len(habits)}; use a larger size or fewer runs")
+    deadline = now + timedelta(days=365)
+    for habit in habits:
+        db_manager.update_habit(habit.habit_id, deadline=deadline)  # Take the completion path, not the overdue one
+        habit.deadline = deadline
+    fresh = iter(habits)
+    return lambda: next(fresh).update_status()
+
+
+def case_calculate_streak(rng, user_ids, calls):
+    habit_ids = _habit_ids()
+    return lambda: Habit.calculate_streak(rng.choice(habit_ids))
+
+
+def case_get_habits_by_user(rng, user_ids, calls):
+    return lambda: db_manager.get_habits_by_user(rng.choice(user_ids))
+
+
+def case_analyze_logs(rng, user_ids, calls):
+    habit_ids = _habit_ids()
+
+    def run():
+        analytics.analytics_cache.clear()
+        analytics.analyze_logs(rng.choice(habit_ids))
+    return run
+
+
+def case_get_completion_rate(rng, user_ids, calls):
+    habit_ids = _habit_ids()
+
+    def run():
+        analytics.analytics_cache.clear()
+        analytics.get_completion_rate(rng.choice(habit_ids))
+    return run
+
+
+def case_search(rng, user_ids, calls):
+    # Words of habit names and of the status notes every log carries, the notes matching most of a user's history
+    queries = ["read", "journal", "completed", "incomplete", "fit*"]
+    return lambda: db_manager.search(rng.choice(user_ids), rng.choice(queries))
+
+
+def case_delete_user(rng, user_ids, calls):
+    # Every call deletes a different user, so this case runs last and needs at least as many users as calls
+    victims = iter(rng.sample(user_ids, calls))
+    return lambda: db_manager.delete_user(next(victims))
+
+
+# name -> factory(rng, user_ids, calls) returning the function to time, which is called calls times (warmup and
+# measured runs); delete_user must stay last
+CASES = {
+    "habit_create": case_habit_create,
+    "update_status": case_update_status,
+    "calculate_streak": case_calculate_streak,
+    "get_habits_by_user": case_get_habits_by_user,
+    "analyze_logs": case_analyze_logs,
+    "get_completion_rate": case_get_completion_rate,
+    "search": case_search,
+    "delete_user": case_delete_user,
+}
+
+
+def prepare_dataset(data_dir, users, habits, years, seed):
+    # Return a copy of the cached database for this size, generating it first if needed
+    template = Path(data_dir) / f"bench_u{users}_h{habits}_y{years}_s{seed}.db"
+    if not template.exists():
+        db_manager.DB_FILE = template
+        totals = generate(users=users, habits_per_user=habits, years=years, seed=seed)
+        print(f"Generated {template.name}: {totals}")
+    working = Path(data_dir) / "bench_working.db"
+    working.write_bytes(template.read_bytes())  # Cases modify the data, so every run starts from the template
+    return working
+
+
+def measure(run, warmup, runs):
+    # Return timing statistics of repeated calls in milliseconds
+    for _ in range(warmup):
+        run()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "median_ms": statistics.median(samples),
+        "mean_ms": mean,
+        "min_ms": samples[0],
+        "p95_ms": samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+        "ops_per_s": 1000 / mean if mean else 0.0,
+    }
+
+
+def run_size(data_dir, users, args):
+    # Run the selected cases against one dataset size
+    db_manager.DB_FILE = prepare_dataset(data_dir, users, args.habits, args.years, args.seed)
+    user_ids = db_manager.get_user_ids()
+    rng = random.Random(args.seed)
+    results = {}
+    for name in (args.case or CASES):
+        run = CASES[name](rng, user_ids, args.warmup + args.runs)
+        results[f"{name}@{users}"] = measure(run, args.warmup, args.runs)
+    return results
+
+
+def compare(results, baseline, threshold, metric="median_ms"):
+    # Return the cases whose metric grew by more than threshold (a fraction) over the baseline
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and result[metric] > previous[metric] * (1 + threshold):
+            regressions.append((name, previous[metric], result[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Habit Tracker storage and analytics hot paths.")
+    parser.add_argument("--sizes", default="100,1000", help="comma separated numbers of users")
+    parser.add_argument("--habits", type=int, default=5, help="habits per user")
+    parser.add_argument("--years", type=int, default=1, help="length of the log histories")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--case", action="append", choices=list(CASES), help="defaults to all cases")
+    parser.add_argument("--data-dir", default=Path(tempfile.gettempdir()) / "habit_tracker_bench",
+                        help="directory for the generated datasets, reused between runs")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against a previously saved result file")
+    parser.add_argument("--save-baseline", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    if args.case:
+        args.case = [name for name in CASES if name in args.case]  # Keep delete_user last
+    sizes = [int(size) for size in args.sizes.split(",")]
+    if "delete_user" in (args.case or CASES) and min(sizes) < args.warmup + args.runs:
+        parser.error(f"delete_user deletes a user per call and needs sizes of at least --warmup + --runs "
+                     f"({args.warmup + args.runs}); raise the sizes or pass the other cases with --case")
+    Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+    results = {}
+    for users in sizes:
+        results.update(run_size(args.data_dir, users, args))
+
+    for name, result in results.items():
+        print(f"{name:28} median {result['median_ms']:8.3f}ms  p95 {result['p95_ms']:8.3f}ms  "
+              f"{result['ops_per_s']:9.1f} ops/s")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.3f}ms -> {after:.3f}ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
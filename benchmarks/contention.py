@@ -0,0 +1,190 @@
+"""Contention benchmark: many users working on one shared SQLite database.
+
+Threads or processes act as users of a generated dataset. Each session logs a random user in, lists their habits,
+calls Habit.update_status on one of them and views the analytics of the user and that habit, calling the app and
+storage layers directly. The run reports session and operation throughput, latency percentiles per operation and
+the rate of ``database is locked`` errors.
+
+SQLite does not report how long a writer waited for the lock, so lock wait is estimated: a short single-client
+calibration run measures the uncontended median of every writing operation, and each write's latency above that
+median is counted as waiting.
+
+    python -m benchmarks.contention --users 1000 --clients 16 --mode process --duration 20
+"""
+import argparse
+import multiprocessing
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from app import analytics
+from app.user import User
+from benchmarks.bench import prepare_dataset
+from benchmarks.http_load import percentile
+from storage import db_manager
+from storage.db_manager import get_habit_by_id, get_habits_by_user
+
+PASSWORD = "password"  # Password of every user created by storage.generator
+WRITES = ("update_last_login", "update_status")
+
+
+def _login(username):
+    user = User.get_by_username(username)
+    if not user or not user.check_password(PASSWORD):
+        raise RuntimeError(f"Could not log in as {username}")
+    return user
+
+
+def _update_status(habit_id):
+    # Load the habit and mark it, as the menu's mark-as-complete screen does
+    get_habit_by_id(habit_id).update_status()
+
+
+def run_client(db_file, usernames, duration, seed, sessions_per_login):
+    """Run sessions until duration has passed and return latencies, error counts and the number of sessions."""
+    db_manager.DB_FILE = db_file
+    rng = random.Random(seed)
+    latencies = defaultdict(list)
+    locked = defaultdict(int)
+    errors = defaultdict(int)
+
+    def timed(name, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        except sqlite3.OperationalError as e:
+            (locked if "locked" in str(e) else errors)[name] += 1
+        except Exception:
+            errors[name] += 1
+        finally:
+            latencies[name].append(time.perf_counter() - start)
+
+    sessions = 0
+    user = None
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        if user is None or sessions % sessions_per_login == 0:
+            user = timed("login", _login, rng.choice(usernames))  # Logging in is slow by design, so not every session
+            if user is not None:
+                timed("update_last_login", user.update_last_login)
+        sessions += 1
+        if user is None:
+            continue
+        habits = timed("list_habits", get_habits_by_user, user.user_id)
+        if not habits:
+            continue
+        habit_id = rng.choice(habits)['habit_id']
+        timed("update_status", _update_status, habit_id)
+        timed("user_analytics", analytics.get_active_habits, user.user_id)
+        timed("habit_analytics", analytics.analyze_logs, habit_id)
+    return {"latencies": dict(latencies), "locked": dict(locked), "errors": dict(errors), "sessions": sessions}
+
+
+def _client_args(db_file, usernames, clients, duration, seed, sessions_per_login):
+    # Give every client its own share of the users so sessions rarely touch the same habit at once
+    return [(str(db_file), usernames[index::clients] or usernames, duration, seed + index, sessions_per_login)
+            for index in range(clients)]
+
+
+def run_load(db_file, usernames, clients, duration, mode="thread", seed=0, sessions_per_login=10):
+    """Run clients concurrently and return their merged results and the elapsed time."""
+    client_args = _client_args(db_file, usernames, clients, duration, seed, sessions_per_login)
+    start = time.perf_counter()
+    if mode == "process":
+        # Spawn rather than fork: a forked child would inherit the password hashing pool without its threads
+        with multiprocessing.get_context("spawn").Pool(clients) as pool:
+            outcomes = pool.starmap(run_client, client_args)
+    else:
+        outcomes = [None] * clients
+
+        def target(index):
+            outcomes[index] = run_client(*client_args[index])
+        threads = [threading.Thread(target=target, args=(index,)) for index in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start
+
+    merged = {"latencies": defaultdict(list), "locked": defaultdict(int), "errors": defaultdict(int), "sessions": 0}
+    for outcome in outcomes:
+        merged["sessions"] += outcome["sessions"]
+        for name, values in outcome["latencies"].items():
+            merged["latencies"][name].extend(values)
+        for kind in ("locked", "errors"):
+            for name, count in outcome[kind].items():
+                merged[kind][name] += count
+    return merged, elapsed
+
+
+def summarize(result, elapsed, baseline=None):
+    """Return throughput, per operation percentiles, lock error rates and estimated lock wait."""
+    operations = {}
+    for name, values in sorted(result["latencies"].items()):
+        uncontended = baseline.get(name) if baseline else None
+        operations[name] = {
+            "count": len(values),
+            "p50_ms": percentile(values, 0.5) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "locked": result["locked"].get(name, 0),
+            "locked_rate": result["locked"].get(name, 0) / len(values) if values else 0.0,
+            "errors": result["errors"].get(name, 0),
+        }
+        if name in WRITES and uncontended is not None:
+            operations[name]["lock_wait_s"] = sum(max(0.0, value - uncontended) for value in values)
+    total = sum(len(values) for values in result["latencies"].values())
+    return {
+        "sessions_per_s": result["sessions"] / elapsed if elapsed else 0.0,
+        "ops_per_s": total / elapsed if elapsed else 0.0,
+        "locked_rate": sum(result["locked"].values()) / total if total else 0.0,
+        "lock_wait_s": sum(operation.get("lock_wait_s", 0.0) for operation in operations.values()),
+        "operations": operations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the Habit Tracker under concurrent users.")
+    parser.add_argument("--users", type=int, default=1000, help="users in the generated dataset")
+    parser.add_argument("--habits", type=int, default=5, help="habits per user")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent threads or processes")
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--calibration", type=float, default=3.0, help="seconds of the single-client run")
+    parser.add_argument("--sessions-per-login", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=Path(tempfile.gettempdir()) / "habit_tracker_bench",
+                        help="directory for the generated datasets, reused between runs")
+    args = parser.parse_args()
+
+    Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+    db_file = prepare_dataset(args.data_dir, args.users, args.habits, 1, args.seed)
+    db_manager.DB_FILE = db_file
+    connection = db_manager.create_read_only_connection()
+    usernames = [row[0] for row in connection.execute("SELECT username FROM User")]
+    connection.close()
+
+    calibration, _ = run_load(db_file, usernames, 1, args.calibration, "thread", args.seed, args.sessions_per_login)
+    baseline = {name: statistics.median(values) for name, values in calibration["latencies"].items()}
+    result, elapsed = run_load(db_file, usernames, args.clients, args.duration, args.mode, args.seed,
+                               args.sessions_per_login)
+    summary = summarize(result, elapsed, baseline)
+
+    print(f"{result['sessions']} sessions in {elapsed:.2f}s from {args.clients} {args.mode} clients: "
+          f"{summary['sessions_per_s']:.1f} sessions/s, {summary['ops_per_s']:.1f} ops/s")
+    print(f"database is locked: {summary['locked_rate'] * 100:.2f}% of operations, "
+          f"estimated lock wait {summary['lock_wait_s']:.2f}s")
+    for name, operation in summary["operations"].items():
+        wait = f" wait={operation['lock_wait_s']:.2f}s" if "lock_wait_s" in operation else ""
+        print(f"  {name:18} n={operation['count']:6} p50={operation['p50_ms']:8.2f}ms "
+              f"p95={operation['p95_ms']:8.2f}ms p99={operation['p99_ms']:8.2f}ms "
+              f"locked={operation['locked']} errors={operation['errors']}{wait}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Load test for the HTTP service in app.server.
+
+Registers a number of users, gives each one habit and then drives a mix of list, complete and analytics
+requests from concurrent client threads for a fixed duration, reporting throughput and latency percentiles.
+
+    python -m app.server --port 8000 &
+    python -m benchmarks.http_load --url http://127.0.0.1:8000 --clients 16 --duration 10
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+
+def request(base_url, method, path, body=None, token=None):
+    # Send a JSON request and return (status, decoded body)
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+
+
+def percentile(values, fraction):
+    # Return the value at the given fraction of the sorted values
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def setup_client(base_url, index, run_id):
+    # Register a user with one habit and return (token, habit_id)
+    username = f"load_{run_id}_{index}"
+    status, body = request(base_url, "POST", "/users", {"username": username, "password": "load-password"})
+    if status != 201:
+        raise RuntimeError(f"Could not register {username}: {body}")
+    token = body["token"]
+    _, habit = request(base_url, "POST", "/habits",
+                       {"name": "Load habit", "description": "Load test", "periodicity": "daily", "duration": 30},
+                       token=token)
+    return token, habit["habit_id"]
+
+
+def run_client(base_url, token, habit_id, deadline, latencies, errors):
+    # Issue a random mix of requests until the deadline passes
+    operations = [
+        ("list", "GET", "/habits"),
+        ("complete", "POST", f"/habits/{habit_id}/complete"),
+        ("analytics", "GET", "/analytics"),
+        ("habit_analytics", "GET", f"/analytics/habits/{habit_id}"),
+    ]
+    while time.perf_counter() < deadline:
+        name, method, path = random.choice(operations)
+        start = time.perf_counter()
+        status, _ = request(base_url, method, path, token=token)
+        latencies[name].append(time.perf_counter() - start)
+        if status >= 400 and status != 409:  # 409: the habit was already completed in this period
+            errors[name] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Habit Tracker HTTP service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    args = parser.parse_args()
+
+    run_id = int(time.time())
+    sessions = [setup_client(args.url, i, run_id) for i in range(args.clients)]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=run_client, args=(args.url, token, habit_id, deadline, latencies, errors))
+               for token, habit_id in sessions]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total} requests in {elapsed:.2f}s from {args.clients} clients: {total / elapsed:.1f} req/s")
+    for name, values in sorted(latencies.items()):
+        print(f"  {name:16} n={len(values):6} p50={percentile(values, 0.5) * 1000:8.2f}ms "
+              f"p99={percentile(values, 0.99) * 1000:8.2f}ms errors={errors[name]}")
+
+
+if __name__ == "__main__":
+    main()
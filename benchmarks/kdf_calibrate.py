@@ -0,0 +1,69 @@
+"""Pick password KDF cost parameters for a target login latency.
+
+The cost of each algorithm is raised until a single hash takes about the target time on this machine, then the
+throughput of concurrent verifications on the hashing pool is measured with the chosen parameters:
+
+    python -m benchmarks.kdf_calibrate --target-ms 100
+"""
+import argparse
+import statistics
+import time
+
+from app.passwords import Pbkdf2Hasher, ScryptHasher, hash_password, set_default_hasher, verify_password_async
+
+
+def time_hash(hasher, samples=3):
+    # Return the median time in milliseconds to hash a password with hasher
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.encode("calibration-password")
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_scrypt(target_ms, r=8, p=1):
+    # Double n while a hash stays within the target latency
+    n, elapsed = 2 ** 10, time_hash(ScryptHasher(2 ** 10, r, p))
+    while True:
+        candidate = time_hash(ScryptHasher(n * 2, r, p))
+        if candidate > target_ms or n >= 2 ** 20:
+            return ScryptHasher(n, r, p), elapsed
+        n, elapsed = n * 2, candidate
+
+
+def calibrate_pbkdf2(target_ms):
+    # Scale the iteration count linearly from a short measurement
+    probe = 100000
+    per_iteration = time_hash(Pbkdf2Hasher(probe)) / probe
+    hasher = Pbkdf2Hasher(max(1000, int(target_ms / per_iteration) // 1000 * 1000))
+    return hasher, time_hash(hasher)
+
+
+def pool_throughput(hasher, logins):
+    # Return verifications per second when logins verifications are submitted at once
+    set_default_hasher(hasher)
+    encoded = hash_password("calibration-password")
+    start = time.perf_counter()
+    futures = [verify_password_async("calibration-password", encoded) for _ in range(logins)]
+    assert all(future.result() for future in futures)
+    return logins / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Choose KDF cost parameters for a target login latency.")
+    parser.add_argument("--target-ms", type=float, default=100.0, help="target time of one password hash")
+    parser.add_argument("--logins", type=int, default=32, help="concurrent verifications for the throughput test")
+    args = parser.parse_args()
+
+    scrypt, scrypt_ms = calibrate_scrypt(args.target_ms)
+    pbkdf2, pbkdf2_ms = calibrate_pbkdf2(args.target_ms)
+    print(f"scrypt        n={scrypt.n} r={scrypt.r} p={scrypt.p}: {scrypt_ms:.1f}ms per hash, "
+          f"{pool_throughput(scrypt, args.logins):.1f} logins/s on the pool")
+    print(f"pbkdf2_sha256 iterations={pbkdf2.iterations}: {pbkdf2_ms:.1f}ms per hash, "
+          f"{pool_throughput(pbkdf2, args.logins):.1f} logins/s on the pool")
+    print(f"Use e.g. HABIT_TRACKER_KDF=scrypt:n={scrypt.n},r={scrypt.r},p={scrypt.p}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Cold-start benchmark for the interactive and non-interactive entry points.
+
+Each target is run in a fresh interpreter several times. main_menu starts the interactive app, renders its first
+screen and picks Exit, so it measures time to the first screen; main_import only imports the module. The
+wall-clock time of the whole process and the cumulative import time reported by ``python -X importtime`` are
+recorded, and the slowest imports of the last run are listed. Results can be saved as a baseline and later runs
+compared against it:
+
+    python -m benchmarks.startup --save-baseline benchmarks/startup_baseline.json
+    python -m benchmarks.startup --baseline benchmarks/startup_baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.bench import compare
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# name -> interpreter arguments
+TARGETS = {
+    "main_menu": ["-m", "app.main"],
+    "main_import": ["-c", "import app.main"],
+    "cli_import": ["-c", "import app.cli"],
+    "cli_help": ["-m", "app", "--help"],
+    "sweeper_import": ["-c", "import app.sweeper"],
+}
+
+# name -> standard input of targets that wait for the user
+INPUTS = {
+    "main_menu": "4\n",  # Exit from the main menu
+}
+
+
+def parse_importtime(stderr):
+    # Return {module: cumulative microseconds} from -X importtime output
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def top_level_import_us(modules, stderr):
+    # Sum the cumulative time of top-level imports (those printed without indentation)
+    total = 0
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            name = line.split("|")[2]
+            if not name.startswith("  "):
+                total += modules[name.strip()]
+    return total
+
+
+def measure(args, runs, stdin=""):
+    # Run one target repeatedly and return its median wall and import time in milliseconds
+    wall, imports = [], []
+    modules = {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT, input=stdin,
+                                capture_output=True, text=True)
+        wall.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed: {result.stderr[-500:]}")
+        modules = parse_importtime(result.stderr)
+        imports.append(top_level_import_us(modules, result.stderr) / 1000)
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:8]
+    return {
+        "wall_ms": statistics.median(wall),
+        "import_ms": statistics.median(imports),
+        "slowest_imports_ms": {name: us / 1000 for name, us in slowest},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the Habit Tracker entry points.")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--target", action="append", choices=sorted(TARGETS), help="defaults to all targets")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against a previously saved result file")
+    parser.add_argument("--save-baseline", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    results = {name: measure(TARGETS[name], args.runs, INPUTS.get(name, "")) for name in (args.target or TARGETS)}
+    for name, result in results.items():
+        print(f"{name:16} wall {result['wall_ms']:7.1f}ms  imports {result['import_ms']:7.1f}ms")
+        for module, ms in result["slowest_imports_ms"].items():
+            print(f"    {ms:7.1f}ms  {module}")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold, "wall_ms")
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.1f}ms -> {after:.1f}ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""In-process feed of committed storage changes.
+
+db_manager publishes a ChangeEvent for every committed write. Calls made inside a transaction() block publish
+when the block commits, and nothing is published if it rolls back. Subscribers each get a bounded queue:
+
+    subscription = changes.subscribe({changes.LOG_APPENDED})
+    for event in subscription.get(timeout=1.0):
+        ...
+
+Bursts are coalesced: while an event with the same kind, habit and user is still queued, later ones are merged
+into it (count grows, log_id is the latest). When a subscriber falls so far behind that its queue holds maxsize
+distinct events, the queue is replaced by a single OVERFLOW event, telling the subscriber to reload what it needs.
+
+Optionally (enable_outbox() or HABIT_TRACKER_OUTBOX=1) events are also written to the ChangeOutbox table, in the
+transaction of the write itself, so other local processes can tail it with db_manager.read_outbox().
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+HABIT_CREATED = "habit_created"
+HABIT_UPDATED = "habit_updated"
+HABIT_DELETED = "habit_deleted"
+LOG_APPENDED = "log_appended"
+USER_CHANGED = "user_changed"
+TABLE_CLEARED = "table_cleared"
+OVERFLOW = "overflow"
+
+ChangeEvent = namedtuple("ChangeEvent", "kind user_id habit_id log_id count", defaults=(None, None, None, 1))
+
+outbox_enabled = bool(os.environ.get("HABIT_TRACKER_OUTBOX"))
+
+_subscriptions = []
+_subscriptions_lock = threading.Lock()
+
+
+class Subscription:
+    """Bounded, coalescing queue of change events for one subscriber."""
+
+    def __init__(self, kinds=None, maxsize=1000):
+        self.kinds = frozenset(kinds) if kinds else None
+        self.maxsize = maxsize
+        self.delivered = 0
+        self.coalesced = 0
+        self.overflows = 0
+        self._pending = OrderedDict()  # (kind, user_id, habit_id) -> ChangeEvent, oldest first
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def put(self, event):
+        # Queue an event, merging it into a pending event with the same key
+        if self.kinds is not None and event.kind not in self.kinds:
+            return
+        key = (event.kind, event.user_id, event.habit_id)
+        with self._condition:
+            if OVERFLOW in self._pending:
+                return  # The subscriber has to resynchronise anyway
+            pending = self._pending.get(key)
+            if pending is not None:
+                self._pending[key] = pending._replace(log_id=event.log_id or pending.log_id,
+                                                      count=pending.count + event.count)
+                self.coalesced += 1
+            elif len(self._pending) >= self.maxsize:
+                self._pending.clear()
+                self._pending[OVERFLOW] = ChangeEvent(OVERFLOW)
+                self.overflows += 1
+            else:
+                self._pending[key] = event
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        # Return all queued events, oldest first, waiting up to timeout seconds for the first one
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self._pending and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                self._condition.wait(remaining)
+            events = list(self._pending.values())
+            self._pending.clear()
+            self.delivered += len(events)
+            return events
+
+    def close(self):
+        # Stop receiving events and wake up a waiting get()
+        with _subscriptions_lock:
+            if self in _subscriptions:
+                _subscriptions.remove(self)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+def subscribe(kinds=None, maxsize=1000):
+    """Return a new Subscription receiving events of the given kinds (all kinds if None)."""
+    subscription = Subscription(kinds, maxsize)
+    with _subscriptions_lock:
+        _subscriptions.append(subscription)
+    return subscription
+
+
+def deliver(events):
+    # Hand committed events to every subscriber
+    if not events:
+        return
+    with _subscriptions_lock:
+        subscriptions = list(_subscriptions)
+    for subscription in subscriptions:
+        for event in events:
+            subscription.put(event)
+
+
+def enable_outbox(enabled=True):
+    global outbox_enabled
+    outbox_enabled = enabled
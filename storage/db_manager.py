@@ -1,14 +1,226 @@
+import functools
+import json
+import logging
+import os
+import random
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
-DB_FILE = Path(__file__).parent / 'habit_tracker.db'
+from storage import changes, query_stats
+from storage.changes import ChangeEvent
+
+# Database file; set HABIT_TRACKER_DB or assign DB_FILE to use another one
+DB_FILE = Path(os.environ.get("HABIT_TRACKER_DB") or Path(__file__).parent / 'habit_tracker.db')
+
+# How long a statement waits for another connection's lock before failing, and how often a write transaction that
+# still failed to start or commit is retried, with jittered exponential backoff starting at RETRY_BACKOFF_S
+BUSY_TIMEOUT_MS = float(os.environ.get("HABIT_TRACKER_BUSY_TIMEOUT_MS", 5000))
+WRITE_RETRIES = int(os.environ.get("HABIT_TRACKER_WRITE_RETRIES", 5))
+RETRY_BACKOFF_S = 0.01
+RETRY_BACKOFF_MAX_S = 1.0
+
+# Triggers keeping the full-text tables in sync: HabitSearch indexes habit names and descriptions under rowid
+# habit_id, NoteSearch log notes under rowid log_id. Their owner column holds a "user<id>" token that restricts a
+# search to the rows of one user inside the index.
+SEARCH_TRIGGERS = {
+    "search_habit_insert": """
+    CREATE TRIGGER IF NOT EXISTS search_habit_insert AFTER INSERT ON Habit BEGIN
+        INSERT INTO HabitSearch (rowid, owner, name, description)
+        VALUES (new.habit_id, 'user' || new.user_id, new.name, new.description);
+    END
+    """,
+    "search_habit_update": """
+    CREATE TRIGGER IF NOT EXISTS search_habit_update AFTER UPDATE OF user_id, name, description ON Habit BEGIN
+        DELETE FROM HabitSearch WHERE rowid = old.habit_id;
+        INSERT INTO HabitSearch (rowid, owner, name, description)
+        VALUES (new.habit_id, 'user' || new.user_id, new.name, new.description);
+    END
+    """,
+    "search_habit_delete": """
+    CREATE TRIGGER IF NOT EXISTS search_habit_delete AFTER DELETE ON Habit BEGIN
+        DELETE FROM HabitSearch WHERE rowid = old.habit_id;
+    END
+    """,
+    "search_log_insert": """
+    CREATE TRIGGER IF NOT EXISTS search_log_insert AFTER INSERT ON Log BEGIN
+        INSERT INTO NoteSearch (rowid, owner, note)
+        SELECT new.log_id, 'user' || user_id, new.note FROM Habit WHERE habit_id = new.habit_id;
+    END
+    """,
+    "search_log_update": """
+    CREATE TRIGGER IF NOT EXISTS search_log_update AFTER UPDATE OF habit_id, note ON Log BEGIN
+        DELETE FROM NoteSearch WHERE rowid = old.log_id;
+        INSERT INTO NoteSearch (rowid, owner, note)
+        SELECT new.log_id, 'user' || user_id, new.note FROM Habit WHERE habit_id = new.habit_id;
+    END
+    """,
+    "search_log_delete": """
+    CREATE TRIGGER IF NOT EXISTS search_log_delete AFTER DELETE ON Log BEGIN
+        DELETE FROM NoteSearch WHERE rowid = old.log_id;
+    END
+    """,
+}
+SEARCH_TABLES = ("HabitSearch", "NoteSearch")
+
+logger = logging.getLogger(__name__)
+
+# Data versions used to invalidate cached analytics live in the DataVersion table, so writes of other processes
+# invalidate them too. Every committed change event bumps the row of its habit and of its user; clearing a table
+# bumps the ALL_SCOPE row, which invalidates everything at once.
+ALL_SCOPE = "all"
+
+# Connection of the transaction() block the current thread is in, if any, the change events it will publish and
+# the thread's connection for reading data versions
+_local = threading.local()
+
+
+class _TransactionConnection:
+    """Connection handed out inside a transaction() block.
+
+    Entering, committing and closing it are no-ops so the statements of every db_manager call in the block share
+    the outer transaction, which is committed or rolled back once at its end.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.row_factory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self):
+        cursor = self._connection.cursor()
+        cursor.row_factory = self.row_factory
+        return cursor
+
+    def execute(self, sql, parameters=()):
+        cursor = self.cursor()
+        cursor.execute(sql, parameters)
+        return cursor
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
 
 
 def create_connection():
     """Create a connection to the SQLite database."""
-    connection = sqlite3.connect(DB_FILE)
-    return connection
+    connection = getattr(_local, 'connection', None)
+    if connection is not None:
+        return _TransactionConnection(connection)
+    connection = sqlite3.connect(DB_FILE, timeout=BUSY_TIMEOUT_MS / 1000)
+    return query_stats.connection_opened(connection)
+
+
+def _is_transient(error):
+    # SQLITE_BUSY and SQLITE_LOCKED surface as OperationalError with these messages
+    message = str(error)
+    return "database is locked" in message or "database table is locked" in message
+
+
+def _retry(statement, connection, phase):
+    """Execute statement, retrying transient lock errors with jittered exponential backoff."""
+    for attempt in range(WRITE_RETRIES + 1):
+        try:
+            return connection.execute(statement)
+        except sqlite3.OperationalError as e:
+            if not _is_transient(e):
+                raise
+            if attempt == WRITE_RETRIES:
+                query_stats.record_write_retry(phase, gave_up=True)
+                logger.warning("Giving up on %s after %s retries: %s", statement, attempt, e,
+                               extra={"phase": phase, "retries": attempt})
+                raise
+            query_stats.record_write_retry(phase)
+            time.sleep(random.uniform(0, min(RETRY_BACKOFF_MAX_S, RETRY_BACKOFF_S * 2 ** attempt)))
+
+
+@contextmanager
+def write_transaction():
+    """Yield a connection whose statements run in one write transaction, committed when the block exits.
+
+    The transaction starts with BEGIN IMMEDIATE, which takes the write lock up front, so a block that reads before
+    it writes cannot fail to upgrade its lock halfway. Waiting for the lock is bounded by BUSY_TIMEOUT_MS; if BEGIN
+    or COMMIT still report a locked database they are retried, which is safe because neither has changed anything
+    yet. Inside a transaction() block the outer transaction's connection is used instead.
+
+    Change events published in the block bump the data versions and are written to the outbox in the same
+    transaction, and are delivered to subscribers once it has committed.
+    """
+    if getattr(_local, 'connection', None) is not None:
+        yield _TransactionConnection(_local.connection)
+        return
+    connection = sqlite3.connect(DB_FILE, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    query_stats.connection_opened(connection)
+    _local.pending = []
+    try:
+        _retry("BEGIN IMMEDIATE", connection, "begin")
+        try:
+            yield connection
+            events = _local.pending
+            if events:
+                _write_versions(connection, events)  # Committed, or rolled back, with the changes themselves
+            if events and changes.outbox_enabled:
+                _write_outbox(connection, events)
+            _retry("COMMIT", connection, "commit")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+    finally:
+        _local.pending = None
+        connection.close()
+    changes.deliver(events)
+
+
+@contextmanager
+def transaction():
+    """Run all database calls made in the block by this thread in one transaction on one connection.
+
+    The transaction is a write_transaction(): it commits when the block exits normally and rolls back if it raises.
+    Nested blocks join the outermost transaction.
+    """
+    if getattr(_local, 'connection', None) is not None:
+        yield
+        return
+    try:
+        with write_transaction() as connection:
+            _local.connection = connection
+            yield
+    finally:
+        _local.connection = None
+
+
+def atomic(func):
+    """Decorator running every call of func as one unit of work, inside transaction().
+
+    All statements of the call share one connection and one commit. A call made inside a transaction() block, or
+    from another atomic function, joins that unit of work, so callers can group several operations into one commit.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with transaction():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def create_read_only_connection():
+    """Create a read-only connection to the SQLite database."""
+    connection = sqlite3.connect(f"{Path(DB_FILE).resolve().as_uri()}?mode=ro", uri=True,
+                                 timeout=BUSY_TIMEOUT_MS / 1000)
+    return query_stats.connection_opened(connection)
 
 
 def close_connection(connection):
@@ -16,9 +228,93 @@ def close_connection(connection):
     connection.close()
 
 
+def _explain(sql):
+    """Return the EXPLAIN QUERY PLAN details of a statement, using an untraced read-only connection."""
+    connection = sqlite3.connect(f"{Path(DB_FILE).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        return [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    finally:
+        connection.close()
+
+
+instrumented = query_stats.instrumented(_explain)
+
+
+def get_storage_stats():
+    """Return call counts, latencies, rows returned and connections opened per storage function.
+
+    Statistics are only recorded while enabled, see storage.query_stats. Write retries are always counted.
+    """
+    return query_stats.get_stats()
+
+
+def get_habit_version(habit_id):
+    """Return the committed data version of a habit, or None while this thread's transaction has uncommitted writes."""
+    return _read_version("habit", habit_id)
+
+
+def get_user_version(user_id):
+    """Return the committed data version of a user's habits, or None like get_habit_version."""
+    return _read_version("user", user_id)
+
+
+def _read_version(scope, key):
+    """Return (version of everything, version of the scope's row) as committed in the DataVersion table."""
+    if getattr(_local, 'pending', None):
+        return None  # Reads in the transaction see its writes, which may still roll back
+    path, connection = getattr(_local, 'version_connection', (None, None))
+    if path != DB_FILE:
+        if connection is not None:
+            connection.close()
+        # Kept open, as one is read before every cached analytics call
+        connection = sqlite3.connect(DB_FILE, timeout=BUSY_TIMEOUT_MS / 1000)
+        _local.version_connection = (DB_FILE, connection)
+    return connection.execute("""
+    SELECT COALESCE((SELECT version FROM DataVersion WHERE scope = ? AND key = 0), 0),
+           COALESCE((SELECT version FROM DataVersion WHERE scope = ? AND key = ?), 0)
+    """, (ALL_SCOPE, scope, key)).fetchone()
+
+
+def _write_versions(connection, events):
+    """Bump the data versions of the habits and users named by change events."""
+    if any(event.kind == changes.TABLE_CLEARED for event in events):
+        rows = {(ALL_SCOPE, 0)}
+    else:
+        rows = {("habit", event.habit_id) for event in events if event.habit_id is not None}
+        rows.update(("user", event.user_id) for event in events if event.user_id is not None)
+    connection.executemany("""
+    INSERT INTO DataVersion (scope, key, version) VALUES (?, ?, 1)
+    ON CONFLICT (scope, key) DO UPDATE SET version = version + 1
+    """, list(rows))
+
+
+def _write_outbox(connection, events):
+    """Append change events to the ChangeOutbox table."""
+    now = datetime.now()
+    connection.executemany("""
+    INSERT INTO ChangeOutbox (kind, user_id, habit_id, log_id, count, created_at) VALUES (?, ?, ?, ?, ?, ?)
+    """, [(*event, now) for event in events])
+
+
+def _publish(*events):
+    """Publish the change events of a write, see storage.changes.
+
+    Called inside the write_transaction() block making the change: the events are written to the outbox with the
+    change, delivered when it commits and dropped if it rolls back. Called outside of one, they get a transaction
+    of their own.
+    """
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending.extend(events)
+        return
+    with write_transaction():
+        _local.pending.extend(events)
+
+
+@instrumented
 def create_tables():
     """Create necessary tables if they do not exist."""
-    with create_connection() as connection:
+    with write_transaction() as connection:
         cursor = connection.cursor()
 
         cursor.execute("""
@@ -54,13 +350,136 @@ def create_tables():
             log_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             success INTEGER DEFAULT 0,
             note TEXT,
+            period_key TEXT,
             FOREIGN KEY (habit_id) REFERENCES Habit (habit_id)
         )
         """)
 
-    print("Tables created successfully.")
+        # Databases created before period keys existed get the column, and their completions the keys
+        if "period_key" not in [row[1] for row in cursor.execute("PRAGMA table_info(Log)")]:
+            cursor.execute("ALTER TABLE Log ADD COLUMN period_key TEXT")
+            _backfill_period_keys(cursor)
+
+        # At most one completion per habit and period; NULL keys never conflict
+        cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_log_completion_period ON Log (habit_id, period_key)
+        WHERE note = 'Habit completed successfully on time'
+        """)
+
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_log_habit_time ON Log (habit_id, log_time DESC, log_id DESC)
+        """)
+
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_habit_active_deadline ON Habit (active, deadline)
+        """)
+
+        # Every index ends with the rowid, so this one serves "events of a habit after log_id X" range scans
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_log_habit ON Log (habit_id)
+        """)
+
+        # Folded habit state up to last_log_id, so rebuilding a habit only reads the events logged since
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS HabitSnapshot (
+            habit_id INTEGER PRIMARY KEY,
+            last_log_id INTEGER NOT NULL,
+            last_log_time TIMESTAMP,
+            completions INTEGER NOT NULL,
+            trailing_misses INTEGER NOT NULL,
+            active INTEGER NOT NULL,
+            activated_at TIMESTAMP
+        )
+        """)
+
+        # Data versions of habits and users, bumped by every committed change; see get_habit_version
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS DataVersion (
+            scope TEXT NOT NULL,
+            key INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID
+        """)
+
+        # Change events for other processes to tail, only written while the outbox is enabled
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ChangeOutbox (
+            event_id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            user_id INTEGER,
+            habit_id INTEGER,
+            log_id INTEGER,
+            count INTEGER NOT NULL DEFAULT 1,
+            created_at TIMESTAMP NOT NULL
+        )
+        """)
+
+        try:
+            _create_search_index(cursor)
+        except sqlite3.OperationalError as e:
+            if "fts5" not in str(e):
+                raise
+            logger.warning("Full-text search is unavailable, this SQLite build lacks FTS5: %s", e)
+
+    logger.debug("Tables created successfully.")
+
 
+def _backfill_period_keys(cursor):
+    """Set the period key of existing completions, computed from the habit's periodicity as Habit.mark_complete does.
 
+    Only the first completion of a period gets the key, so the unique index can be built over data that completed
+    a period twice; completions of habits with an unknown periodicity or log time keep NULL.
+    """
+    from app.periodicity import get_periodicity
+
+    cursor.execute("""
+    SELECT Log.log_id, Log.habit_id, Log.log_time, Habit.periodicity
+    FROM Log JOIN Habit ON Habit.habit_id = Log.habit_id
+    WHERE Log.note = 'Habit completed successfully on time'
+    ORDER BY Log.log_time, Log.log_id
+    """)
+    keys = {}  # (habit_id, period_key) -> log_id of its first completion
+    for log_id, habit_id, log_time, periodicity in cursor.fetchall():
+        try:
+            period_key = get_periodicity(periodicity).key(datetime.fromisoformat(log_time))
+        except (TypeError, ValueError):
+            continue
+        keys.setdefault((habit_id, period_key), log_id)
+    cursor.executemany("""
+    UPDATE Log SET period_key = ? WHERE log_id = ?
+    """, [(period_key, log_id) for (_, period_key), log_id in keys.items()])
+    logger.info("Set the period key of %d completions.", len(keys), extra={"rows_touched": len(keys)})
+
+
+def _create_search_index(cursor):
+    """Create the full-text tables and their triggers, indexing the existing rows when the tables are new."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'HabitSearch'")
+    exists = cursor.fetchone() is not None
+    # The porter stemmer lets "read" find "reading"; the prefix indexes serve short "re*" style queries
+    for table, columns in (("HabitSearch", "owner, name, description"), ("NoteSearch", "owner, note")):
+        cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+            {columns}, tokenize = 'porter unicode61 remove_diacritics 2', prefix = '2 3'
+        )
+        """)
+    for sql in SEARCH_TRIGGERS.values():
+        cursor.execute(sql)
+    if exists:
+        return
+    # Rank habits by bm25 with name matches counting most; the owner column only filters and never adds to the score
+    cursor.execute("INSERT INTO HabitSearch (HabitSearch, rank) VALUES ('rank', 'bm25(0.0, 10.0, 4.0)')")
+    cursor.execute("""
+    INSERT INTO HabitSearch (rowid, owner, name, description)
+    SELECT habit_id, 'user' || user_id, name, description FROM Habit
+    """)
+    cursor.execute("""
+    INSERT INTO NoteSearch (rowid, owner, note)
+    SELECT Log.log_id, 'user' || Habit.user_id, Log.note FROM Log JOIN Habit ON Habit.habit_id = Log.habit_id
+    """)
+
+
+@instrumented
 def create_user(username, password, created_at):
     sql = """
         INSERT INTO User (username, password, created_at, last_login)
@@ -68,22 +487,25 @@ def create_user(username, password, created_at):
     """
     last_login = datetime.now().isoformat()
     try:
-        with create_connection() as conn:
+        with write_transaction() as conn:
             cursor = conn.cursor()
             cursor.execute(sql, (username, password, created_at, last_login))
             user_id = cursor.lastrowid  # Get the last inserted ID
-            print(f"New user ID: {user_id}")  # Debug print
-            return user_id
+            logger.debug("New user ID: %s", user_id, extra={"user_id": user_id})
+            _publish(ChangeEvent(changes.USER_CHANGED, user_id))
+        return user_id
     except sqlite3.IntegrityError as e:
-        print(f"Integrity error: {e}")
+        logger.warning("Integrity error: %s", e)
         raise
     except Exception as e:
-        print(f"Error creating user: {e}")
+        logger.error("Error creating user: %s", e)
         raise
 
 
-def get_user_by_username(username):
+@instrumented
+def get_user_by_username(username, row_factory=None):
     with create_connection() as connection:
+        connection.row_factory = row_factory
         cursor = connection.cursor()
         cursor.execute("""
         SELECT * FROM User WHERE username = ?
@@ -91,6 +513,18 @@ def get_user_by_username(username):
         return cursor.fetchone()
 
 
+@instrumented
+def get_user_ids():
+    """Retrieve the IDs of all users."""
+    with create_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("""
+        SELECT user_id FROM User ORDER BY user_id
+        """)
+        return [row[0] for row in cursor.fetchall()]
+
+
+@instrumented
 def update_last_login(username):
     sql = """
         UPDATE User
@@ -98,15 +532,17 @@ def update_last_login(username):
         WHERE username = ?
     """
     now = datetime.now()
-    with create_connection() as conn:
+    with write_transaction() as conn:
         cursor = conn.cursor()
         cursor.execute(sql, (now, username))
-        conn.commit()
-        print(f"Last login updated for user_id {username}.")
+        for (user_id,) in cursor.execute("SELECT user_id FROM User WHERE username = ?", (username,)):
+            _publish(ChangeEvent(changes.USER_CHANGED, user_id))
+        logger.debug("Last login updated for user %s.", username)
 
 
+@instrumented
 def update_user(user_id, username=None, password=None):
-    with create_connection() as connection:
+    with write_transaction() as connection:
         cursor = connection.cursor()
         if username:
             cursor.execute("""
@@ -116,19 +552,27 @@ def update_user(user_id, username=None, password=None):
             cursor.execute("""
             UPDATE User SET password = ? WHERE user_id = ?
             """, (password, user_id))
-        print(f"User with ID {user_id} updated successfully.")
+        logger.debug("User with ID %s updated successfully.", user_id, extra={"user_id": user_id})
+        _publish(ChangeEvent(changes.USER_CHANGED, user_id))
 
 
+@instrumented
 def delete_user(user_id):
     """Delete a user from the database and all associated habits and logs."""
-    with create_connection() as connection:
+    with write_transaction() as connection:
         cursor = connection.cursor()
+        cursor.execute("SELECT habit_id FROM Habit WHERE user_id = ?", (user_id,))
+        habit_ids = [row[0] for row in cursor.fetchall()]
 
         # Delete logs associated with the user's habits
         cursor.execute("""
         DELETE FROM Log WHERE habit_id IN (SELECT habit_id FROM Habit WHERE user_id = ?)
         """, (user_id,))
 
+        cursor.execute("""
+        DELETE FROM HabitSnapshot WHERE habit_id IN (SELECT habit_id FROM Habit WHERE user_id = ?)
+        """, (user_id,))
+
         # Delete the user's habits
         cursor.execute("""
         DELETE FROM Habit WHERE user_id = ?
@@ -139,23 +583,30 @@ def delete_user(user_id):
         DELETE FROM User WHERE user_id = ?
         """, (user_id,))
 
-        print(f"User with ID {user_id} and all associated habits and logs deleted successfully.")
+        logger.debug("User with ID %s and all associated habits and logs deleted successfully.", user_id,
+                     extra={"user_id": user_id})
+        _publish(*(ChangeEvent(changes.HABIT_DELETED, user_id, habit_id) for habit_id in habit_ids),
+                 ChangeEvent(changes.USER_CHANGED, user_id))
 
 
+@instrumented
 def create_habit(user_id, name, description, periodicity, duration, active, deadline, streak, created_at):
-    with create_connection() as connection:
+    with write_transaction() as connection:
         cursor = connection.cursor()
         cursor.execute("""
         INSERT INTO Habit (user_id, name, description, periodicity, duration, active, deadline, streak, created_at)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (user_id, name, description, periodicity, duration, active, deadline, streak, created_at))
-        print(f"Habit '{name}' created successfully.")
-        return cursor.lastrowid
+        habit_id = cursor.lastrowid
+        logger.debug("Habit '%s' created successfully.", name, extra={"habit_id": habit_id, "user_id": user_id})
+        _publish(ChangeEvent(changes.HABIT_CREATED, user_id, habit_id))
+    return habit_id
 
 
-def get_habits_by_user(user_id):
+@instrumented
+def get_habits_by_user(user_id, row_factory=sqlite3.Row):
     with create_connection() as connection:
-        connection.row_factory = sqlite3.Row
+        connection.row_factory = row_factory
         cursor = connection.cursor()
         cursor.execute("""
         SELECT * FROM Habit WHERE user_id = ?
@@ -163,38 +614,34 @@ def get_habits_by_user(user_id):
         return cursor.fetchall()
 
 
+@instrumented
+def get_periodicities():
+    """Return the distinct periodicities of active habits."""
+    with create_connection() as connection:
+        return [row[0] for row in connection.execute("SELECT DISTINCT periodicity FROM Habit WHERE active = 1")]
+
+
+@instrumented
 def get_habit_by_id(habit_id):
-    from app.habit import Habit
+    from app.habit import habit_from_row
 
     with create_connection() as connection:
+        connection.row_factory = habit_from_row  # Columns are matched by name, timestamps parsed on first use
         cursor = connection.cursor()
         cursor.execute("""
         SELECT *
         FROM Habit WHERE habit_id = ?
         """, (habit_id,))
-        habit_data = cursor.fetchone()
-
-        if habit_data:
-            habit = Habit(
-                habit_id=habit_data[0],
-                user_id=habit_data[1],
-                name=habit_data[2],
-                description=habit_data[3],
-                periodicity=habit_data[4],
-                duration=habit_data[5],
-                active=habit_data[6],
-                deadline=datetime.fromisoformat(habit_data[7]),
-                streak=habit_data[8],
-                created_at=habit_data[9]
-            )
-            return habit
-        return None
+        return cursor.fetchone()
 
 
+@instrumented
 def update_habit(habit_id, name=None, description=None, periodicity=None, duration=None, active=None, deadline=None,
                  streak=None):
-    with create_connection() as connection:
+    with write_transaction() as connection:
         cursor = connection.cursor()
+        cursor.execute("SELECT user_id FROM Habit WHERE habit_id = ?", (habit_id,))
+        owner = cursor.fetchone()
         if name:
             cursor.execute("""
             UPDATE Habit SET name = ? WHERE habit_id = ?
@@ -223,27 +670,152 @@ def update_habit(habit_id, name=None, description=None, periodicity=None, durati
             cursor.execute("""
             UPDATE Habit SET streak = ? WHERE habit_id = ?
             """, (streak, habit_id))
-        print(f"Habit with ID {habit_id} updated successfully.")
+        logger.debug("Habit with ID %s updated successfully.", habit_id, extra={"habit_id": habit_id})
+        _publish(ChangeEvent(changes.HABIT_UPDATED, owner[0] if owner else None, habit_id))
 
 
+@instrumented
 def delete_habit(habit_id):
     """Delete a habit from the database and all associated logs."""
-    with create_connection() as connection:
+    with write_transaction() as connection:
         cursor = connection.cursor()
+        cursor.execute("SELECT user_id FROM Habit WHERE habit_id = ?", (habit_id,))
+        owner = cursor.fetchone()
 
         # Delete logs associated with the habit
         cursor.execute("""
         DELETE FROM Log WHERE habit_id = ?
         """, (habit_id,))
 
+        cursor.execute("""
+        DELETE FROM HabitSnapshot WHERE habit_id = ?
+        """, (habit_id,))
+
         # Delete the habit
         cursor.execute("""
         DELETE FROM Habit WHERE habit_id = ?
         """, (habit_id,))
 
-        print(f"Habit with ID {habit_id} and all associated logs deleted successfully.")
+        logger.debug("Habit with ID %s and all associated logs deleted successfully.", habit_id,
+                     extra={"habit_id": habit_id})
+        _publish(ChangeEvent(changes.HABIT_DELETED, owner[0] if owner else None, habit_id))
+
+
+@instrumented
+def deactivate_overdue_habits(now=None):
+    """Deactivate every active habit whose deadline has passed and log the deactivation.
+
+    The overdue habits of all users are found with one query on the (active, deadline) index, then updated and
+    logged with batched statements in a single transaction. Returns the IDs of the deactivated habits.
+    """
+    now = now or datetime.now()
+    with write_transaction() as connection:
+        cursor = connection.cursor()
+        cursor.execute("""
+        SELECT habit_id, user_id FROM Habit WHERE active = 1 AND deadline < ?
+        """, (now,))
+        overdue = cursor.fetchall()
+        cursor.executemany("""
+        UPDATE Habit SET active = 0 WHERE habit_id = ?
+        """, [(habit_id,) for habit_id, _ in overdue])
+        cursor.executemany("""
+        INSERT INTO Log (habit_id, success, note, log_time)
+        VALUES (?, 0, 'Habit deactivated - deadline exceeded', ?)
+        """, [(habit_id, now) for habit_id, _ in overdue])
+        _publish(*(ChangeEvent(changes.HABIT_UPDATED, user_id, habit_id) for habit_id, user_id in overdue),
+                 *(ChangeEvent(changes.LOG_APPENDED, user_id, habit_id) for habit_id, user_id in overdue))
+
+    return [habit_id for habit_id, _ in overdue]
+
+
+@instrumented
+def record_missed_periods(periodicity, period_start, period_end, shard=0, shards=1):
+    """Log an incomplete event for active habits that got no completion in the given period.
+
+    Habits created during the period are skipped, as their first period is the next one. Only habits with
+    user_id % shards == shard are handled, so disjoint shards can run in parallel. The event is logged at
+    period_end and habits that already have it are skipped, which makes re-running a period harmless. Returns the
+    IDs of the habits that were marked as incomplete.
+    """
+    with write_transaction() as connection:
+        cursor = connection.cursor()
+        cursor.execute("""
+        SELECT habit_id, user_id FROM Habit AS h
+        WHERE active = 1 AND periodicity = ? AND created_at < ? AND deadline > ? AND user_id % ? = ?
+        AND NOT EXISTS (
+            SELECT 1 FROM Log WHERE habit_id = h.habit_id AND log_time >= ? AND log_time < ?
+            AND note = 'Habit completed successfully on time'
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM Log WHERE habit_id = h.habit_id AND log_time = ? AND note = 'Habit marked as incomplete'
+        )
+        """, (periodicity, period_start, period_start, shards, shard, period_start, period_end, period_end))
+        missed = cursor.fetchall()
+        cursor.executemany("""
+        INSERT INTO Log (habit_id, success, note, log_time)
+        VALUES (?, 0, 'Habit marked as incomplete', ?)
+        """, [(habit_id, period_end) for habit_id, _ in missed])
+        _publish(*(ChangeEvent(changes.LOG_APPENDED, user_id, habit_id) for habit_id, user_id in missed))
+
+    return [habit_id for habit_id, _ in missed]
+
+
+@instrumented
+def update_streaks(streaks):
+    """Store the streaks of a {habit_id: streak} mapping with one batched statement."""
+    if not streaks:
+        return
+    with write_transaction() as connection:
+        connection.executemany("""
+        UPDATE Habit SET streak = ? WHERE habit_id = ?
+        """, [(streak, habit_id) for habit_id, streak in streaks.items()])
+        owners = connection.execute("""
+        SELECT habit_id, user_id FROM Habit WHERE habit_id IN (SELECT value FROM json_each(?))
+        """, (json.dumps(list(streaks)),)).fetchall()
+        logger.debug("Updated the streaks of %d habits.", len(owners), extra={"rows_touched": len(owners)})
+        _publish(*(ChangeEvent(changes.HABIT_UPDATED, user_id, habit_id) for habit_id, user_id in owners))
+
+
+def _owner(connection, habit_id):
+    """Return the user ID owning a habit, or None if it does not exist."""
+    row = connection.execute("SELECT user_id FROM Habit WHERE habit_id = ?", (habit_id,)).fetchone()
+    return row[0] if row else None
 
 
+@instrumented
+def add_completion(habit_id, period_key, log_time):
+    """Log a completion of a habit for the period with the given key, unless that period is already completed.
+
+    The check and the insert are one statement against the idx_log_completion_period unique index, so concurrent
+    callers cannot both complete the same period. Returns the new log ID, or None if the period was completed.
+    """
+    with write_transaction() as connection:
+        cursor = connection.execute("""
+        INSERT OR IGNORE INTO Log (habit_id, success, note, log_time, period_key)
+        VALUES (?, 1, 'Habit completed successfully on time', ?, ?)
+        """, (habit_id, log_time, period_key))
+        log_id = cursor.lastrowid if cursor.rowcount else None
+        if log_id is not None:
+            _publish(ChangeEvent(changes.LOG_APPENDED, _owner(connection, habit_id), habit_id, log_id))
+    if log_id is None:
+        logger.debug("Period %s of habit %s is already completed.", period_key, habit_id,
+                     extra={"habit_id": habit_id})
+        return None
+    logger.debug("New completion log entry ID: %s", log_id, extra={"log_id": log_id, "habit_id": habit_id})
+    return log_id
+
+
+@instrumented
+def has_completion(habit_id, period_key):
+    """Return whether the period with the given key of a habit is already completed."""
+    with create_connection() as connection:
+        cursor = connection.execute("""
+        SELECT 1 FROM Log WHERE habit_id = ? AND period_key = ? AND note = 'Habit completed successfully on time'
+        """, (habit_id, period_key))
+        return cursor.fetchone() is not None
+
+
+@instrumented
 def add_log_entry(habit_id, success, note, log_time):
     """Add a log entry for a habit."""
     sql = """
@@ -251,20 +823,22 @@ def add_log_entry(habit_id, success, note, log_time):
         VALUES (?, ?, ?, ?)
     """
     try:
-        with create_connection() as conn:
+        with write_transaction() as conn:
             cursor = conn.cursor()
             cursor.execute(sql, (habit_id, success, note, log_time))
             log_id = cursor.lastrowid  # Get the last inserted ID
-            print(f"New log entry ID: {log_id}")  # Debug print
-            return log_id
+            logger.debug("New log entry ID: %s", log_id, extra={"log_id": log_id, "habit_id": habit_id})
+            _publish(ChangeEvent(changes.LOG_APPENDED, _owner(conn, habit_id), habit_id, log_id))
+        return log_id
     except sqlite3.IntegrityError as e:
-        print(f"Integrity error: {e}")
+        logger.warning("Integrity error: %s", e)
         raise
     except Exception as e:
-        print(f"Error adding log entry: {e}")
+        logger.error("Error adding log entry: %s", e)
         raise
 
 
+@instrumented
 def get_logs_by_habit(habit_id):
     """Retrieve all logs for a specific habit."""
     with create_connection() as connection:
@@ -276,6 +850,72 @@ def get_logs_by_habit(habit_id):
         return cursor.fetchall()
 
 
+@instrumented
+def get_habit_events(habit_id, after_log_id=0):
+    """Return (log_id, log_time, note) of a habit's logs after after_log_id, in time order."""
+    with create_connection() as connection:
+        cursor = connection.execute("""
+        SELECT log_id, log_time, note FROM Log WHERE habit_id = ? AND log_id > ?
+        """, (habit_id, after_log_id))
+        return sorted(cursor.fetchall(), key=lambda event: (event[1], event[0]))
+
+
+@instrumented
+def get_habit_snapshot(habit_id):
+    """Return the stored snapshot of a habit's folded state, or None."""
+    with create_connection() as connection:
+        connection.row_factory = sqlite3.Row
+        cursor = connection.cursor()
+        cursor.execute("SELECT * FROM HabitSnapshot WHERE habit_id = ?", (habit_id,))
+        return cursor.fetchone()
+
+
+@instrumented
+def save_habit_snapshot(habit_id, last_log_id, last_log_time, completions, trailing_misses, active, activated_at):
+    """Store the folded state of a habit, replacing its previous snapshot."""
+    with write_transaction() as connection:
+        connection.execute("""
+        INSERT OR REPLACE INTO HabitSnapshot
+            (habit_id, last_log_id, last_log_time, completions, trailing_misses, active, activated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (habit_id, last_log_id, last_log_time, completions, trailing_misses, active, activated_at))
+
+
+@instrumented
+def read_outbox(after_event_id=0, limit=1000):
+    """Return up to limit (event_id, ChangeEvent) pairs from the ChangeOutbox table after after_event_id."""
+    with create_connection() as connection:
+        cursor = connection.execute("""
+        SELECT event_id, kind, user_id, habit_id, log_id, count FROM ChangeOutbox
+        WHERE event_id > ? ORDER BY event_id LIMIT ?
+        """, (after_event_id, limit))
+        return [(row[0], ChangeEvent(*row[1:])) for row in cursor.fetchall()]
+
+
+@instrumented
+def get_outbox_position(before=None):
+    """Return the ID of the newest ChangeOutbox event, or of the newest created before a moment; 0 if there is none."""
+    with create_connection() as connection:
+        if before is None:
+            return connection.execute("SELECT coalesce(max(event_id), 0) FROM ChangeOutbox").fetchone()[0]
+        return connection.execute("SELECT coalesce(max(event_id), 0) FROM ChangeOutbox WHERE created_at < ?",
+                                  (before,)).fetchone()[0]
+
+
+@instrumented
+def prune_outbox(before_event_id):
+    """Delete the outbox events up to and including before_event_id and return how many were deleted.
+
+    The newest event is always kept, so new events never reuse the IDs of pruned ones. Event IDs have no gaps
+    otherwise, so a reader finding the next event's ID beyond its position knows it missed pruned events.
+    """
+    with write_transaction() as connection:
+        return connection.execute("""
+        DELETE FROM ChangeOutbox WHERE event_id <= ? AND event_id < (SELECT max(event_id) FROM ChangeOutbox)
+        """, (before_event_id,)).rowcount
+
+
+@instrumented
 def get_last_log_entry(habit_id):
     """Retrieve the last log entry for a specific habit with specific notes."""
     with create_connection() as connection:
@@ -289,54 +929,86 @@ def get_last_log_entry(habit_id):
         return cursor.fetchone()
 
 
+@instrumented
 def clear_user_table():
-    conn = create_connection()
-    if conn is not None:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM User")
-            conn.commit()
-            print("User table cleared successfully.")
-        except sqlite3.Error as e:
-            print(e)
-        finally:
-            conn.close()
-    else:
-        print("Error: Unable to establish database connection.")
+    try:
+        with write_transaction() as connection:
+            connection.execute("DELETE FROM User")
+            _publish(ChangeEvent(changes.TABLE_CLEARED))
+        logger.debug("User table cleared successfully.")
+    except sqlite3.Error as e:
+        logger.error("%s", e)
 
 
+@instrumented
 def clear_habit_table():
-    conn = create_connection()
-    if conn is not None:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM Habit")
-            conn.commit()
-            print("Habit table cleared successfully.")
-        except sqlite3.Error as e:
-            print(e)
-        finally:
-            conn.close()
-    else:
-        print("Error: Unable to establish database connection.")
+    try:
+        with write_transaction() as connection:
+            connection.execute("DELETE FROM Habit")
+            connection.execute("DELETE FROM HabitSnapshot")  # Snapshots are derived from habits and their logs
+            _publish(ChangeEvent(changes.TABLE_CLEARED))
+        logger.debug("Habit table cleared successfully.")
+    except sqlite3.Error as e:
+        logger.error("%s", e)
 
 
+@instrumented
 def clear_log_table():
-    conn = create_connection()
-    if conn is not None:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM Log")
-            conn.commit()
-            print("Log table cleared successfully.")
-        except sqlite3.Error as e:
-            print(e)
-        finally:
-            conn.close()
-    else:
-        print("Error: Unable to establish database connection.")
-
-
+    try:
+        with write_transaction() as connection:
+            connection.execute("DELETE FROM Log")
+            connection.execute("DELETE FROM HabitSnapshot")  # Snapshots are derived from habits and their logs
+            _publish(ChangeEvent(changes.TABLE_CLEARED))
+        logger.debug("Log table cleared successfully.")
+    except sqlite3.Error as e:
+        logger.error("%s", e)
+
+
+@instrumented
+def search(user_id, query, limit=20):
+    """Search the names and descriptions of a user's habits and the notes of their logs.
+
+    Every word of query has to match a word of the text, after stemming; a word ending in * matches as a prefix.
+    Returns up to limit rows with kind ("habit" or "log"), habit_id, log_id, name (of the habit), log_time, a
+    snippet with the matching words in [brackets] and rank. Habits come first, best match (lowest rank) first,
+    followed by log notes, newest first and without a rank: bm25 would have to count every matching note of all
+    users, and the notes are mostly the same status messages.
+    """
+    terms = " ".join('"{}"{}'.format(word.rstrip("*").replace('"', '""'), "*" if word.endswith("*") else "")
+                     for word in query.split() if word.rstrip("*"))
+    if not terms:
+        return []
+    owner = f'owner : "user{int(user_id)}"'
+    with create_connection() as connection:
+        connection.row_factory = sqlite3.Row
+        cursor = connection.cursor()
+        cursor.execute("""
+        SELECT 'habit' AS kind, Habit.habit_id AS habit_id, NULL AS log_id, Habit.name AS name, NULL AS log_time,
+               highlight(HabitSearch, 1, '[', ']')
+               || coalesce(' - ' || nullif(snippet(HabitSearch, 2, '[', ']', '...', 12), ''), '') AS snippet,
+               HabitSearch.rank AS rank
+        FROM HabitSearch JOIN Habit ON Habit.habit_id = HabitSearch.rowid
+        WHERE HabitSearch MATCH ?
+        ORDER BY HabitSearch.rank
+        LIMIT ?
+        """, (f"{owner} AND {{name description}} : ({terms})", limit))
+        rows = cursor.fetchall()
+        if len(rows) < limit:
+            cursor.execute("""
+            SELECT 'log' AS kind, Log.habit_id AS habit_id, Log.log_id AS log_id, Habit.name AS name,
+                   Log.log_time AS log_time, snippet(NoteSearch, 1, '[', ']', '...', 12) AS snippet, NULL AS rank
+            FROM NoteSearch
+            JOIN Log ON Log.log_id = NoteSearch.rowid
+            JOIN Habit ON Habit.habit_id = Log.habit_id
+            WHERE NoteSearch MATCH ?
+            ORDER BY NoteSearch.rowid DESC
+            LIMIT ?
+            """, (f"{owner} AND note : ({terms})", limit - len(rows)))
+            rows += cursor.fetchall()
+        return rows
+
+
+@instrumented
 def count_success(habit_id):
     """Count aggregate success for a specific habit."""
     with create_connection() as connection:
@@ -347,6 +1019,7 @@ def count_success(habit_id):
         return cursor.fetchone()[0]
 
 
+@instrumented
 def count_failure(habit_id):
     """Count aggregate success for a specific habit."""
     with create_connection() as connection:
@@ -357,6 +1030,7 @@ def count_failure(habit_id):
         return cursor.fetchone()[0]
 
 
+@instrumented
 def count_success_by_habit(habit_id):
     """Count aggregate success for a specific habit."""
     with create_connection() as connection:
@@ -367,6 +1041,7 @@ def count_success_by_habit(habit_id):
         return cursor.fetchone()[0]
 
 
+@instrumented
 def count_unsuccessful_by_habit(habit_id):
     """Count aggregate success for a specific habit."""
     with create_connection() as connection:
@@ -377,21 +1052,29 @@ def count_unsuccessful_by_habit(habit_id):
         return cursor.fetchone()[0]
 
 
+# Newest-first walk over all logs of a habit; the trailing incomplete run ends at the first log with another note
+CONSECUTIVE_INCOMPLETE_SQL = """
+                SELECT note FROM Log WHERE habit_id = ? ORDER BY log_time DESC, log_id DESC
+                """
+
+
+@instrumented
 def count_consecutive_incomplete(habit_id):
-    """Count consecutive incomplete logs for a specific habit."""
+    """Count the trailing run of incomplete logs for a specific habit.
+
+    Logs are walked from the newest backwards over the idx_log_habit_time index and the scan stops at the first
+    log that is not an incomplete one, such as a completion, restart or deactivation, so the cost grows with the
+    length of the run rather than the habit's history.
+    """
     with create_connection() as connection:
-        cursor = connection.cursor()
-        cursor.execute("""
-                SELECT COUNT(*) FROM (
-                    SELECT habit_id, success, note, log_time,
-                    CASE WHEN note = 'Habit marked as incomplete' THEN
-                    LAG(note) OVER (ORDER BY log_time) END AS previous_note
-                    FROM Log
-                    WHERE habit_id = ?
-                ) AS subquery
-                WHERE note = 'Habit marked as incomplete' AND (previous_note IS NULL OR previous_note = 'Habit marked as incomplete')
-                """, (habit_id,))
-        return cursor.fetchone()[0]
+        cursor = connection.execute(CONSECUTIVE_INCOMPLETE_SQL, (habit_id,))
+        count = 0
+        for (note,) in cursor:
+            if note != 'Habit marked as incomplete':
+                break
+            count += 1
+        cursor.close()
+        return count
 
 
 if __name__ == '__main__':
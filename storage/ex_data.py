@@ -107,9 +107,12 @@ def create_example_logs(habit, periodicity, duration, base_created_at):
                 "log_time": base_created_at + timedelta(weeks=i)
             } for i in range(duration)]
 
-    # Add the logs to the habit
+    # Add the logs to the habit; completions are stored with the key of their period
     for log_entry in logs:
-        habit.add_log_entry(success=log_entry["success"], note=log_entry["note"], log_time=log_entry["log_time"])
+        if log_entry["note"] == "Habit completed successfully on time":
+            habit.mark_complete(completed_at=log_entry["log_time"])
+        else:
+            habit.add_log_entry(success=log_entry["success"], note=log_entry["note"], log_time=log_entry["log_time"])
 
 
 if __name__ == "__main__":
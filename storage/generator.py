@@ -0,0 +1,212 @@
+"""Seeded generator for large synthetic datasets.
+
+ex_data.py creates one hand-written user; this module builds benchmark and soak datasets of any size. Every habit
+gets a history of one status log per period, produced by a two-state model: a completed period is followed by
+another completion with probability ``keep``, a missed one is followed by a completion with probability
+``recover``. Per habit these are drawn around the configured means, so the data contains long streaks, gaps of
+several misses and restarts after a lapse. Some habits end early: they are deactivated, or deleted, which leaves a
+gap in the habit IDs because deleting a habit removes its rows. Streak, active and deadline columns agree with the
+state folded from the logs (see app.habit_state). The same seed always produces the same dataset.
+
+Rows are written with executemany in large chunks on a single connection inside one transaction, with journaling
+relaxed and the secondary indexes dropped during the load and rebuilt afterwards:
+
+    python -m storage.generator --users 10000 --habits 8 --years 3 --seed 1 --reset
+"""
+import argparse
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from app.habit import Habit
+from app.passwords import hash_password
+from app.periodicity import get_periodicity
+from storage import changes, db_manager
+from storage.changes import ChangeEvent
+
+CHUNK = 50000  # Rows per executemany call
+
+COMPLETED = "Habit completed successfully on time"
+MISSED = "Habit marked as incomplete"
+
+HABIT_NAMES = ["Read for 20 minutes", "Write in a journal", "Go for a run", "Meditate", "Practice a language",
+               "Grocery Shopping", "Attend a Fitness Class", "Practice a Hobby", "Call family", "Clean the flat"]
+
+_SECONDARY_INDEXES = ("idx_log_habit_time", "idx_habit_active_deadline", "idx_log_habit", "idx_log_completion_period")
+
+_USER_SQL = "INSERT INTO User (user_id, username, password, created_at, last_login) VALUES (?, ?, ?, ?, ?)"
+_HABIT_SQL = """
+INSERT INTO Habit (habit_id, user_id, name, description, periodicity, duration, active, deadline, streak, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_LOG_SQL = "INSERT INTO Log (habit_id, success, note, log_time, period_key) VALUES (?, ?, ?, ?, ?)"
+
+
+def _clamp(value):
+    return min(0.99, max(0.01, value))
+
+
+def _habit_count(rng, mean, distribution):
+    # Number of habits of one user: exactly mean, or drawn from a Poisson-like or geometric distribution
+    if distribution == "fixed":
+        return int(mean)
+    if distribution == "geometric":
+        return int(rng.expovariate(1 / mean)) if mean > 0 else 0
+    return max(0, round(rng.gauss(mean, mean ** 0.5)))  # Normal approximation of a Poisson distribution
+
+
+def _history(rng, periodicity, created_at, end, keep, recover):
+    # Return the status logs of one habit as (success, note, log_time, period_key) tuples and its trailing miss
+    # count: one per calendar period from the one after its creation up to end
+    schedule = get_periodicity(periodicity)
+    logs = []
+    completed = True
+    trailing_misses = 0
+    index = schedule.index(created_at) + 1
+    start, stop = (moment.replace(tzinfo=None) for moment in schedule.bounds(index))
+    while stop <= end:
+        completed = rng.random() < (keep if completed else recover)
+        # Completions happen at some time during the period and carry its key, as Habit.mark_complete stores them;
+        # misses are recorded at its end, as the scheduler does
+        if completed:
+            logs.append((1, COMPLETED, start + (stop - start) * rng.random(), f"{schedule.spec}/{index}"))
+        else:
+            logs.append((0, MISSED, stop, None))
+        trailing_misses = 0 if completed else trailing_misses + 1
+        index += 1
+        start, stop = stop, schedule.start(index + 1).replace(tzinfo=None)
+    return logs, trailing_misses
+
+
+def _prepare(connection):
+    # Relax durability for the load and drop the indexes; they are rebuilt once at the end
+    connection.execute("PRAGMA synchronous = OFF")
+    if connection.execute("PRAGMA journal_mode").fetchone()[0] != "wal":  # Leave a WAL database in WAL mode
+        connection.execute("PRAGMA journal_mode = MEMORY")
+    connection.execute("PRAGMA temp_store = MEMORY")
+    connection.execute("PRAGMA cache_size = -262144")  # 256 MiB
+    for index in _SECONDARY_INDEXES:
+        connection.execute(f"DROP INDEX IF EXISTS {index}")
+    # Indexing rows one trigger call at a time is slow; create_tables() rebuilds the search index in one pass
+    for trigger in db_manager.SEARCH_TRIGGERS:
+        connection.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for table in db_manager.SEARCH_TABLES:
+        connection.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def _flush(connection, sql, rows):
+    if rows:
+        connection.executemany(sql, rows)
+        rows.clear()
+
+
+def generate(users=100, habits_per_user=5, years=1, seed=0, distribution="poisson", weekly_share=0.3, keep=0.85,
+             recover=0.4, spread=0.1, deactivated_share=0.05, deleted_share=0.02, end=None, password="password"):
+    """Write a synthetic dataset and return the number of users, habits and logs written.
+
+    users and habits_per_user set the size, distribution ("fixed", "poisson" or "geometric") how the number of
+    habits varies between users, and years how far back histories reach. keep and recover are the mean
+    probabilities of completing a period after a completed or a missed one; spread is how far a habit's own
+    values may differ from them. All users share one password hash, since hashing is deliberately slow.
+    """
+    rng = random.Random(seed)
+    end = end or datetime(2026, 1, 1)
+    start = end - timedelta(days=365 * years)
+    password_hash = hash_password(password)
+
+    db_manager.create_tables()
+    connection = sqlite3.connect(db_manager.DB_FILE)
+    try:
+        _prepare(connection)
+        next_user = (connection.execute("SELECT MAX(user_id) FROM User").fetchone()[0] or 0) + 1
+        next_habit = (connection.execute("SELECT MAX(habit_id) FROM Habit").fetchone()[0] or 0) + 1
+        user_rows, habit_rows, log_rows = [], [], []
+        totals = {"users": 0, "habits": 0, "logs": 0}
+
+        with connection:
+            for user_id in range(next_user, next_user + users):
+                joined = start + timedelta(seconds=rng.random() * (end - start).total_seconds() * 0.5)
+                user_rows.append((user_id, f"user{user_id}", password_hash, joined, end))
+
+                for _ in range(_habit_count(rng, habits_per_user, distribution)):
+                    habit_id = next_habit
+                    next_habit += 1
+                    if rng.random() < deleted_share:
+                        continue  # Deleted habit: its ID stays unused
+
+                    periodicity = "weekly" if rng.random() < weekly_share else "daily"
+                    created_at = joined + timedelta(seconds=rng.random() * (end - joined).total_seconds())
+                    stopped = rng.random() < deactivated_share
+                    habit_end = created_at + (end - created_at) * rng.random() if stopped else end
+                    habit_keep, habit_recover = _clamp(rng.gauss(keep, spread)), _clamp(rng.gauss(recover, spread))
+                    logs, trailing_misses = _history(rng, periodicity, created_at, habit_end, habit_keep,
+                                                     habit_recover)
+
+                    successes = sum(success for success, _, _, _ in logs)
+                    trailing_misses = 0 if stopped else trailing_misses  # The deactivation ends the miss run
+                    streak = successes if successes and trailing_misses < 3 else 0  # As Habit.calculate_streak
+                    # Deadlines follow Habit.calculate_deadline, so the columns agree with the folded log events;
+                    # stopped habits reached theirs at the end of their history, active ones run past the dataset
+                    duration = len(logs) if stopped else len(logs) + rng.randint(1, 52)
+                    deadline = Habit.calculate_deadline(periodicity, duration, created_at)
+                    habit_rows.append((habit_id, user_id, rng.choice(HABIT_NAMES), "Generated habit", periodicity,
+                                       duration, 0 if stopped else 1, deadline, streak, created_at))
+
+                    log_rows.append((habit_id, 1, "Habit created and activated", created_at, None))
+                    log_rows.extend((habit_id, *log) for log in logs)
+                    if stopped:
+                        log_rows.append((habit_id, 0, "Habit deactivated - deadline exceeded", habit_end, None))
+                    totals["habits"] += 1
+                    totals["logs"] += len(logs) + 1 + stopped
+
+                    if len(log_rows) >= CHUNK:
+                        _flush(connection, _LOG_SQL, log_rows)
+                if len(habit_rows) >= CHUNK // 10:
+                    _flush(connection, _HABIT_SQL, habit_rows)
+                    _flush(connection, _USER_SQL, user_rows)
+                totals["users"] += 1
+
+            _flush(connection, _USER_SQL, user_rows)
+            _flush(connection, _HABIT_SQL, habit_rows)
+            _flush(connection, _LOG_SQL, log_rows)
+    finally:
+        connection.close()
+        db_manager.create_tables()  # Rebuild the dropped indexes and the search index, also after a failed load
+
+    db_manager._publish(ChangeEvent(changes.TABLE_CLEARED))  # Subscribers and cached analytics reload everything
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Habit Tracker dataset.")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--habits", type=float, default=5, help="mean number of habits per user")
+    parser.add_argument("--distribution", choices=("fixed", "poisson", "geometric"), default="poisson")
+    parser.add_argument("--years", type=float, default=1, help="length of the generated histories")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--weekly-share", type=float, default=0.3, help="fraction of weekly habits")
+    parser.add_argument("--keep", type=float, default=0.85, help="mean chance of completing after a completion")
+    parser.add_argument("--recover", type=float, default=0.4, help="mean chance of completing after a miss")
+    parser.add_argument("--deactivated-share", type=float, default=0.05)
+    parser.add_argument("--deleted-share", type=float, default=0.02)
+    parser.add_argument("--reset", action="store_true", help="clear all tables first")
+    args = parser.parse_args()
+
+    if args.reset:
+        db_manager.create_tables()
+        db_manager.clear_log_table()
+        db_manager.clear_habit_table()
+        db_manager.clear_user_table()
+
+    begin = time.perf_counter()
+    totals = generate(args.users, args.habits, args.years, args.seed, args.distribution, args.weekly_share,
+                      args.keep, args.recover, deactivated_share=args.deactivated_share,
+                      deleted_share=args.deleted_share)
+    elapsed = time.perf_counter() - begin
+    print(f"Wrote {totals['users']} users, {totals['habits']} habits and {totals['logs']} logs in {elapsed:.1f}s "
+          f"({totals['logs'] / elapsed if elapsed else 0:.0f} logs/s).")
+
+
+if __name__ == "__main__":
+    main()
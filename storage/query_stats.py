@@ -0,0 +1,187 @@
+"""Opt-in timing and statistics for the storage layer.
+
+Every db_manager function is wrapped with instrumented(). While statistics are enabled, each call records its
+latency and the number of rows it returned, and the statements it ran are captured with an sqlite3 trace callback.
+Calls slower than the threshold are logged together with the EXPLAIN QUERY PLAN of their statements.
+
+Statistics are off by default and cost a single flag check per call. Write transactions that had to be retried
+because the database was locked are rare and always counted. Enable the rest with enable() or the environment:
+
+    HABIT_TRACKER_DB_STATS=1            record statistics
+    HABIT_TRACKER_DB_STATS_DUMP=<path>  also write them as JSON at exit ("-" logs them instead)
+    HABIT_TRACKER_SLOW_QUERY_MS=100     threshold for slow call logging
+"""
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+SAMPLES = 10000  # Latencies kept per function for the percentiles
+
+enabled = False
+slow_query_ms = float(os.environ.get("HABIT_TRACKER_SLOW_QUERY_MS", 100))
+
+_lock = threading.Lock()
+_local = threading.local()
+_calls = defaultdict(lambda: {"calls": 0, "errors": 0, "total_s": 0.0, "rows": 0, "statements": 0,
+                              "samples": deque(maxlen=SAMPLES)})
+_connections = 0
+_write_retries = defaultdict(int)  # "begin"/"commit" retries, and "<phase>_gave_up" when retrying did not help
+
+
+def enable(threshold_ms=None):
+    # Start recording statistics, optionally changing the slow call threshold
+    global enabled, slow_query_ms
+    if threshold_ms is not None:
+        slow_query_ms = threshold_ms
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    # Forget all recorded statistics
+    global _connections
+    with _lock:
+        _calls.clear()
+        _connections = 0
+        _write_retries.clear()
+
+
+def _trace(statement):
+    # sqlite3 trace callback: collect the statements run by the innermost instrumented call of this thread
+    statements = getattr(_local, "statements", None)
+    if statements:
+        statements[-1].append(statement)
+
+
+def connection_opened(connection):
+    # Count a new connection and trace its statements; called by db_manager for every connection it opens
+    global _connections
+    if not enabled:
+        return connection
+    with _lock:
+        _connections += 1
+    connection.set_trace_callback(_trace)
+    return connection
+
+
+def record_write_retry(phase, gave_up=False):
+    # Count a write transaction that found the database locked when starting ("begin") or committing ("commit")
+    with _lock:
+        _write_retries[f"{phase}_gave_up" if gave_up else phase] += 1
+
+
+def _row_count(result):
+    # Rows returned by a storage call: lists of rows count their length, a single row or object counts one
+    if isinstance(result, list):
+        return len(result)
+    if result is None or isinstance(result, (int, float, bool, str)):
+        return 0
+    return 1
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def _log_slow_call(name, elapsed, statements, explain):
+    # Log a slow call with the query plan of each statement it ran
+    plans = []
+    for statement in statements:
+        if statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT"):
+            try:
+                plans.append((statement.strip(), explain(statement)))
+            except Exception as e:  # The plan is diagnostic only; never fail the call because of it
+                plans.append((statement.strip(), [f"unavailable: {e}"]))
+    logger.warning("Slow storage call %s took %.1fms", name, elapsed * 1000,
+                   extra={"function": name, "duration": elapsed,
+                          "plans": [{"sql": sql, "plan": plan} for sql, plan in plans]})
+
+
+def instrumented(explain):
+    """Return a decorator recording the statistics of a storage function.
+
+    explain(sql) returns the EXPLAIN QUERY PLAN details of a statement and is only called for slow calls.
+    """
+    def decorator(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            stack = getattr(_local, "statements", None)
+            if stack is None:
+                stack = _local.statements = []
+            stack.append([])
+            start = time.perf_counter()
+            failed = False
+            try:
+                result = func(*args, **kwargs)
+                return result
+            except Exception:
+                failed = True
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                statements = stack.pop()
+                with _lock:
+                    stats = _calls[name]
+                    stats["calls"] += 1
+                    stats["total_s"] += elapsed
+                    stats["statements"] += len(statements)
+                    stats["samples"].append(elapsed)
+                    if failed:
+                        stats["errors"] += 1
+                    else:
+                        stats["rows"] += _row_count(result)
+                if elapsed * 1000 >= slow_query_ms:
+                    _log_slow_call(name, elapsed, statements, explain)
+        return wrapper
+    return decorator
+
+
+def get_stats():
+    """Return the statistics recorded so far, per function and overall."""
+    with _lock:
+        functions = {}
+        for name, stats in sorted(_calls.items()):
+            functions[name] = {
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "statements": stats["statements"],
+                "rows": stats["rows"],
+                "total_ms": stats["total_s"] * 1000,
+                "mean_ms": stats["total_s"] * 1000 / stats["calls"] if stats["calls"] else 0.0,
+                "p50_ms": _percentile(stats["samples"], 0.5) * 1000,
+                "p99_ms": _percentile(stats["samples"], 0.99) * 1000,
+            }
+        return {"enabled": enabled, "connections_opened": _connections, "write_retries": dict(_write_retries),
+                "functions": functions}
+
+
+def dump(path):
+    # Write the statistics as JSON to path, or log them if path is "-"
+    stats = get_stats()
+    if path == "-":
+        logger.warning("Storage statistics: %s", json.dumps(stats))
+    else:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(stats, file, indent=2)
+
+
+if os.environ.get("HABIT_TRACKER_DB_STATS") or os.environ.get("HABIT_TRACKER_DB_STATS_DUMP"):
+    enable()
+    if os.environ.get("HABIT_TRACKER_DB_STATS_DUMP"):
+        atexit.register(dump, os.environ["HABIT_TRACKER_DB_STATS_DUMP"])
@@ -0,0 +1,51 @@
+"""Give every test process a private, throwaway database.
+
+Importing the tests package points db_manager (and, through HABIT_TRACKER_DB, any process started by a test) at a
+fresh copy of an empty database, so the suite never touches storage/habit_tracker.db and several processes, such
+as pytest-xdist workers, can run side by side. The copy is made from a template holding the current schema, built
+once per version of storage/db_manager.py and cached in the temp directory.
+"""
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from storage import db_manager
+
+CACHE_DIR = Path(tempfile.gettempdir()) / "habit_tracker_tests"
+
+
+def _template():
+    # Return the cached empty database with the current schema, building it on first use
+    schema_version = hashlib.sha256(Path(db_manager.__file__).read_bytes()).hexdigest()[:16]
+    template = CACHE_DIR / f"template-{schema_version}.db"
+    if not template.exists():
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        descriptor, building = tempfile.mkstemp(suffix=".db", dir=CACHE_DIR)
+        os.close(descriptor)
+        db_manager.DB_FILE = building
+        db_manager.create_tables()
+        os.replace(building, template)  # Atomic, so a concurrent worker never copies a half-built template
+    return template
+
+
+def _remove(path):
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+
+def use_test_database():
+    """Point the storage layer at a new copy of the template database, removed at exit, and return its path."""
+    template = _template()
+    descriptor, path = tempfile.mkstemp(prefix=f"test-{os.getpid()}-", suffix=".db", dir=CACHE_DIR)
+    os.close(descriptor)
+    shutil.copyfile(template, path)
+    db_manager.DB_FILE = path
+    os.environ["HABIT_TRACKER_DB"] = path
+    atexit.register(_remove, path)
+    return path
+
+
+use_test_database()
@@ -1,9 +1,17 @@
+import subprocess
+import sys
 import unittest
+from pathlib import Path
+
 from app.analytics import (
     get_active_habits, get_habits_by_periodicity, get_longest_streak_all_habits,
-    get_longest_streak_for_habit, get_completion_rate, analyze_logs
+    get_longest_streak_for_habit, get_completion_rate, analyze_logs, get_cache_stats
+)
+from app.habit import Habit
+from storage.db_manager import (
+    clear_habit_table, clear_user_table, clear_log_table, add_log_entry, add_completion, transaction
 )
-from storage.db_manager import clear_habit_table, clear_user_table, clear_log_table
+from datetime import datetime
 from storage.ex_data import setup_tables, create_example_user, create_example_habits
 
 
@@ -72,6 +80,46 @@ class TestAnalytics(unittest.TestCase):
         self.assertIn('failure_logs', analysis)
         print(f"Test passed: Analyzed logs for habit {habit_id}.")
 
+    def test_repeated_analysis_is_cached(self):
+        """Test that repeating an analysis without writes is served from the cache."""
+        habit_id = self.habits[2].habit_id
+        first = analyze_logs(habit_id)
+        hits = get_cache_stats()["hits"]
+        self.assertEqual(analyze_logs(habit_id), first)
+        self.assertEqual(get_cache_stats()["hits"], hits + 1)
+        first["notes"].append("changed by the caller")
+        self.assertNotIn("changed by the caller", analyze_logs(habit_id)["notes"])
+
+    def test_write_invalidates_cached_analysis(self):
+        """Test that a new log entry makes the cached analysis stale."""
+        habit_id = self.habits[3].habit_id
+        before = analyze_logs(habit_id)
+        add_log_entry(habit_id, 1, "Habit completed successfully on time", datetime.now())
+        after = analyze_logs(habit_id)
+        self.assertEqual(after["total_logs"], before["total_logs"] + 1)
+
+    def test_write_of_another_process_invalidates_cached_analysis(self):
+        """Test that a habit deactivated by another process is no longer listed as active."""
+        habit = Habit.create(self.user.user_id, "Other process", "Test Description", "daily", 7)
+        self.assertIn(habit.habit_id, [row["habit_id"] for row in get_active_habits(self.user.user_id)])
+        subprocess.run([sys.executable, "-c", "import sys; from storage.db_manager import update_habit; "
+                        "update_habit(int(sys.argv[1]), active=0)", str(habit.habit_id)],
+                       cwd=Path(__file__).resolve().parent.parent, check=True)  # Same database, see tests/__init__
+        self.assertNotIn(habit.habit_id, [row["habit_id"] for row in get_active_habits(self.user.user_id)])
+
+    def test_rolled_back_writes_leave_cached_analysis_unchanged(self):
+        """Test that analytics read inside a rolled back transaction are neither cached nor kept afterwards."""
+        habit_id = self.habits[4].habit_id
+        rate, analysis = get_completion_rate(habit_id), analyze_logs(habit_id)
+        with self.assertRaises(RuntimeError):
+            with transaction():
+                add_completion(habit_id, "rolled-back/1", datetime.now())
+                self.assertEqual(analyze_logs(habit_id)["total_logs"], analysis["total_logs"] + 1)
+                get_completion_rate(habit_id)
+                raise RuntimeError("abort")
+        self.assertEqual(get_completion_rate(habit_id), rate)
+        self.assertEqual(analyze_logs(habit_id), analysis)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from unittest.mock import Mock, patch
+
+from benchmarks.bench import compare, measure
+
+
+class TestBench(unittest.TestCase):
+
+    def test_measure_times_only_the_timed_runs(self):
+        """Test that warmup calls are not timed and the statistics follow the timed samples."""
+        run = Mock()
+        clock = [0.0, 0.001, 1.0, 1.002, 2.0, 2.003, 3.0, 3.010]  # Samples of 1, 2, 3 and 10 ms
+        with patch("benchmarks.bench.time.perf_counter", side_effect=clock):
+            result = measure(run, warmup=2, runs=4)
+        self.assertEqual(run.call_count, 6)
+        self.assertAlmostEqual(result["median_ms"], 2.5)
+        self.assertAlmostEqual(result["min_ms"], 1.0)
+        self.assertAlmostEqual(result["p95_ms"], 10.0)
+        self.assertAlmostEqual(result["ops_per_s"], 250.0)
+
+    def test_compare_passes_within_threshold(self):
+        """Test that slowdowns up to the threshold, speedups and new cases are not regressions."""
+        baseline = {"search@100": {"median_ms": 10.0}, "analyze_logs@100": {"median_ms": 4.0}}
+        results = {"search@100": {"median_ms": 11.9}, "analyze_logs@100": {"median_ms": 1.0},
+                   "delete_user@100": {"median_ms": 50.0}}
+        self.assertEqual(compare(results, baseline, 0.2), [])
+
+    def test_compare_fails_beyond_threshold(self):
+        """Test that a case slower than the baseline by more than the threshold is reported."""
+        baseline = {"search@100": {"median_ms": 10.0}, "analyze_logs@100": {"median_ms": 4.0}}
+        results = {"search@100": {"median_ms": 12.5}, "analyze_logs@100": {"median_ms": 4.1}}
+        self.assertEqual(compare(results, baseline, 0.2), [("search@100", 10.0, 12.5)])
+
+    def test_compare_uses_the_given_metric(self):
+        """Test that another metric, such as the startup benchmark's wall time, can be compared."""
+        baseline = {"main_menu": {"wall_ms": 100.0, "import_ms": 10.0}}
+        results = {"main_menu": {"wall_ms": 130.0, "import_ms": 10.0}}
+        self.assertEqual(compare(results, baseline, 0.2, "wall_ms"), [("main_menu", 100.0, 130.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
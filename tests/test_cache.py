@@ -0,0 +1,60 @@
+import unittest
+from app.cache import AnalyticsCache, versioned
+
+
+class TestAnalyticsCache(unittest.TestCase):
+
+    def setUp(self):
+        """Create an empty cache for each test."""
+        self.cache = AnalyticsCache(maxsize=2)
+
+    def test_get_miss_and_hit(self):
+        """Test that a stored value is returned and counted as a hit."""
+        self.assertEqual(self.cache.get("key"), (False, None))
+        self.cache.put("key", 42)
+        self.assertEqual(self.cache.get("key"), (True, 42))
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        self.cache.put("a", 1)
+        self.cache.put("b", 2)
+        self.cache.get("a")  # "b" is now the least recently used entry
+        self.cache.put("c", 3)
+        self.assertEqual(self.cache.get("b"), (False, None))
+        self.assertEqual(self.cache.get("a"), (True, 1))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_versioned_recomputes_on_version_change(self):
+        """Test that a new data version forces the function to run again."""
+        versions = {1: 0}
+        calls = []
+
+        @versioned(self.cache, lambda key: versions[key])
+        def compute(key):
+            calls.append(key)
+            return len(calls)
+
+        self.assertEqual(compute(1), 1)
+        self.assertEqual(compute(1), 1)
+        versions[1] += 1
+        self.assertEqual(compute(1), 2)
+        self.assertEqual(len(calls), 2)
+
+    def test_versioned_returns_copies(self):
+        """Test that changing a returned result does not change the cached one."""
+        @versioned(self.cache, lambda key: 0)
+        def compute(key):
+            return {"notes": [key]}
+
+        compute(1)["notes"].append(2)
+        compute(1)["notes"].clear()
+        self.assertEqual(compute(1), {"notes": [1]})
+        self.assertEqual(self.cache.stats()["hits"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
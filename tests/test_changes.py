@@ -0,0 +1,119 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from storage import changes, db_manager
+from storage.db_manager import (
+    add_log_entry, clear_habit_table, clear_log_table, clear_user_table, create_habit, prune_outbox, read_outbox,
+    transaction, update_habit, update_last_login
+)
+from storage.ex_data import setup_tables, create_example_user
+
+
+class TestChanges(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test database and create example user."""
+        setup_tables()
+        cls.user = create_example_user()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clear the habit, user and log tables after all tests."""
+        clear_habit_table()
+        clear_user_table()
+        clear_log_table()
+
+    def setUp(self):
+        """Create a habit and subscribe to the change feed."""
+        self.now = datetime(2024, 1, 1, 8, 0)
+        self.habit_id = create_habit(self.user.user_id, "Read", "Read a chapter", "daily", 30, 1, self.now, 0,
+                                     self.now)
+        self.subscription = changes.subscribe()
+
+    def tearDown(self):
+        """Close the subscription and remove the habits created for the test."""
+        self.subscription.close()
+        changes.enable_outbox(False)
+        clear_log_table()
+        clear_habit_table()
+
+    def test_burst_is_coalesced(self):
+        """Test that repeated log appends for a habit are delivered as one event with the latest log ID."""
+        log_ids = [add_log_entry(self.habit_id, 1, "Habit completed successfully on time", self.now) for _ in range(5)]
+        events = self.subscription.get(timeout=0)
+        self.assertEqual(events, [changes.ChangeEvent(changes.LOG_APPENDED, self.user.user_id, self.habit_id,
+                                                      log_ids[-1], 5)])
+        self.assertEqual(self.subscription.coalesced, 4)
+
+    def test_kinds_filter(self):
+        """Test that a subscription only receives the kinds it asked for."""
+        with changes.subscribe({changes.HABIT_UPDATED}) as updates:
+            add_log_entry(self.habit_id, 1, "Habit completed successfully on time", self.now)
+            update_habit(self.habit_id, streak=1)
+            self.assertEqual(updates.get(timeout=0),
+                             [changes.ChangeEvent(changes.HABIT_UPDATED, self.user.user_id, self.habit_id)])
+
+    def test_transaction_publishes_on_commit_only(self):
+        """Test that events of a transaction are delivered after it commits and dropped when it rolls back."""
+        with transaction():
+            update_habit(self.habit_id, streak=1)
+            self.assertEqual(self.subscription.get(timeout=0), [])
+        self.assertEqual([event.kind for event in self.subscription.get(timeout=0)], [changes.HABIT_UPDATED])
+
+        with self.assertRaises(RuntimeError):
+            with transaction():
+                update_habit(self.habit_id, streak=2)
+                raise RuntimeError("abort")
+        self.assertEqual(self.subscription.get(timeout=0), [])
+
+    def test_overflow(self):
+        """Test that a subscriber that falls behind gets a single overflow event."""
+        with changes.subscribe(maxsize=2) as slow:
+            for habit_id in range(3):
+                update_habit(habit_id + 1000, streak=1)
+            self.assertEqual(slow.get(timeout=0), [changes.ChangeEvent(changes.OVERFLOW)])
+            self.assertEqual(slow.overflows, 1)
+
+    def test_outbox(self):
+        """Test that enabled outbox events can be read back in order, starting after a given event."""
+        changes.enable_outbox()
+        before = read_outbox()
+        last_event_id = before[-1][0] if before else 0
+        update_habit(self.habit_id, streak=1)
+        log_id = add_log_entry(self.habit_id, 1, "Habit completed successfully on time", self.now)
+        events = [event for _, event in read_outbox(last_event_id)]
+        self.assertEqual(events, [
+            changes.ChangeEvent(changes.HABIT_UPDATED, self.user.user_id, self.habit_id),
+            changes.ChangeEvent(changes.LOG_APPENDED, self.user.user_id, self.habit_id, log_id),
+        ])
+
+    def test_outbox_row_is_written_with_the_change(self):
+        """Test that outside a transaction() block the change and its outbox row share one write transaction."""
+        changes.enable_outbox()
+        with mock.patch.object(db_manager, "write_transaction", wraps=db_manager.write_transaction) as transactions:
+            update_habit(self.habit_id, streak=1)
+        self.assertEqual(transactions.call_count, 1)
+        self.assertEqual(read_outbox()[-1][1], changes.ChangeEvent(changes.HABIT_UPDATED, self.user.user_id,
+                                                                   self.habit_id))
+
+    def test_last_login_is_published(self):
+        """Test that updating a user's last login publishes a user change like the other user writes."""
+        update_last_login(self.user.username)
+        self.assertEqual(self.subscription.get(timeout=0), [changes.ChangeEvent(changes.USER_CHANGED,
+                                                                                self.user.user_id)])
+
+    def test_pruning_keeps_the_newest_outbox_event(self):
+        """Test that pruning everything keeps the newest event, so later events get higher IDs."""
+        changes.enable_outbox()
+        update_habit(self.habit_id, streak=1)
+        newest = read_outbox()[-1][0]
+        self.assertGreater(prune_outbox(newest), 0)
+        self.assertEqual([event_id for event_id, _ in read_outbox()], [newest])
+        update_habit(self.habit_id, streak=2)
+        self.assertEqual([event_id for event_id, _ in read_outbox(newest)], [newest + 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from app.cli import main
+from app.habit import Habit
+from storage.db_manager import clear_habit_table, clear_user_table, clear_log_table
+from storage.ex_data import setup_tables, create_example_user
+
+
+class TestCli(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test database and create example user."""
+        setup_tables()
+        cls.user = create_example_user()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clear the habit, user and log tables after all tests."""
+        clear_habit_table()
+        clear_user_table()
+        clear_log_table()
+
+    def tearDown(self):
+        """Remove the habits created by the test."""
+        clear_log_table()
+        clear_habit_table()
+
+    def run_cli(self, *argv):
+        # Run the CLI and return its exit code and decoded output lines
+        out = io.StringIO()
+        with redirect_stdout(out):
+            code = main(list(argv))
+        return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def write_file(self, directory, name, content):
+        path = Path(directory) / name
+        path.write_text(content, encoding="utf-8")
+        return str(path)
+
+    def test_habit_create_and_mark(self):
+        """Test single commands emit one JSON result each."""
+        code, lines = self.run_cli("habit", "create", "--user", "user123", "--name", "Run", "--periodicity", "daily",
+                                   "--duration", "7")
+        self.assertEqual(code, 0)
+        habit_id = lines[0]["result"]["habit_id"]
+        code, lines = self.run_cli("habit", "mark", "--habit-id", str(habit_id))
+        self.assertEqual(code, 0)
+        self.assertEqual(lines[0]["result"]["streak"], 1)
+
+    def test_csv_batch_applies_all_operations(self):
+        """Test that a CSV batch is applied and reported per operation."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_file(directory, "ops.csv", "op,user,name,periodicity,duration\n"
+                                   + "".join(f"habit.create,user123,Habit {i},weekly,4\n" for i in range(5)))
+            code, lines = self.run_cli("batch", path, "--batch-size", "2")
+        self.assertEqual(code, 0)
+        self.assertEqual(len(Habit.get_all_by_user(self.user.user_id)), 5)
+        self.assertEqual([line["applied"] for line in lines if "applied" in line], [2, 2, 1])
+
+    def test_failing_operation_rolls_back_its_batch(self):
+        """Test that one failing operation undoes the rest of its batch only."""
+        records = [{"op": "habit.create", "user": "user123", "name": "Undone", "periodicity": "daily",
+                    "duration": 3},
+                   {"op": "habit.mark", "habit_id": 999999},
+                   {"op": "habit.create", "user": "user123", "name": "Kept", "periodicity": "daily", "duration": 3}]
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_file(directory, "ops.jsonl", "\n".join(json.dumps(record) for record in records))
+            code, lines = self.run_cli("batch", path, "--batch-size", "2")
+        self.assertEqual(code, 1)
+        self.assertEqual([line["ok"] for line in lines if "batch" in line], [False, True])
+        names = [habit.name for habit in Habit.get_all_by_user(self.user.user_id)]
+        self.assertEqual(names, ["Kept"])
+
+    def test_unknown_operation(self):
+        """Test that an unknown operation is reported as a failed batch."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_file(directory, "ops.json", json.dumps([{"op": "habit.fly"}]))
+            code, lines = self.run_cli("batch", path)
+        self.assertEqual(code, 1)
+        self.assertIn("Unknown operation", lines[0]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from app import dashboard_view
+from app.dashboard_view import DashboardView
+from app.habit import Habit
+from storage import changes, db_manager
+from storage.changes import ChangeEvent
+from storage.db_manager import (
+    clear_habit_table, clear_user_table, clear_log_table, create_habit, update_habit, write_transaction
+)
+from storage.ex_data import setup_tables, create_example_user, create_example_habits
+
+
+class TestDashboardView(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test database and create example user and habits."""
+        setup_tables()
+        cls.user = create_example_user()
+        cls.habits = create_example_habits(cls.user.user_id)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clear the habit, user and log tables after all tests."""
+        clear_habit_table()
+        clear_user_table()
+        clear_log_table()
+
+    def setUp(self):
+        """Create a view that has already been rendered once."""
+        self.view = DashboardView(self.user.user_id)
+        self.assertTrue(self.view.refresh())
+
+    def tearDown(self):
+        """Close the view's change subscription."""
+        self.view.close()
+        changes.enable_outbox(False)
+
+    def test_unchanged_data_skips_the_query(self):
+        """Test that refreshing without writes neither queries nor changes the view."""
+        with patch.object(dashboard_view, "get_active_habits", wraps=dashboard_view.get_active_habits) as query:
+            self.assertFalse(self.view.refresh())
+            query.assert_not_called()
+
+    def test_only_changed_rows_are_rebuilt(self):
+        """Test that updating one habit rebuilds only its row."""
+        habit = self.habits[0]
+        update_habit(habit.habit_id, name="Renamed habit")
+        with patch.object(dashboard_view, "get_active_habits") as query, \
+                patch.object(dashboard_view, "get_habit_by_id", wraps=dashboard_view.get_habit_by_id) as load:
+            self.assertTrue(self.view.refresh())
+        query.assert_not_called()
+        load.assert_called_once_with(habit.habit_id)
+        self.assertEqual((self.view.rebuilt_rows, self.view.updated), (1, [habit.habit_id]))
+        self.assertIn("Renamed habit", [row[0] for row in self.view.rows()])
+
+    def test_other_users_changes_are_ignored(self):
+        """Test that changes to another user's habits do not touch the view."""
+        other = create_habit(self.user.user_id + 1000, "Foreign", "", "daily", 3, 1, datetime.now(), 0,
+                             datetime.now())
+        update_habit(other, name="Still foreign")
+        self.assertFalse(self.view.refresh())
+
+    def test_other_process_writes_arrive_through_outbox(self):
+        """Test that with the outbox enabled, a write committed without this process' change feed is shown."""
+        changes.enable_outbox()
+        self.assertTrue(self.view.refresh())  # Starts tailing the outbox with a reload
+        habit = self.habits[1]
+        with write_transaction() as connection:  # As another process would write it
+            connection.execute("UPDATE Habit SET streak = 42 WHERE habit_id = ?", (habit.habit_id,))
+            db_manager._write_outbox(connection, [ChangeEvent(changes.HABIT_UPDATED, self.user.user_id,
+                                                              habit.habit_id)])
+        self.assertTrue(self.view.refresh())
+        self.assertEqual(self.view.updated, [habit.habit_id])
+        self.assertEqual(self.view.row(habit.habit_id)[2], "42")
+
+    def test_pruned_outbox_events_force_a_reload(self):
+        """Test that a view whose unread outbox events were pruned reloads every row."""
+        changes.enable_outbox()
+        self.assertTrue(self.view.refresh())
+        update_habit(self.habits[1].habit_id, streak=7)
+        update_habit(self.habits[2].habit_id, streak=8)
+        db_manager.prune_outbox(db_manager.get_outbox_position())  # Drops the first of them, unread
+        self.assertTrue(self.view.refresh())
+        self.assertTrue(self.view.reloaded)
+
+    def test_new_and_deactivated_habits(self):
+        """Test that created habits appear and deactivated habits disappear."""
+        rows = len(self.view.rows())
+        habit = Habit.create(self.user.user_id, "New habit", "Added later", "daily", 3)
+        self.assertTrue(self.view.refresh())
+        self.assertEqual(len(self.view.rows()), rows + 1)
+        update_habit(habit.habit_id, active=0)
+        self.assertTrue(self.view.refresh())
+        self.assertEqual(self.view.rebuilt_rows, 0)
+        self.assertEqual(len(self.view.rows()), rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,21 @@
+import sqlite3
+import tempfile
+import threading
 import unittest
 from datetime import datetime
+from unittest import mock
+
+from app.periodicity import get_periodicity
+from storage import db_manager
 from storage.db_manager import (
-    create_tables, create_user, get_user_by_username, update_last_login,
+    create_connection, create_tables, create_user, get_user_by_username, update_last_login,
     update_user, delete_user, create_habit, get_habits_by_user, get_habit_by_id,
     update_habit, delete_habit, add_log_entry, get_logs_by_habit,
     clear_user_table, clear_habit_table, clear_log_table, count_success, count_failure,
-    count_success_by_habit, count_unsuccessful_by_habit, count_consecutive_incomplete, get_last_log_entry
+    count_success_by_habit, count_unsuccessful_by_habit, count_consecutive_incomplete, get_last_log_entry,
+    transaction, get_storage_stats, add_completion, has_completion, search
 )
+from storage import query_stats
 
 
 class TestDBManager(unittest.TestCase):
@@ -154,6 +163,164 @@ class TestDBManager(unittest.TestCase):
         count = count_consecutive_incomplete(self.habit_id)
         self.assertGreater(count, 0)
 
+    def test_count_consecutive_incomplete_counts_trailing_run_only(self):
+        """Test that incomplete logs before the last completion are not counted."""
+        base = datetime(2024, 6, 1, 12, 0, 0, 123456)
+        notes = [(0, "Habit marked as incomplete"), (0, "Habit marked as incomplete"),
+                 (1, "Habit completed successfully on time"), (0, "Habit marked as incomplete"),
+                 (0, "Habit marked as incomplete")]
+        for day, (success, note) in enumerate(notes):
+            add_log_entry(self.habit_id, success, note, base.replace(day=day + 1))
+        self.assertEqual(count_consecutive_incomplete(self.habit_id), 2)
+
+    def test_count_consecutive_incomplete_stops_at_other_notes(self):
+        """Test that a restart or deactivation log ends the trailing run like a completion does."""
+        base = datetime(2024, 6, 1, 12, 0)
+        notes = [(0, "Habit marked as incomplete"), (1, "Habit restarted and activated"),
+                 (0, "Habit marked as incomplete")]
+        for day, (success, note) in enumerate(notes):
+            add_log_entry(self.habit_id, success, note, base.replace(day=day + 1))
+        self.assertEqual(count_consecutive_incomplete(self.habit_id), 1)
+        add_log_entry(self.habit_id, 0, "Habit deactivated - deadline exceeded", base.replace(day=5))
+        self.assertEqual(count_consecutive_incomplete(self.habit_id), 0)
+
+    def test_consecutive_incomplete_uses_index(self):
+        """Test that the trailing scan walks the log index without sorting."""
+        with create_connection() as connection:
+            plan = connection.execute(f"EXPLAIN QUERY PLAN {db_manager.CONSECUTIVE_INCOMPLETE_SQL}",
+                                      (self.habit_id,)).fetchall()
+        details = " ".join(row[-1] for row in plan)
+        self.assertIn("idx_log_habit_time", details)
+        self.assertNotIn("TEMP B-TREE", details)
+
+    def test_add_completion_is_once_per_period(self):
+        """Test that a second completion with the same period key is ignored, and other periods are not."""
+        now = datetime.now()
+        first = add_completion(self.habit_id, "daily/1", now)
+        self.assertIsNotNone(first)
+        self.assertIsNone(add_completion(self.habit_id, "daily/1", now))
+        self.assertIsNotNone(add_completion(self.habit_id, "daily/2", now))
+        self.assertTrue(has_completion(self.habit_id, "daily/1"))
+        self.assertEqual(count_success_by_habit(self.habit_id), 2)
+
+    def test_upgrade_sets_period_keys_of_existing_completions(self):
+        """Test that adding the period_key column keys old completions, so their periods stay completed."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/old.db"
+            old = sqlite3.connect(path)
+            old.executescript("""
+            CREATE TABLE Habit (habit_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, name TEXT NOT NULL,
+                                description TEXT, periodicity TEXT NOT NULL, duration INTEGER NOT NULL,
+                                active INTEGER DEFAULT 1, deadline TIMESTAMP, streak INTEGER DEFAULT 0,
+                                created_at TIMESTAMP);
+            CREATE TABLE Log (log_id INTEGER PRIMARY KEY, habit_id INTEGER NOT NULL, log_time TIMESTAMP,
+                              success INTEGER DEFAULT 0, note TEXT);
+            INSERT INTO Habit (habit_id, user_id, name, periodicity, duration) VALUES (1, 1, 'Run', 'daily', 30);
+            INSERT INTO Log (habit_id, log_time, success, note) VALUES
+                (1, '2024-06-03 08:00:00', 1, 'Habit completed successfully on time'),
+                (1, '2024-06-03 20:00:00', 1, 'Habit completed successfully on time'),
+                (1, '2024-06-04 08:00:00', 0, 'Habit marked as incomplete');
+            """)
+            old.commit()
+            old.close()
+            with mock.patch.object(db_manager, "DB_FILE", path):
+                create_tables()
+                daily = get_periodicity("daily")
+                key = daily.key(datetime(2024, 6, 3))
+                self.assertTrue(has_completion(1, key))
+                self.assertIsNone(add_completion(1, key, datetime(2024, 6, 3, 21)))
+                self.assertIsNotNone(add_completion(1, daily.key(datetime(2024, 6, 4)), datetime(2024, 6, 4, 9)))
+
+    def test_search_follows_habit_and_log_changes(self):
+        """Test that search finds a user's habits and notes, ranks habits first and stays in sync with changes."""
+        other_user = create_user("otheruser", "testpassword", datetime.now())
+        create_habit(other_user, "Reading", "", "daily", 30, 1, datetime.now(), 0, datetime.now())
+        update_habit(self.habit_id, name="Evening reading", description="Twenty pages")
+        log_id = add_log_entry(self.habit_id, 0, "Read only ten pages", datetime.now())
+
+        results = search(self.user_id, "read pages")
+        self.assertEqual([(row["kind"], row["habit_id"], row["log_id"]) for row in results],
+                         [("habit", self.habit_id, None), ("log", self.habit_id, log_id)])
+        self.assertEqual(results[0]["snippet"], "Evening [reading] - Twenty [pages]")
+        self.assertEqual(results[1]["snippet"], "[Read] only ten [pages]")
+        self.assertEqual(len(search(self.user_id, "eve*")), 1)
+
+        delete_habit(self.habit_id)
+        self.assertEqual(search(self.user_id, "read"), [])
+
+    def test_transaction_rolls_back_all_calls(self):
+        """Test that calls inside a failed transaction block are all undone."""
+        with self.assertRaises(RuntimeError):
+            with transaction():
+                add_log_entry(self.habit_id, 1, "Completed", datetime.now())
+                update_habit(self.habit_id, name="renamed")
+                raise RuntimeError("abort")
+        self.assertEqual(len(get_logs_by_habit(self.habit_id)), 0)
+        self.assertEqual(get_habit_by_id(self.habit_id).name, "test habit")
+
+    def test_storage_stats_record_calls_rows_and_connections(self):
+        """Test that enabled statistics count calls, returned rows and opened connections."""
+        query_stats.reset()
+        query_stats.enable(threshold_ms=float("inf"))
+        try:
+            add_log_entry(self.habit_id, 1, "Completed", datetime.now())
+            add_log_entry(self.habit_id, 0, "Missed", datetime.now())
+            get_logs_by_habit(self.habit_id)
+        finally:
+            query_stats.disable()
+        stats = get_storage_stats()
+        self.assertEqual(stats["functions"]["add_log_entry"]["calls"], 2)
+        self.assertEqual(stats["functions"]["get_logs_by_habit"]["rows"], 2)
+        self.assertGreaterEqual(stats["functions"]["get_logs_by_habit"]["statements"], 1)
+        self.assertEqual(stats["connections_opened"], 3)
+        self.assertLessEqual(stats["functions"]["add_log_entry"]["p50_ms"],
+                             stats["functions"]["add_log_entry"]["p99_ms"])
+
+    def test_slow_storage_calls_are_logged_with_query_plan(self):
+        """Test that calls over the threshold are logged with the plan of their statements."""
+        query_stats.enable(threshold_ms=0)
+        try:
+            with self.assertLogs("storage.query_stats", level="WARNING") as logs:
+                count_consecutive_incomplete(self.habit_id)
+        finally:
+            query_stats.disable()
+        plans = logs.records[0].plans
+        self.assertIn("SELECT note FROM Log", plans[0]["sql"])
+        self.assertTrue(any("idx_log_habit_time" in detail for detail in plans[0]["plan"]))
+
+    def _hold_write_lock(self, seconds):
+        """Take the database write lock on another connection and release it after the given time."""
+        connection = sqlite3.connect(db_manager.DB_FILE, isolation_level=None, check_same_thread=False)
+        connection.execute("BEGIN IMMEDIATE")
+        timer = threading.Timer(seconds, lambda: (connection.execute("ROLLBACK"), connection.close()))
+        timer.start()
+        return timer
+
+    @mock.patch.object(db_manager, "BUSY_TIMEOUT_MS", 10)
+    def test_locked_write_is_retried(self):
+        """Test that a write finding the database locked is retried until the lock is released."""
+        query_stats.reset()
+        timer = self._hold_write_lock(0.2)
+        with mock.patch.object(db_manager, "WRITE_RETRIES", 20), mock.patch.object(db_manager, "RETRY_BACKOFF_S", 0.02):
+            update_habit(self.habit_id, name="renamed")
+        timer.join()
+        self.assertEqual(get_habit_by_id(self.habit_id).name, "renamed")
+        self.assertGreater(get_storage_stats()["write_retries"]["begin"], 0)
+
+    @mock.patch.object(db_manager, "BUSY_TIMEOUT_MS", 10)
+    def test_locked_write_gives_up_after_retries(self):
+        """Test that a write still locked after the last retry raises and is counted."""
+        query_stats.reset()
+        timer = self._hold_write_lock(0.5)
+        try:
+            with mock.patch.object(db_manager, "WRITE_RETRIES", 2), mock.patch.object(db_manager, "RETRY_BACKOFF_S", 0):
+                with self.assertRaises(sqlite3.OperationalError):
+                    add_log_entry(self.habit_id, 1, "Completed", datetime.now())
+        finally:
+            timer.join()
+        self.assertEqual(get_storage_stats()["write_retries"], {"begin": 2, "begin_gave_up": 1})
+        self.assertEqual(len(get_logs_by_habit(self.habit_id)), 0)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,90 @@
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from app.habit import Habit
+from app.periodicity import get_periodicity
+from storage import db_manager
+from storage.generator import generate
+
+
+class TestGenerator(unittest.TestCase):
+
+    def setUp(self):
+        """Point the storage layer at a fresh database file."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_file = Path(self.directory.name) / "generated.db"
+        patcher = mock.patch.object(db_manager, "DB_FILE", self.db_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def dump(self):
+        """Return all rows of the database."""
+        connection = sqlite3.connect(self.db_file)
+        rows = [connection.execute(f"SELECT * FROM {table} ORDER BY 1").fetchall()
+                for table in ("User", "Habit", "Log")]
+        connection.close()
+        return rows
+
+    def test_same_seed_produces_same_dataset(self):
+        """Test that generation is reproducible and its totals match the written rows."""
+        totals = generate(users=20, habits_per_user=3, years=0.5, seed=7)
+        first = self.dump()
+        self.assertEqual([len(rows) for rows in first], [totals["users"], totals["habits"], totals["logs"]])
+
+        db_manager.clear_log_table()
+        db_manager.clear_habit_table()
+        db_manager.clear_user_table()
+        generate(users=20, habits_per_user=3, years=0.5, seed=7)
+        self.assertEqual(self.dump()[1:], first[1:])  # Password hashes are salted, so compare habits and logs
+
+    def test_streaks_and_indexes_match_the_application(self):
+        """Test that stored streaks agree with Habit.calculate_streak and the indexes are rebuilt."""
+        generate(users=10, habits_per_user=4, years=1, seed=3, distribution="fixed")
+        connection = sqlite3.connect(self.db_file)
+        habits = connection.execute("SELECT habit_id, streak FROM Habit").fetchall()
+        indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        connection.close()
+
+        self.assertIn("idx_log_habit_time", indexes)
+        for habit_id, streak in habits[:10]:
+            self.assertEqual(Habit.calculate_streak(habit_id), streak)
+
+    def test_failed_generation_restores_indexes_and_triggers(self):
+        """Test that the dropped indexes, search triggers and search tables are back after a load fails halfway."""
+        histories = mock.Mock(side_effect=[([], 0)] * 5 + [RuntimeError("disk full")])
+        with mock.patch("storage.generator._history", histories):
+            with self.assertRaises(RuntimeError):
+                generate(users=5, habits_per_user=3, seed=1, distribution="fixed", deleted_share=0)
+        connection = sqlite3.connect(self.db_file)
+        schema = {row[0] for row in connection.execute("SELECT name FROM sqlite_master")}
+        users = connection.execute("SELECT COUNT(*) FROM User").fetchone()[0]
+        connection.close()
+
+        self.assertLessEqual({"idx_log_completion_period", *db_manager.SEARCH_TRIGGERS, *db_manager.SEARCH_TABLES},
+                             schema)
+        self.assertEqual(users, 0)  # The load was rolled back
+
+    def test_completions_carry_period_keys(self):
+        """Test that every generated completion has the key of its period, so completed periods stay closed."""
+        generate(users=5, habits_per_user=3, years=0.2, seed=5, distribution="fixed")
+        connection = sqlite3.connect(self.db_file)
+        completions = connection.execute("""
+        SELECT Log.habit_id, Log.log_time, Log.period_key, Habit.periodicity FROM Log JOIN Habit USING (habit_id)
+        WHERE note = 'Habit completed successfully on time'
+        """).fetchall()
+        connection.close()
+
+        self.assertTrue(completions)
+        for habit_id, log_time, period_key, periodicity in completions:
+            self.assertEqual(period_key, get_periodicity(periodicity).key(datetime.fromisoformat(log_time)))
+        habit = db_manager.get_habit_by_id(completions[-1][0])
+        self.assertIsNone(habit.mark_complete(datetime.fromisoformat(completions[-1][1])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,11 @@
+import threading
 import unittest
 from datetime import datetime, timedelta
+from unittest import mock
 
-from storage.db_manager import clear_habit_table, clear_user_table, clear_log_table
+from storage.db_manager import clear_habit_table, clear_user_table, clear_log_table, get_logs_by_habit
 from storage.ex_data import setup_tables, create_example_user, create_example_habits
+from app.analytics import analyze_logs, get_completion_rate
 from app.habit import Habit
 
 
@@ -36,6 +39,18 @@ class TestHabit(unittest.TestCase):
         habits = Habit.get_all_by_user(self.user.user_id)
         self.assertEqual(len(habits), 7)  # Based on the 7 example habits + created in test
 
+    def test_get_all_by_user_maps_columns_by_name(self):
+        """Test that habits loaded from rows have the right fields, no __dict__ and lazily parsed timestamps."""
+        habits = {habit.habit_id: habit for habit in Habit.get_all_by_user(self.user.user_id)}
+        expected = self.habits[3]
+        habit = habits[expected.habit_id]
+        self.assertEqual((habit.user_id, habit.name, habit.periodicity, habit.active),
+                         (self.user.user_id, expected.name, expected.periodicity, 1))
+        self.assertIsInstance(habit._deadline, str)  # Not parsed until read
+        self.assertEqual(habit.deadline, expected.deadline)
+        self.assertIsInstance(habit._deadline, datetime)
+        self.assertFalse(hasattr(habit, "__dict__"))
+
     def test_update_habit(self):
         """Test updating a habit."""
         habit = self.habits[0]
@@ -66,6 +81,29 @@ class TestHabit(unittest.TestCase):
         can_mark = habit.can_mark_complete()
         self.assertTrue(can_mark)
 
+    def test_mark_complete_once_per_period_under_concurrency(self):
+        """Test that concurrent completions of one habit in the same period log exactly one completion."""
+        habit = Habit.create(self.user.user_id, "Test Habit", "Test Description", "daily", 2)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(habit.mark_complete())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        completions = [log for log in get_logs_by_habit(habit.habit_id)
+                       if log["note"] == "Habit completed successfully on time"]
+        self.assertEqual(len(completions), 1)
+        self.assertEqual([log_id for log_id in results if log_id is not None], [completions[0]["log_id"]])
+        self.assertFalse(habit.can_mark_complete())
+
+    def test_create_is_one_unit_of_work(self):
+        """Test that a habit is not stored when logging its creation fails."""
+        before = len(Habit.get_all_by_user(self.user.user_id))
+        with mock.patch("app.habit.add_log_entry", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                Habit.create(self.user.user_id, "Rolled back", "Test Description", "daily", 2)
+        self.assertEqual(len(Habit.get_all_by_user(self.user.user_id)), before)
+
     def test_update_status(self):
         """Test updating the status of a habit."""
         habit = self.habits[4]
@@ -74,6 +112,18 @@ class TestHabit(unittest.TestCase):
         last_log = habit.add_log_entry(success=1, note="Test status update log")
         self.assertIsNotNone(last_log)
 
+    def test_failed_update_status_leaves_cached_analytics_unchanged(self):
+        """Test that cached analytics stay valid when update_status fails after logging its completion."""
+        habit = Habit.create(self.user.user_id, "Rolled back status", "Test Description", "daily", 7)
+        rate, logs = get_completion_rate(habit.habit_id), analyze_logs(habit.habit_id)  # Prime the cache
+        with mock.patch("app.habit.load_state", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                habit.update_status()
+        self.assertEqual(get_completion_rate(habit.habit_id), rate)
+        self.assertEqual(analyze_logs(habit.habit_id), logs)
+        self.assertTrue(habit.can_mark_complete())  # The completion was rolled back with the failed streak update
+        habit.delete()
+
     def test_deactivate_habit_due(self):
         """Test deactivating a habit."""
         habit = Habit.create(self.user.user_id, "Test Habit", "Test Description", "daily", 2, 0,
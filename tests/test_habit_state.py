@@ -0,0 +1,111 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app import habit_state
+from app.habit import Habit
+from app.habit_state import SNAPSHOT_INTERVAL, load_state, verify
+from storage.db_manager import (
+    clear_habit_table, clear_user_table, clear_log_table, count_consecutive_incomplete, get_habit_by_id,
+    get_habit_snapshot, update_habit
+)
+from storage.ex_data import setup_tables, create_example_user
+
+
+class TestHabitState(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test database and create example user."""
+        setup_tables()
+        cls.user = create_example_user()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clear the habit, user and log tables after all tests."""
+        clear_habit_table()
+        clear_user_table()
+        clear_log_table()
+
+    def setUp(self):
+        """Create a daily habit with a long history of completions ending in two misses."""
+        self.created_at = datetime(2024, 1, 1, 8, 0)
+        self.habit = Habit.create(self.user.user_id, "Stretch", "Morning stretch", "daily", 30, 0, self.created_at)
+        for day in range(1, SNAPSHOT_INTERVAL + 5):
+            self.habit.add_log_entry(1, "Habit completed successfully on time", self.created_at + timedelta(days=day))
+        for day in (60, 61):
+            self.habit.add_log_entry(0, "Habit marked as incomplete", self.created_at + timedelta(days=day))
+
+    def tearDown(self):
+        """Remove the habits created for the test."""
+        clear_log_table()
+        clear_habit_table()
+
+    def test_fold_matches_log_history(self):
+        """Test the folded streak, active flag and deadline."""
+        state = load_state(self.habit.habit_id)
+        self.assertEqual(state.completions, SNAPSHOT_INTERVAL + 4)
+        self.assertEqual(state.trailing_misses, 2)
+        self.assertEqual(state.streak, SNAPSHOT_INTERVAL + 4)
+        self.assertEqual(state.deadline("daily", 30), self.habit.deadline)
+        self.habit.add_log_entry(0, "Habit marked as incomplete", self.created_at + timedelta(days=62))
+        self.assertEqual(load_state(self.habit.habit_id).streak, 0)
+
+    def test_snapshot_limits_rebuild_to_new_events(self):
+        """Test that a stored snapshot is used and only later events are read."""
+        load_state(self.habit.habit_id)
+        snapshot = get_habit_snapshot(self.habit.habit_id)
+        self.assertIsNotNone(snapshot)
+        self.habit.add_log_entry(1, "Habit completed successfully on time", self.created_at + timedelta(days=70))
+        with mock.patch.object(habit_state, "get_habit_events", wraps=habit_state.get_habit_events) as events:
+            state = load_state(self.habit.habit_id)
+        events.assert_called_once_with(self.habit.habit_id, snapshot["last_log_id"])
+        self.assertEqual((state.completions, state.trailing_misses), (SNAPSHOT_INTERVAL + 5, 0))
+
+    def test_backdated_event_rebuilds_from_scratch(self):
+        """Test that an event logged for a time before the snapshot does not corrupt the fold."""
+        load_state(self.habit.habit_id)
+        self.habit.add_log_entry(0, "Habit marked as incomplete", self.created_at + timedelta(days=62))
+        self.habit.add_log_entry(1, "Habit completed successfully on time", self.created_at + timedelta(days=59))
+        state = load_state(self.habit.habit_id)
+        self.assertEqual((state.completions, state.trailing_misses), (SNAPSHOT_INTERVAL + 5, 3))
+
+    def test_restart_resets_miss_run(self):
+        """Test that misses before a restart do not count towards the restarted habit's miss run."""
+        self.habit.add_log_entry(1, "Habit restarted and activated", self.created_at + timedelta(days=62))
+        self.habit.add_log_entry(0, "Habit marked as incomplete", self.created_at + timedelta(days=63))
+        state = load_state(self.habit.habit_id)
+        self.assertEqual(state.trailing_misses, 1)
+        self.assertEqual(state.streak, SNAPSHOT_INTERVAL + 4)
+
+    def test_miss_run_matches_the_trailing_incomplete_run(self):
+        """Test that any other event ends the folded miss run, as count_consecutive_incomplete counts it."""
+        self.habit.add_log_entry(0, "Habit marked as incomplete", self.created_at + timedelta(days=62))
+        self.habit.add_log_entry(0, "Habit deactivated - deadline exceeded", self.created_at + timedelta(days=63))
+        state = load_state(self.habit.habit_id)
+        self.assertEqual(state.trailing_misses, count_consecutive_incomplete(self.habit.habit_id))
+        self.assertEqual(state.trailing_misses, 0)
+        self.habit.add_log_entry(0, "Habit marked as incomplete", self.created_at + timedelta(days=64))
+        self.assertEqual(load_state(self.habit.habit_id).trailing_misses, 1)
+        self.assertEqual(count_consecutive_incomplete(self.habit.habit_id), 1)
+
+    def test_verify_without_repair_holds_no_write_transaction(self):
+        """Test that a report-only verify does not take the write lock for its scan."""
+        with mock.patch.object(habit_state, "transaction") as transaction:
+            verify([self.habit.habit_id])
+        transaction.assert_not_called()
+
+    def test_verify_reports_and_repairs_drift(self):
+        """Test that drifted columns are reported and repaired from the fold."""
+        update_habit(self.habit.habit_id, streak=3, active=0)
+        mismatches = verify([self.habit.habit_id])
+        self.assertEqual({(column, folded) for _, column, _, folded in mismatches},
+                         {("streak", SNAPSHOT_INTERVAL + 4), ("active", 1)})
+
+        verify([self.habit.habit_id], repair=True)
+        self.assertEqual(verify([self.habit.habit_id]), [])
+        self.assertEqual(get_habit_by_id(self.habit.habit_id).streak, SNAPSHOT_INTERVAL + 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
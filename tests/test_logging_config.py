@@ -0,0 +1,40 @@
+import io
+import json
+import logging
+import unittest
+from app.logging_config import JsonFormatter, configure_logging
+
+
+class TestLoggingConfig(unittest.TestCase):
+
+    def setUp(self):
+        """Remember the root logger setup so each test can restore it."""
+        self.root = logging.getLogger()
+        self.handlers, self.level = list(self.root.handlers), self.root.level
+
+    def tearDown(self):
+        """Restore the root logger setup."""
+        self.root.handlers[:] = self.handlers
+        self.root.setLevel(self.level)
+
+    def test_json_formatter_includes_extra_fields(self):
+        """Test that fields passed with extra= appear in the JSON output."""
+        record = logging.LogRecord("app.habit", logging.INFO, __file__, 1, "Streak: %s", (3,), None)
+        record.habit_id = 7
+        event = json.loads(JsonFormatter().format(record))
+        self.assertEqual(event["message"], "Streak: 3")
+        self.assertEqual(event["level"], "INFO")
+        self.assertEqual(event["habit_id"], 7)
+
+    def test_default_level_hides_debug_output(self):
+        """Test that per-row debug messages are not written at the default level."""
+        handler = configure_logging(level="WARNING")
+        stream = io.StringIO()
+        handler.setStream(stream)
+        logging.getLogger("storage.db_manager").debug("New log entry ID: %s", 1)
+        logging.getLogger("app.sweeper").warning("visible")
+        self.assertEqual(stream.getvalue().strip(), "WARNING app.sweeper: visible")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+from app import main
+from storage.db_manager import clear_habit_table, clear_user_table, clear_log_table, update_habit
+from storage.ex_data import setup_tables, create_example_user, create_example_habits
+
+
+class ScriptedPrompt:
+    """Stands in for Prompt.ask, answering from a fixed script and recording the stack depth of each call."""
+
+    def __init__(self, answers):
+        self.answers = iter(answers)
+        self.depths = []
+
+    def ask(self, *args, **kwargs):
+        depth = 0
+        frame = sys._getframe()
+        while frame:
+            depth += 1
+            frame = frame.f_back
+        self.depths.append(depth)
+        return next(self.answers)
+
+
+class SilentConsole:
+    """Discards output so the soak test measures navigation rather than terminal rendering."""
+
+    def print(self, *args, **kwargs):
+        pass
+
+    def log(self, *args, **kwargs):
+        pass
+
+
+class TestMenuNavigation(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test database and create example user and habits."""
+        setup_tables()
+        cls.user = create_example_user()
+        create_example_habits(cls.user.user_id)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clear the habit, user and log tables after all tests."""
+        clear_habit_table()
+        clear_user_table()
+        clear_log_table()
+
+    def run_script(self, answers, screen, *args):
+        prompt = ScriptedPrompt(answers)
+        with patch.object(main, "Prompt", prompt), patch.object(main, "console", SilentConsole()):
+            main.run(screen, *args)
+        return prompt
+
+    def test_soak_ten_thousand_transitions(self):
+        """Test that a long session keeps a constant stack depth."""
+        transitions = 10000
+        answers = ["4", "6"] * (transitions // 2) + ["6", "yes", "4"]  # Analytics and back, then log out and exit
+        prompt = self.run_script(answers, main.dashboard, self.user)
+        self.assertEqual(len(prompt.depths), transitions + 3)
+        self.assertEqual(max(prompt.depths), min(prompt.depths))  # Every prompt is asked from a screen run() called
+
+    def test_analysis_loop_returns_to_dashboard(self):
+        """Test repeating an analysis and returning to the dashboard without nesting calls."""
+        answers = ["4", "2"] + ["3"] * 50 + ["2", "6", "yes", "4"]
+        prompt = self.run_script(answers, main.dashboard, self.user)
+        self.assertLessEqual(max(prompt.depths) - min(prompt.depths), 1)  # handle_return_option adds one frame
+
+    def test_search_screen(self):
+        """Test searching from the dashboard, searching again and returning without nesting calls."""
+        answers = ["5", "read", "1", "no such words", "2", "6", "yes", "4"]
+        prompt = self.run_script(answers, main.dashboard, self.user)
+        self.assertEqual(len(prompt.depths), len(answers))
+        self.assertLessEqual(max(prompt.depths) - min(prompt.depths), 1)
+
+    def test_exit_from_main_menu(self):
+        """Test that choosing exit ends the loop instead of terminating the process."""
+        prompt = self.run_script(["4"], main.main_menu)
+        self.assertEqual(len(prompt.depths), 1)
+
+    def test_dashboard_table_updates_changed_rows_in_place(self):
+        """Test that an updated habit edits its cells in the existing table and a removed one rebuilds it."""
+        from app.dashboard_view import DashboardView
+
+        view = DashboardView(self.user.user_id)
+        try:
+            view.refresh()
+            table, cells = main.update_dashboard_table(view, None, {})
+            habit_id = view.habit_ids()[0]
+            update_habit(habit_id, name="Renamed on the dashboard")
+            view.refresh()
+            self.assertEqual(main.update_dashboard_table(view, table, cells), (table, cells))
+            self.assertEqual(cells[habit_id][0].plain, "Renamed on the dashboard")
+
+            update_habit(habit_id, active=0)
+            view.refresh()
+            rebuilt, cells = main.update_dashboard_table(view, table, cells)
+            self.assertIsNot(rebuilt, table)
+            self.assertNotIn(habit_id, cells)
+            self.assertEqual(rebuilt.row_count, len(view.rows()))
+        finally:
+            view.close()
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_heavy_modules_not_imported_at_startup(self):
+        """Test that importing the CLI modules does not load rich, pyfiglet or the analytics module."""
+        for module in ("app.main", "app.cli"):
+            result = subprocess.run(
+                [sys.executable, "-c", f"import sys, {module}; "
+                                       "print([m for m in ('rich', 'pyfiglet', 'app.analytics') if m in sys.modules])"],
+                capture_output=True, text=True, check=True)
+            self.assertEqual(result.stdout.strip(), "[]", module)
+
+
+if __name__ == "__main__":
+    unittest.main()
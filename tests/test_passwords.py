@@ -0,0 +1,64 @@
+import hashlib
+import unittest
+
+from app.passwords import (
+    Pbkdf2Hasher, ScryptHasher, hash_password, hasher_from_spec, needs_rehash, set_default_hasher, verify_password,
+    verify_password_async
+)
+
+
+class TestPasswords(unittest.TestCase):
+
+    def tearDown(self):
+        """Restore the default hasher."""
+        set_default_hasher(ScryptHasher())
+
+    def test_hash_is_salted_and_verifies(self):
+        """Test that equal passwords get different hashes which both verify."""
+        first, second = hash_password("secret"), hash_password("secret")
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.startswith("scrypt$"))
+        self.assertTrue(verify_password("secret", first))
+        self.assertTrue(verify_password("secret", second))
+        self.assertFalse(verify_password("wrong", first))
+
+    def test_legacy_sha256_hash(self):
+        """Test that unsalted SHA-256 hashes verify and are flagged for rehashing."""
+        legacy = hashlib.sha256(b"secret").hexdigest()
+        self.assertTrue(verify_password("secret", legacy))
+        self.assertFalse(verify_password("wrong", legacy))
+        self.assertTrue(needs_rehash(legacy))
+
+    def test_cost_change_requires_rehash(self):
+        """Test that hashes made with other parameters or algorithms are flagged for rehashing."""
+        encoded = hash_password("secret")
+        self.assertFalse(needs_rehash(encoded))
+        set_default_hasher(ScryptHasher(n=2 ** 12))
+        self.assertTrue(needs_rehash(encoded))
+        self.assertTrue(verify_password("secret", encoded))  # Old parameters are read from the hash itself
+        set_default_hasher(Pbkdf2Hasher(iterations=1000))
+        self.assertTrue(needs_rehash(encoded))
+        self.assertTrue(verify_password("secret", hash_password("secret")))
+
+    def test_verify_on_pool(self):
+        """Test verification through the hashing pool."""
+        encoded = hash_password("secret")
+        futures = [verify_password_async(password, encoded) for password in ("secret", "wrong")]
+        self.assertEqual([future.result() for future in futures], [True, False])
+
+    def test_hasher_from_spec(self):
+        """Test building hashers from configuration strings."""
+        hasher = hasher_from_spec("scrypt:n=4096,r=8,p=2")
+        self.assertEqual((hasher.n, hasher.r, hasher.p), (4096, 8, 2))
+        self.assertEqual(hasher_from_spec("pbkdf2_sha256:iterations=5000").iterations, 5000)
+        with self.assertRaises(ValueError):
+            hasher_from_spec("md5")
+
+    def test_malformed_hash(self):
+        """Test that unknown or empty hashes never verify."""
+        self.assertFalse(verify_password("secret", "bcrypt$12$abc"))
+        self.assertFalse(verify_password("secret", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from app.periodicity import get_periodicity
+
+
+class TestPeriodicity(unittest.TestCase):
+
+    def setUp(self):
+        """A Thursday afternoon used as reference moment."""
+        self.moment = datetime(2024, 6, 27, 15, 45)
+
+    def test_period_bounds(self):
+        """Test the period containing the reference moment for every kind of periodicity."""
+        expected = {
+            "daily": (datetime(2024, 6, 27), datetime(2024, 6, 28)),
+            "weekly": (datetime(2024, 6, 24), datetime(2024, 7, 1)),
+            "monthly": (datetime(2024, 6, 1), datetime(2024, 7, 1)),
+            "weekdays:mon,wed,fri": (datetime(2024, 6, 26), datetime(2024, 6, 28)),
+        }
+        for spec, bounds in expected.items():
+            periodicity = get_periodicity(spec)
+            self.assertEqual(periodicity.bounds(periodicity.index(self.moment)), bounds, spec)
+
+    def test_consecutive_moments_map_to_consecutive_indexes(self):
+        """Test that index() numbers periods without gaps and start() inverts it."""
+        periodicity = get_periodicity("every:3")
+        index = periodicity.index(self.moment)
+        start, end = periodicity.bounds(index)
+        self.assertEqual((end - start).days, 3)
+        self.assertEqual(periodicity.index(end), index + 1)
+        self.assertEqual(periodicity.index(start), index)
+
+    def test_period_key_names_period_and_periodicity(self):
+        """Test that moments of one period share a key and equal indexes of other periodicities do not."""
+        daily, weekly = get_periodicity("daily"), get_periodicity("weekly")
+        self.assertEqual(daily.key(self.moment), daily.key(self.moment.replace(hour=0, minute=0)))
+        self.assertNotEqual(daily.key(self.moment), daily.key(datetime(2024, 6, 28)))
+        self.assertEqual(weekly.key(self.moment), f"weekly/{weekly.index(self.moment)}")
+
+    def test_advance_keeps_time_of_day_and_caps_month_end(self):
+        """Test deadlines: same wall-clock time, capped to the last day of shorter months."""
+        self.assertEqual(get_periodicity("daily").advance(self.moment, 3), datetime(2024, 6, 30, 15, 45))
+        self.assertEqual(get_periodicity("weekly").advance(self.moment, 2), datetime(2024, 7, 11, 15, 45))
+        self.assertEqual(get_periodicity("monthly").advance(datetime(2024, 1, 31, 10), 1), datetime(2024, 2, 29, 10))
+
+    def test_daylight_saving_change_does_not_shift_periods(self):
+        """Test that a 23-hour day is still exactly one period and boundaries stay at local midnight."""
+        tz = ZoneInfo("Europe/Berlin")
+        periodicity = get_periodicity("daily", tz)
+        before = datetime(2024, 3, 30, 23, 30, tzinfo=tz)
+        after = datetime(2024, 3, 31, 23, 30, tzinfo=tz)  # 23 hours later in absolute time
+        self.assertEqual(periodicity.index(after) - periodicity.index(before), 1)
+        self.assertEqual(periodicity.advance(before, 1), after)
+        self.assertEqual(periodicity.start(periodicity.index(after)).hour, 0)
+
+    def test_unknown_periodicity_is_rejected(self):
+        """Test that invalid periodicity strings raise ValueError."""
+        for spec in ("hourly", "every:0", "every:x", "weekdays:", "weekdays:mon,funday"):
+            with self.assertRaises(ValueError, msg=spec):
+                get_periodicity(spec)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.analytics import get_completion_rate, analyze_logs, get_longest_streak_all_habits
+from app.reports import build_reports, generate_reports
+from storage.db_manager import clear_habit_table, clear_user_table, clear_log_table, create_read_only_connection
+from storage.ex_data import setup_tables, create_example_user, create_example_habits
+
+
+class TestReports(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test database and create example user and habits."""
+        setup_tables()
+        cls.user = create_example_user()
+        cls.habits = create_example_habits(cls.user.user_id)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clear the habit, user and log tables after all tests."""
+        clear_habit_table()
+        clear_user_table()
+        clear_log_table()
+
+    def test_build_reports_matches_analytics(self):
+        """Test that the aggregated report agrees with the analytics module."""
+        connection = create_read_only_connection()
+        connection.row_factory = sqlite3.Row
+        report = build_reports(connection, [self.user.user_id])[self.user.user_id]
+        connection.close()
+
+        self.assertEqual(len(report["habits"]), len(self.habits))
+        self.assertEqual(report["longest_streak"]["streak"],
+                         get_longest_streak_all_habits(self.user.user_id)['streak'])
+        for habit in report["habits"]:
+            self.assertAlmostEqual(habit["completion_rate"], get_completion_rate(habit["habit_id"]))
+            expected = analyze_logs(habit["habit_id"])
+            self.assertEqual(habit["log_analysis"]["total_logs"], expected["total_logs"])
+            self.assertEqual(sorted(habit["log_analysis"]["notes"]), sorted(expected["notes"]))
+
+    def test_read_only_connection_rejects_writes(self):
+        """Test that report workers cannot modify the database."""
+        connection = create_read_only_connection()
+        with self.assertRaises(sqlite3.OperationalError):
+            connection.execute("DELETE FROM Log")
+        connection.close()
+
+    def test_generate_reports_writes_json_per_user(self):
+        """Test that the process pool writes one JSON file per user."""
+        with tempfile.TemporaryDirectory() as output_dir:
+            result = generate_reports(output_dir, workers=2)
+            self.assertEqual(result["users"], 1)
+            report = json.loads((Path(output_dir) / f"user_{self.user.user_id}.json").read_text())
+            self.assertEqual(report["user_id"], self.user.user_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
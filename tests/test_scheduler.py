@@ -0,0 +1,92 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from storage.db_manager import (
+    clear_habit_table, clear_user_table, clear_log_table, count_unsuccessful_by_habit, get_habit_by_id, update_habit,
+    update_streaks
+)
+from storage.ex_data import setup_tables, create_example_user
+from app.habit import Habit
+from app.scheduler import MissedPeriodScheduler, period_start, previous_period
+
+
+class TestMissedPeriodScheduler(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test database and create example user."""
+        setup_tables()
+        cls.user = create_example_user()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clear the habit, user and log tables after all tests."""
+        clear_habit_table()
+        clear_user_table()
+        clear_log_table()
+
+    def setUp(self):
+        """Create a completed and a missed daily habit for yesterday."""
+        self.start, self.end = previous_period("daily")
+        created_at = self.start - timedelta(days=2)
+        self.completed = Habit.create(self.user.user_id, "Completed", "Done yesterday", "daily", 10, 0, created_at)
+        self.completed.add_log_entry(success=1, note="Habit completed successfully on time",
+                                     log_time=self.start + timedelta(hours=9))
+        self.missed = Habit.create(self.user.user_id, "Missed", "Not done yesterday", "daily", 10, 0, created_at)
+        self.scheduler = MissedPeriodScheduler(shards=3)
+
+    def tearDown(self):
+        """Remove the habits created for the test."""
+        clear_log_table()
+        clear_habit_table()
+
+    def test_period_boundaries(self):
+        """Test daily and weekly period starts."""
+        moment = datetime(2024, 6, 27, 15, 45)  # A Thursday
+        self.assertEqual(period_start("daily", moment), datetime(2024, 6, 27))
+        self.assertEqual(period_start("weekly", moment), datetime(2024, 6, 24))
+        self.assertEqual(previous_period("weekly", moment), (datetime(2024, 6, 17), datetime(2024, 6, 24)))
+
+    def test_run_period_marks_only_missed_habits(self):
+        """Test that only habits without a completion in the period are marked incomplete."""
+        missed = self.scheduler.run_period("daily", self.start, self.end)
+        self.assertEqual(missed, [self.missed.habit_id])
+        self.assertEqual(count_unsuccessful_by_habit(self.missed.habit_id), 1)
+        self.assertEqual(count_unsuccessful_by_habit(self.completed.habit_id), 0)
+
+    def test_run_period_is_idempotent(self):
+        """Test that re-running the same period does not log the miss twice."""
+        self.scheduler.run_period("daily", self.start, self.end)
+        self.assertEqual(self.scheduler.run_period("daily", self.start, self.end), [])
+        self.assertEqual(count_unsuccessful_by_habit(self.missed.habit_id), 1)
+
+    def test_streaks_are_refolded_in_one_batch(self):
+        """Test that a third miss in a row resets the streak, stored with one update per shard."""
+        before = self.start - timedelta(days=2)
+        self.missed.add_log_entry(success=1, note="Habit completed successfully on time", log_time=before)
+        for hours in (1, 2):
+            self.missed.add_log_entry(success=0, note="Habit marked as incomplete",
+                                      log_time=before + timedelta(hours=hours))
+        update_habit(self.missed.habit_id, streak=1)
+        with patch("app.scheduler.update_streaks", wraps=update_streaks) as batched:
+            self.scheduler.run_period("daily", self.start, self.end)
+        self.assertEqual(batched.call_count, self.scheduler.shards)
+        self.assertEqual(get_habit_by_id(self.missed.habit_id).streak, 0)
+
+    def test_habits_created_after_period_are_skipped(self):
+        """Test that a habit created after the period ended is not marked."""
+        fresh = Habit.create(self.user.user_id, "Fresh", "Created today", "daily", 10)
+        self.scheduler.run_due()
+        self.assertEqual(count_unsuccessful_by_habit(fresh.habit_id), 0)
+
+    def test_habits_created_during_period_are_skipped(self):
+        """Test that a habit created inside the period being swept is not marked for that period."""
+        late = Habit.create(self.user.user_id, "Late", "Created late yesterday", "daily", 10, 0,
+                            self.end - timedelta(minutes=1))
+        self.assertEqual(self.scheduler.run_period("daily", self.start, self.end), [self.missed.habit_id])
+        self.assertEqual(count_unsuccessful_by_habit(late.habit_id), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
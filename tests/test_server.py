@@ -0,0 +1,160 @@
+import http.client
+import json
+import socket
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app.server import HabitRequestHandler, create_server
+from benchmarks.http_load import request
+from storage.db_manager import clear_habit_table, clear_user_table, clear_log_table
+from storage.ex_data import setup_tables
+
+
+class TestServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the HTTP service on a free local port."""
+        setup_tables()
+        cls.server = create_server(port=0, max_workers=2, max_pending=4)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        _, body = request(cls.base_url, "POST", "/users", {"username": "http_user", "password": "secret"})
+        cls.token = body["token"]
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the service and clear the tables."""
+        cls.server.shutdown()
+        cls.server.server_close()
+        clear_habit_table()
+        clear_user_table()
+        clear_log_table()
+
+    def create_habit(self):
+        status, habit = request(self.base_url, "POST", "/habits",
+                                {"name": "Run", "description": "5k", "periodicity": "daily", "duration": 7},
+                                token=self.token)
+        self.assertEqual(status, 201)
+        return habit
+
+    def test_login(self):
+        """Test logging in with valid and invalid credentials."""
+        status, body = request(self.base_url, "POST", "/login", {"username": "http_user", "password": "secret"})
+        self.assertEqual(status, 200)
+        self.assertIn("token", body)
+        status, _ = request(self.base_url, "POST", "/login", {"username": "http_user", "password": "wrong"})
+        self.assertEqual(status, 401)
+
+    def test_requires_session(self):
+        """Test that habit endpoints reject requests without a session token."""
+        status, _ = request(self.base_url, "GET", "/habits")
+        self.assertEqual(status, 401)
+
+    def test_habit_crud_and_complete(self):
+        """Test creating, completing, updating and deleting a habit over HTTP."""
+        habit = self.create_habit()
+        path = f"/habits/{habit['habit_id']}"
+
+        status, completed = request(self.base_url, "POST", path + "/complete", token=self.token)
+        self.assertEqual(status, 200)
+        self.assertEqual(completed["streak"], 1)
+
+        status, updated = request(self.base_url, "PUT", path, {"name": "Run far"}, token=self.token)
+        self.assertEqual(status, 200)
+        self.assertEqual(updated["name"], "Run far")
+
+        status, _ = request(self.base_url, "DELETE", path, token=self.token)
+        self.assertEqual(status, 200)
+        status, _ = request(self.base_url, "GET", path, token=self.token)
+        self.assertEqual(status, 404)
+
+    def test_invalid_update_is_rejected(self):
+        """Test that an invalid duration, periodicity or body in an update is a client error."""
+        habit = self.create_habit()
+        status, body = request(self.base_url, "PUT", f"/habits/{habit['habit_id']}", {"duration": "week"},
+                               token=self.token)
+        self.assertEqual(status, 400)
+        self.assertIn("Invalid habit", body["error"])
+        status, body = request(self.base_url, "PUT", f"/habits/{habit['habit_id']}", {"periodicity": "hourly"},
+                               token=self.token)
+        self.assertEqual(status, 400)
+        self.assertIn("Invalid habit", body["error"])
+        status, body = request(self.base_url, "PUT", f"/habits/{habit['habit_id']}", [], token=self.token)
+        self.assertEqual(status, 400)
+        self.assertIn("JSON object", body["error"])
+
+    def test_completing_twice_in_a_period_conflicts(self):
+        """Test that a second completion in the same period is answered with 409."""
+        path = f"/habits/{self.create_habit()['habit_id']}/complete"
+        status, _ = request(self.base_url, "POST", path, token=self.token)
+        self.assertEqual(status, 200)
+        status, body = request(self.base_url, "POST", path, token=self.token)
+        self.assertEqual(status, 409)
+        self.assertIn("cannot be completed", body["error"])
+
+    def test_rejected_request_body_does_not_leak_into_the_next_request(self):
+        """Test that a keep-alive connection stays usable after a request failed before its body was read."""
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+        try:
+            headers = {"Content-Type": "application/json", "Authorization": f"Bearer {self.token}"}
+            connection.request("PUT", "/habits/999999", json.dumps({"name": "Missing"}), headers)
+            response = connection.getresponse()
+            self.assertEqual(response.status, 404)
+            response.read()
+            connection.request("GET", "/habits", headers=headers)
+            response = connection.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertIsInstance(json.loads(response.read()), list)
+        finally:
+            connection.close()
+
+    def test_idle_connections_do_not_hold_the_pool(self):
+        """Test that kept-alive connections left idle are closed, so other clients still get a worker."""
+        self.assertIsNotNone(HabitRequestHandler.timeout)
+        port = self.server.server_address[1]
+        with patch.object(HabitRequestHandler, "timeout", 0.2):  # Shortened to keep the test fast
+            idle = [socket.create_connection(("127.0.0.1", port)) for _ in range(2)]  # As many as there are workers
+            try:
+                for client in idle:
+                    client.sendall(b"GET /habits HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                    client.recv(65536)  # The response; the connection is then left open
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=3)
+                connection.request("POST", "/login", json.dumps({"username": "http_user", "password": "secret"}))
+                self.assertEqual(connection.getresponse().status, 200)
+                connection.close()
+            finally:
+                for client in idle:
+                    client.close()
+
+    def test_idle_sessions_expire(self):
+        """Test that idle sessions are rejected and evicted when the next session is opened."""
+        server = create_server(port=0, session_ttl=60)
+        try:
+            idle, active = server.open_session(1), server.open_session(2)
+            self.assertEqual(server.session_user(idle), 1)
+            with patch("app.server.time.monotonic", return_value=time.monotonic() + 61):
+                self.assertIsNone(server.session_user(idle))
+                server.open_session(3)
+                self.assertEqual(len(server.sessions), 1)  # The idle session of user 2 was evicted
+                self.assertIsNone(server.session_user(active))
+        finally:
+            server.server_close()
+
+    def test_analytics(self):
+        """Test the user and habit analytics endpoints."""
+        habit = self.create_habit()
+        status, body = request(self.base_url, "GET", "/analytics", token=self.token)
+        self.assertEqual(status, 200)
+        self.assertIn(habit["habit_id"], [active["habit_id"] for active in body["active_habits"]])
+        status, body = request(self.base_url, "GET", f"/analytics/habits/{habit['habit_id']}", token=self.token)
+        self.assertEqual(status, 200)
+        self.assertIn("completion_rate", body)
+        self.assertIn("log_analysis", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from datetime import datetime, timedelta
+
+from storage import changes
+from storage.db_manager import (
+    clear_habit_table, clear_user_table, clear_log_table, get_habit_by_id, get_logs_by_habit, read_outbox,
+    update_habit
+)
+from storage.ex_data import setup_tables, create_example_user
+from app.habit import Habit
+from app.sweeper import DeadlineSweeper
+
+
+class TestDeadlineSweeper(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test database and create example user."""
+        setup_tables()
+        cls.user = create_example_user()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clear the habit, user and log tables after all tests."""
+        clear_habit_table()
+        clear_user_table()
+        clear_log_table()
+
+    def setUp(self):
+        """Create one overdue and one running habit."""
+        self.overdue = Habit.create(self.user.user_id, "Overdue", "Past deadline", "daily", 2, 0,
+                                    datetime.now() - timedelta(days=3))
+        self.running = Habit.create(self.user.user_id, "Running", "Before deadline", "daily", 2)
+        self.sweeper = DeadlineSweeper(interval=0.01, jitter=0.5)
+
+    def tearDown(self):
+        """Remove the habits created for the test."""
+        clear_log_table()
+        clear_habit_table()
+
+    def test_sweep_deactivates_overdue_habits(self):
+        """Test that a sweep deactivates only habits past their deadline and logs it."""
+        deactivated = self.sweeper.sweep()
+        self.assertEqual(deactivated, [self.overdue.habit_id])
+        self.assertEqual(get_habit_by_id(self.overdue.habit_id).active, 0)
+        self.assertEqual(get_habit_by_id(self.running.habit_id).active, 1)
+        notes = [log['note'] for log in get_logs_by_habit(self.overdue.habit_id)]
+        self.assertIn("Habit deactivated - deadline exceeded", notes)
+
+    def test_sweep_metrics(self):
+        """Test that repeated sweeps record their duration and touched rows."""
+        self.sweeper.sweep()
+        self.sweeper.sweep()
+        metrics = self.sweeper.metrics()
+        self.assertEqual(metrics["sweeps"], 2)
+        self.assertEqual(metrics["rows_touched"], 1)
+        self.assertGreater(metrics["max_duration"], 0)
+
+    def test_next_delay_within_jitter(self):
+        """Test that the jittered delay stays within the configured bounds."""
+        for _ in range(100):
+            self.assertTrue(0.005 <= self.sweeper.next_delay() <= 0.015)
+
+    def test_sweep_prunes_old_outbox_events(self):
+        """Test that with the outbox enabled a sweep deletes events older than the retention period."""
+        changes.enable_outbox()
+        self.addCleanup(changes.enable_outbox, False)
+        update_habit(self.running.habit_id, streak=1)
+        update_habit(self.running.habit_id, streak=2)
+        DeadlineSweeper(outbox_retention=0).sweep()
+        self.assertEqual([event.habit_id for _, event in read_outbox()], [self.overdue.habit_id])
+
+    def test_background_thread(self):
+        """Test that the background thread sweeps until stopped."""
+        self.sweeper.start()
+        for _ in range(100):
+            if self.sweeper.sweeps:
+                break
+            self.sweeper._stop_event.wait(0.01)
+        self.sweeper.stop(timeout=1)
+        self.assertGreater(self.sweeper.sweeps, 0)
+        self.assertEqual(get_habit_by_id(self.overdue.habit_id).active, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
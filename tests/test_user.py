@@ -1,7 +1,8 @@
 import unittest
+import hashlib
 from datetime import datetime
 from storage.ex_data import setup_tables, create_example_user
-from storage.db_manager import clear_user_table
+from storage.db_manager import clear_user_table, create_user, get_user_by_username
 from app.user import User
 
 
@@ -95,6 +96,15 @@ class TestUser(unittest.TestCase):
         user.reset_password(new_password)
         self.assertTrue(user.check_password(new_password))
 
+    def test_legacy_password_upgraded_on_login(self):
+        """Test that a legacy SHA-256 password hash is replaced by a salted KDF hash on login."""
+        create_user("User3", hashlib.sha256(b"legacypassword").hexdigest(), datetime(2024, 6, 19, 15, 30))
+        user = User.get_by_username("User3")
+        self.assertTrue(user.check_password("legacypassword"))
+        stored = get_user_by_username("User3")[2]
+        self.assertTrue(stored.startswith("scrypt$"))
+        self.assertTrue(User.get_by_username("User3").check_password("legacypassword"))
+
 
 if __name__ == "__main__":
     unittest.main()